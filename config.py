@@ -36,11 +36,14 @@ TEMPERATURE = 0.1
 MAX_RETRY = 3
 SLEEP_BETWEEN = 1.0
 TIMEOUT_SEC = 60
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))   # 批量审核并发数
+LLM_RATE_LIMIT_PER_SEC = 10.0                            # 所有线程合计的请求速率上限
 
 # ==================== DECIMER配置 ====================
 # 假设DECIMER已经本地部署，提供HTTP API
 DECIMER_API_URL = os.getenv("DECIMER_API_URL", "http://localhost:8000/predict")
 DECIMER_TIMEOUT = 30
+DECIMER_CONCURRENCY = int(os.getenv("DECIMER_CONCURRENCY", 4))   # 批量识别并发请求数
 
 # ==================== 图像分类配置 ====================
 # Qwen-VL 图像分类标签
@@ -54,6 +57,14 @@ FIGURE_TYPES = [
     "other"                     # 其他
 ]
 
+# 上传前图片压缩：超过阈值的图片缩放到最长边并转为JPEG
+VL_IMAGE_MAX_EDGE = 1024                  # 像素
+VL_IMAGE_JPEG_QUALITY = 85
+VL_IMAGE_RECOMPRESS_BYTES = 512 * 1024    # 超过该大小才重新压缩
+
+# 分类结果按图片内容哈希缓存（sqlite），重复处理同一篇论文时不再调用API
+IMAGE_CLASSIFICATION_CACHE_PATH = PROCESSED_DIR / "image_classification_cache.db"
+
 # ==================== 数据质量配置 ====================
 # 数值范围校验
 LAMBDA_RANGE = (200, 800)      # nm
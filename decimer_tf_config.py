@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DECIMER推理进程的TensorFlow配置
+服务进程和常驻CLI worker共用（worker可能运行在其他Python环境中，本模块只依赖标准库和TensorFlow）
+"""
+
+from typing import Optional
+
+
+def configure_tensorflow(precision: str = "float32", xla: bool = True) -> Optional[str]:
+    """
+    配置TensorFlow（需在DECIMER加载模型之前调用）
+    
+    Args:
+        precision: 推理精度，"float32"、"mixed_float16"、"mixed_bfloat16" 或 "auto"
+        xla: 是否开启XLA自动聚类
+    
+    Returns:
+        实际使用的精度策略，TensorFlow未安装时返回None
+    """
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return None
+    
+    # 显存按需增长，避免单个进程占满GPU
+    gpus = tf.config.list_physical_devices("GPU")
+    for gpu in gpus:
+        try:
+            tf.config.experimental.set_memory_growth(gpu, True)
+        except RuntimeError:
+            # GPU已初始化后无法再修改
+            pass
+    
+    # 混合精度：权重和激活读写量减半，累加仍为float32
+    policy = precision
+    if policy == "auto":
+        if not gpus:
+            policy = "float32"
+        else:
+            capability = tf.config.experimental.get_device_details(gpus[0]).get("compute_capability", (0, 0))
+            policy = "mixed_bfloat16" if capability >= (8, 0) else "mixed_float16"
+    if policy != "float32":
+        tf.keras.mixed_precision.set_global_policy(policy)
+    
+    # XLA融合解码循环中的算子，减少显存读写
+    if xla:
+        tf.config.optimizer.set_jit("autoclustering")
+        tf.config.optimizer.set_experimental_options({"layout_optimizer": True, "remapping": True})
+    return policy
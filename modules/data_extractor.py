@@ -6,8 +6,10 @@
 
 import json
 import time
+import asyncio
 import requests
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
 from utils.logger import setup_logger
 from config import (
     DASHSCOPE_API_KEY,
@@ -19,6 +21,13 @@ from config import (
     TIMEOUT_SEC
 )
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
 logger = setup_logger(__name__)
 
 
@@ -37,6 +46,10 @@ class DataExtractor:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
+        # 复用连接（keep-alive），并发抽取多个表格时共用连接池
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
     
     def _call_llm(self, system_prompt: str, user_message: str) -> Optional[str]:
         """
@@ -49,20 +62,11 @@ class DataExtractor:
         Returns:
             LLM响应内容
         """
+        payload = self._build_payload(system_prompt, user_message)
         for attempt in range(MAX_RETRY):
             try:
-                payload = {
-                    "model": MODEL_NAME,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_message}
-                    ],
-                    "temperature": TEMPERATURE,
-                }
-                
-                response = requests.post(
+                response = self.session.post(
                     QWEN_CHAT_ENDPOINT,
-                    headers=self.headers,
                     json=payload,
                     timeout=TIMEOUT_SEC
                 )
@@ -82,6 +86,85 @@ class DataExtractor:
         
         return None
     
+    def _build_payload(self, system_prompt: str, user_message: str) -> Dict:
+        """构建LLM请求体"""
+        return {
+            "model": MODEL_NAME,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            "temperature": TEMPERATURE,
+        }
+    
+    def async_client(self, max_connections: int = 8):
+        """
+        创建供 aextract_* 方法使用的httpx异步客户端（需安装httpx）
+        
+        Args:
+            max_connections: 最大并发连接数
+            
+        Returns:
+            httpx.AsyncClient
+        """
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=TIMEOUT_SEC,
+            limits=httpx.Limits(max_connections=max_connections)
+        )
+    
+    async def _acall_llm(self, client, system_prompt: str, user_message: str) -> Optional[str]:
+        """
+        异步调用LLM（重试逻辑与 _call_llm 相同）
+        
+        Args:
+            client: httpx.AsyncClient
+            system_prompt: 系统提示词
+            user_message: 用户消息
+            
+        Returns:
+            LLM响应内容
+        """
+        payload = self._build_payload(system_prompt, user_message)
+        for attempt in range(MAX_RETRY):
+            try:
+                response = await client.post(QWEN_CHAT_ENDPOINT, json=payload)
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    return result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                else:
+                    logger.warning(f"LLM API请求失败 ({response.status_code}): {response.text}")
+                    
+            except Exception as e:
+                logger.error(f"调用LLM出错 (尝试 {attempt+1}/{MAX_RETRY}): {e}")
+            
+            if attempt < MAX_RETRY - 1:
+                await asyncio.sleep(SLEEP_BETWEEN)
+        
+        return None
+    
+    def _records_from_response(self, response: Optional[str], label: str) -> List[Dict]:
+        """
+        把LLM响应解析为记录列表
+        
+        Args:
+            response: LLM响应内容
+            label: 日志中的数据类型名称
+            
+        Returns:
+            记录列表，失败时为空列表
+        """
+        if not response:
+            return []
+        
+        data = self._parse_json_response(response)
+        if data:
+            logger.info(f"✅ 抽取{label} {len(data)} 条")
+            return data
+        
+        return []
+    
     def _parse_json_response(self, content: str) -> Optional[List[Dict]]:
         """
         解析LLM的JSON响应
@@ -129,6 +212,26 @@ class DataExtractor:
         Returns:
             光物性数据列表
         """
+        response = self._call_llm(*self._photophysical_messages(table_caption, markdown_table, context_paragraphs))
+        return self._records_from_response(response, "光物性数据")
+    
+    async def aextract_photophysical_data(self, client, table_caption: str, markdown_table: str,
+                                          context_paragraphs: Optional[List[str]] = None) -> List[Dict]:
+        """
+        异步抽取光物性数据（参数同 extract_photophysical_data）
+        
+        Args:
+            client: async_client() 创建的httpx异步客户端
+            
+        Returns:
+            光物性数据列表
+        """
+        response = await self._acall_llm(client, *self._photophysical_messages(table_caption, markdown_table, context_paragraphs))
+        return self._records_from_response(response, "光物性数据")
+    
+    def _photophysical_messages(self, table_caption: str, markdown_table: str,
+                                context_paragraphs: Optional[List[str]] = None) -> Tuple[str, str]:
+        """构建光物性数据抽取的(系统提示词, 用户消息)"""
         system_prompt = """你是一个专业的科学数据抽取专家，专门从TADF（热活化延迟荧光）相关文献的表格中抽取光物性数据。
 
 目标JSON Schema:
@@ -171,18 +274,7 @@ class DataExtractor:
         if context_paragraphs:
             user_message += f"\n\n相关段落：\n" + "\n".join(context_paragraphs[:3])
         
-        # 调用LLM
-        response = self._call_llm(system_prompt, user_message)
-        if not response:
-            return []
-        
-        # 解析响应
-        data = self._parse_json_response(response)
-        if data:
-            logger.info(f"✅ 抽取光物性数据 {len(data)} 条")
-            return data
-        
-        return []
+        return system_prompt, user_message
     
     def extract_device_data(self, table_caption: str, markdown_table: str,
                            context_paragraphs: Optional[List[str]] = None) -> List[Dict]:
@@ -197,6 +289,26 @@ class DataExtractor:
         Returns:
             器件数据列表
         """
+        response = self._call_llm(*self._device_messages(table_caption, markdown_table, context_paragraphs))
+        return self._records_from_response(response, "器件数据")
+    
+    async def aextract_device_data(self, client, table_caption: str, markdown_table: str,
+                                   context_paragraphs: Optional[List[str]] = None) -> List[Dict]:
+        """
+        异步抽取器件性能数据（参数同 extract_device_data）
+        
+        Args:
+            client: async_client() 创建的httpx异步客户端
+            
+        Returns:
+            器件数据列表
+        """
+        response = await self._acall_llm(client, *self._device_messages(table_caption, markdown_table, context_paragraphs))
+        return self._records_from_response(response, "器件数据")
+    
+    def _device_messages(self, table_caption: str, markdown_table: str,
+                         context_paragraphs: Optional[List[str]] = None) -> Tuple[str, str]:
+        """构建器件数据抽取的(系统提示词, 用户消息)"""
         system_prompt = """你是一个专业的科学数据抽取专家，专门从TADF相关文献的表格中抽取OLED器件性能数据。
 
 目标JSON Schema:
@@ -232,16 +344,7 @@ class DataExtractor:
         if context_paragraphs:
             user_message += f"\n\n相关段落：\n" + "\n".join(context_paragraphs[:3])
         
-        response = self._call_llm(system_prompt, user_message)
-        if not response:
-            return []
-        
-        data = self._parse_json_response(response)
-        if data:
-            logger.info(f"✅ 抽取器件数据 {len(data)} 条")
-            return data
-        
-        return []
+        return system_prompt, user_message
     
     def extract_computational_data(self, table_caption: str, markdown_table: str) -> List[Dict]:
         """
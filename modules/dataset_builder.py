@@ -8,12 +8,16 @@ import json
 import sqlite3
 import csv
 from pathlib import Path
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, Optional
 from utils.logger import setup_logger
 from config import DATABASE_DIR, PHOTOPHYSICS_SCHEMA, DEVICES_SCHEMA
 
 logger = setup_logger(__name__)
 
+# 每块记录数（同时是单条IN查询的参数个数上限）
+INSERT_CHUNK_SIZE = 500
+
 
 class DatasetBuilder:
     """数据集构建器"""
@@ -56,157 +60,148 @@ class DatasetBuilder:
         
         logger.info("数据集数据库已初始化")
     
-    def insert_photophysics_records(self, records: List[Dict]):
+    def insert_photophysics_records(self, records: Iterable[Dict]) -> int:
         """
         插入光物性记录
         
         Args:
-            records: 记录列表
+            records: 记录列表或逐条产出记录的迭代器
+            
+        Returns:
+            处理的记录数
         """
-        if not records:
+        count = self._insert_records(
+            self.photophysics_db, "photophysics", "record_id", "compound_id",
+            PHOTOPHYSICS_SCHEMA, records, "光物性"
+        )
+        if not count:
             logger.warning("insert_photophysics_records: 记录列表为空")
-            return
-        
-        logger.info(f"开始插入 {len(records)} 条光物性记录到数据库")
-        conn = sqlite3.connect(str(self.photophysics_db))
-        cursor = conn.cursor()
-        
-        inserted = 0
-        updated = 0
-        errors = 0
-        
-        for idx, record in enumerate(records):
-            try:
-                # 生成record_id（使用paper_id和paper_local_id确保唯一性）
-                if 'record_id' not in record:
-                    paper_id = record.get('paper_id', 'unknown')
-                    paper_local_id = record.get('paper_local_id', 'unknown')
-                    compound_id = record.get('compound_id', 'unknown')
-                    record['record_id'] = f"{paper_id}_{paper_local_id}_{compound_id}"
-                
-                # 确保paper_id存在
-                if 'paper_id' not in record:
-                    logger.warning(f"记录 {idx} 缺少paper_id，跳过")
-                    errors += 1
-                    continue
-                
-                # 准备插入数据
-                fields = [k for k in PHOTOPHYSICS_SCHEMA.keys() if k in record]
-                if not fields:
-                    logger.warning(f"记录 {idx} 没有有效字段，跳过")
-                    errors += 1
-                    continue
-                
-                placeholders = ", ".join(["?" for _ in fields])
-                field_names = ", ".join(fields)
-                values = [record[f] for f in fields]
-                
-                # 检查记录是否已存在
-                cursor.execute("SELECT record_id FROM photophysics WHERE record_id = ?", (record['record_id'],))
-                exists = cursor.fetchone()
-                
-                cursor.execute(
-                    f"INSERT OR REPLACE INTO photophysics ({field_names}) VALUES ({placeholders})",
-                    values
-                )
-                if exists:
-                    updated += 1
-                else:
-                    inserted += 1
-                    
-            except Exception as e:
-                errors += 1
-                logger.error(f"插入光物性记录失败 (记录 {idx}): {e}")
-                logger.error(f"记录ID: {record.get('record_id', 'unknown')}")
-                logger.error(f"字段数: {len(fields) if 'fields' in locals() else 0}")
-                import traceback
-                logger.error(traceback.format_exc())
-        
-        conn.commit()
-        conn.close()
-        
-        if errors > 0:
-            logger.warning(f"插入过程中有 {errors} 条记录失败")
-        if updated > 0:
-            logger.info(f"✅ 插入 {inserted} 条新记录，更新 {updated} 条已有记录到光物性数据库")
-        else:
-            logger.info(f"✅ 插入 {inserted} 条光物性记录")
+        return count
     
-    def insert_device_records(self, records: List[Dict]):
+    def insert_device_records(self, records: Iterable[Dict]) -> int:
         """
         插入器件记录
         
         Args:
-            records: 记录列表
+            records: 记录列表或逐条产出记录的迭代器
+            
+        Returns:
+            处理的记录数
         """
-        if not records:
+        count = self._insert_records(
+            self.devices_db, "devices", "device_id", "emitter_compound_id",
+            DEVICES_SCHEMA, records, "器件"
+        )
+        if not count:
             logger.warning("insert_device_records: 记录列表为空")
-            return
+        return count
+    
+    def _insert_records(self, db_path: Path, table: str, id_field: str, compound_field: str,
+                        schema: Dict, records: Iterable[Dict], label: str) -> int:
+        """
+        在一个事务中批量插入记录
         
-        logger.info(f"开始插入 {len(records)} 条器件记录到数据库")
-        conn = sqlite3.connect(str(self.devices_db))
-        cursor = conn.cursor()
+        记录按INSERT_CHUNK_SIZE条分块从迭代器中取出，每块内字段相同的记录合并为一次executemany，
+        上游的生成器因此可以边产出边写入，不必先物化完整列表。
         
+        Args:
+            db_path: 数据库文件路径
+            table: 表名
+            id_field: 主键字段（缺失时由paper_id、paper_local_id和compound_field生成）
+            compound_field: 化合物ID字段
+            schema: 表结构
+            records: 记录列表或迭代器
+            label: 日志中的数据类型名称
+            
+        Returns:
+            处理的记录数（含跳过的记录）
+        """
+        total = 0
+        errors = 0
         inserted = 0
         updated = 0
-        errors = 0
-        
-        for idx, record in enumerate(records):
-            try:
-                # 生成device_id（使用paper_id和paper_local_id确保唯一性）
-                if 'device_id' not in record:
-                    paper_id = record.get('paper_id', 'unknown')
-                    paper_local_id = record.get('paper_local_id', 'unknown')
-                    emitter_compound_id = record.get('emitter_compound_id', 'unknown')
-                    record['device_id'] = f"{paper_id}_{paper_local_id}_{emitter_compound_id}"
-                
-                # 确保paper_id存在
-                if 'paper_id' not in record:
-                    logger.warning(f"记录 {idx} 缺少paper_id，跳过")
-                    errors += 1
-                    continue
+        numbered = enumerate(records)
+        
+        conn = sqlite3.connect(str(db_path))
+        try:
+            while True:
+                chunk = list(islice(numbered, INSERT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                total += len(chunk)
+                # {字段元组: [(记录序号, 记录, 值元组), ...]}
+                batches = {}
                 
-                # 准备插入数据
-                fields = [k for k in DEVICES_SCHEMA.keys() if k in record]
-                if not fields:
-                    logger.warning(f"记录 {idx} 没有有效字段，跳过")
-                    errors += 1
-                    continue
+                for idx, record in chunk:
+                    # 生成主键（使用paper_id和paper_local_id确保唯一性）
+                    if id_field not in record:
+                        paper_id = record.get('paper_id', 'unknown')
+                        paper_local_id = record.get('paper_local_id', 'unknown')
+                        compound_id = record.get(compound_field, 'unknown')
+                        record[id_field] = f"{paper_id}_{paper_local_id}_{compound_id}"
+                    
+                    # 确保paper_id存在
+                    if 'paper_id' not in record:
+                        logger.warning(f"记录 {idx} 缺少paper_id，跳过")
+                        errors += 1
+                        continue
+                    
+                    fields = tuple(k for k in schema if k in record)
+                    if not fields:
+                        logger.warning(f"记录 {idx} 没有有效字段，跳过")
+                        errors += 1
+                        continue
+                    
+                    batches.setdefault(fields, []).append((idx, record, tuple(record[f] for f in fields)))
                 
-                placeholders = ", ".join(["?" for _ in fields])
-                field_names = ", ".join(fields)
-                values = [record[f] for f in fields]
+                # 查询本块中已存在的主键，用于区分新增与更新
+                candidate_ids = list({record[id_field] for rows in batches.values() for _, record, _ in rows})
+                existing = set()
+                if candidate_ids:
+                    placeholders = ", ".join("?" for _ in candidate_ids)
+                    existing.update(
+                        row[0] for row in conn.execute(
+                            f"SELECT {id_field} FROM {table} WHERE {id_field} IN ({placeholders})", candidate_ids
+                        )
+                    )
                 
-                # 检查记录是否已存在
-                cursor.execute("SELECT device_id FROM devices WHERE device_id = ?", (record['device_id'],))
-                exists = cursor.fetchone()
+                ids = []
+                for fields, rows in batches.items():
+                    sql = f"INSERT OR REPLACE INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})"
+                    try:
+                        conn.executemany(sql, [values for _, _, values in rows])
+                        ids.extend(record[id_field] for _, record, _ in rows)
+                    except sqlite3.Error:
+                        # 批量失败时逐条插入，定位并跳过出错的记录
+                        for idx, record, values in rows:
+                            try:
+                                conn.execute(sql, values)
+                                ids.append(record[id_field])
+                            except sqlite3.Error as e:
+                                errors += 1
+                                logger.error(f"插入{label}记录失败 (记录 {idx}): {e}")
+                                logger.error(f"记录ID: {record.get(id_field, 'unknown')}")
+                                logger.error(f"字段数: {len(fields)}")
                 
-                cursor.execute(
-                    f"INSERT OR REPLACE INTO devices ({field_names}) VALUES ({placeholders})",
-                    values
-                )
-                if exists:
-                    updated += 1
-                else:
-                    inserted += 1
-                    
-            except Exception as e:
-                errors += 1
-                logger.error(f"插入器件记录失败 (记录 {idx}): {e}")
-                logger.error(f"记录ID: {record.get('device_id', 'unknown')}")
-                logger.error(f"字段数: {len(fields) if 'fields' in locals() else 0}")
-                import traceback
-                logger.error(traceback.format_exc())
-        
-        conn.commit()
-        conn.close()
-        
+                for record_id in ids:
+                    if record_id in existing:
+                        updated += 1
+                    else:
+                        inserted += 1
+                        existing.add(record_id)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        if not total:
+            return 0
         if errors > 0:
             logger.warning(f"插入过程中有 {errors} 条记录失败")
         if updated > 0:
-            logger.info(f"✅ 插入 {inserted} 条新记录，更新 {updated} 条已有记录到器件数据库")
+            logger.info(f"✅ 插入 {inserted} 条新记录，更新 {updated} 条已有记录到{label}数据库")
         else:
-            logger.info(f"✅ 插入 {inserted} 条器件记录")
+            logger.info(f"✅ 插入 {inserted} 条{label}记录")
+        return total
     
     def export_ml_dataset_delta_est(self, output_path: str, quality_filter: str = "valid"):
         """
@@ -5,13 +5,20 @@
 """
 
 import json
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from dataclasses import dataclass, asdict
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# 保存论文结果时使用的表格/段落字段：(记录键, 对象属性)
+TABLE_RECORD_FIELDS = (('table_id', 'table_id'), ('caption', 'caption'),
+                       ('markdown_table', 'markdown_table'), ('page', 'page_index'))
+PARAGRAPH_RECORD_FIELDS = (('para_id', 'para_id'), ('text', 'text'),
+                           ('section', 'section'), ('page', 'page_index'))
+
 
 @dataclass
 class Table:
@@ -512,6 +519,32 @@ class DocumentParser:
         """获取所有段落"""
         return self.paragraphs
     
+    @staticmethod
+    def _iter_records(items: List, fields: tuple) -> Iterator[Dict]:
+        """按字段表把对象逐个转换为字典（attrgetter一次取出全部属性）"""
+        keys = tuple(key for key, _ in fields)
+        getter = attrgetter(*(attr for _, attr in fields))
+        for item in items:
+            yield dict(zip(keys, getter(item)))
+    
+    def iter_table_records(self) -> Iterator[Dict]:
+        """
+        逐个生成表格记录（table_id, caption, markdown_table, page）
+        
+        Returns:
+            表格记录迭代器，供调用方逐条序列化，不构造完整列表
+        """
+        return self._iter_records(self.tables, TABLE_RECORD_FIELDS)
+    
+    def iter_paragraph_records(self) -> Iterator[Dict]:
+        """
+        逐个生成段落记录（para_id, text, section, page）
+        
+        Returns:
+            段落记录迭代器，供调用方逐条序列化，不构造完整列表
+        """
+        return self._iter_records(self.paragraphs, PARAGRAPH_RECORD_FIELDS)
+    
     def export_to_json(self, output_dir: str, paper_id: str):
         """
         导出解析结果到JSON文件
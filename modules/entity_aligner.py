@@ -7,12 +7,15 @@
 import hashlib
 import sqlite3
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from utils.logger import setup_logger
 from config import DATABASE_DIR, MOLECULES_SCHEMA
 
 logger = setup_logger(__name__)
 
+# IN (...) 查询每批的参数个数
+_IN_CHUNK_SIZE = 500
+
 
 class EntityAligner:
     """实体对齐器 - 建立化合物统一ID体系"""
@@ -88,42 +91,47 @@ class EntityAligner:
         aligned_count = 0
         unaligned_count = 0
         
-        for label in all_labels:
-            # 查找对应的结构
-            smiles = self._find_smiles_for_label(label, structure_data, compound_mapping)
+        # 所有标签在一个事务中写入，循环结束后只提交一次
+        try:
+            for label in all_labels:
+                # 查找对应的结构
+                smiles = self._find_smiles_for_label(label, structure_data, compound_mapping)
             
-            # 查找名称
-            name = compound_mapping.get(label, "") if compound_mapping else ""
+                # 查找名称
+                name = compound_mapping.get(label, "") if compound_mapping else ""
             
-            # 生成compound_id
-            if smiles:
-                compound_id = self._generate_compound_id(smiles)
-            else:
-                compound_id = f"{paper_id}_{label}"
-                unaligned_count += 1
+                # 生成compound_id
+                if smiles:
+                    compound_id = self._generate_compound_id(smiles)
+                else:
+                    compound_id = f"{paper_id}_{label}"
+                    unaligned_count += 1
             
-            # 查找或创建记录
-            cursor.execute("SELECT compound_id FROM molecules WHERE compound_id = ?", (compound_id,))
-            existing = cursor.fetchone()
+                # 查找或创建记录
+                cursor.execute("SELECT compound_id FROM molecules WHERE compound_id = ?", (compound_id,))
+                existing = cursor.fetchone()
             
-            if not existing:
-                # 插入新记录
-                cursor.execute("""
-                    INSERT INTO molecules (compound_id, paper_id, paper_local_id, name, smiles, class, 
-                                         structure_figure_id, global_confidence, source_info)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (compound_id, paper_id, label, name, smiles, None, None, None, None))
-                aligned_count += 1
-            else:
-                # 更新记录（添加新的paper来源）
-                cursor.execute("""
-                    UPDATE molecules 
-                    SET source_info = COALESCE(source_info, '') || '; ' || ?
-                    WHERE compound_id = ?
-                """, (f"{paper_id}:{label}", compound_id))
-        
-        conn.commit()
-        conn.close()
+                if not existing:
+                    # 插入新记录
+                    cursor.execute("""
+                        INSERT INTO molecules (compound_id, paper_id, paper_local_id, name, smiles, class, 
+                                             structure_figure_id, global_confidence, source_info)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (compound_id, paper_id, label, name, smiles, None, None, None, None))
+                    aligned_count += 1
+                else:
+                    # 更新记录（添加新的paper来源）
+                    cursor.execute("""
+                        UPDATE molecules 
+                        SET source_info = COALESCE(source_info, '') || '; ' || ?
+                        WHERE compound_id = ?
+                    """, (f"{paper_id}:{label}", compound_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
         
         stats = {
             "paper_id": paper_id,
@@ -262,6 +270,37 @@ class EntityAligner:
             return row[0]
         return None
     
+    def find_compounds_by_paper_local_ids(self, paper_id: str, paper_local_ids: Iterable) -> Dict[str, str]:
+        """
+        批量根据论文内部ID查找全局compound_id（每500个ID一次IN查询）
+        
+        Args:
+            paper_id: 论文ID
+            paper_local_ids: 论文内部标签
+            
+        Returns:
+            {str(paper_local_id): compound_id}，同一标签有多条记录时取第一条，未找到的标签不在字典中
+        """
+        local_ids = list({str(paper_local_id) for paper_local_id in paper_local_ids})
+        mapping = {}
+        if not local_ids:
+            return mapping
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for i in range(0, len(local_ids), _IN_CHUNK_SIZE):
+                chunk = local_ids[i:i + _IN_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                for paper_local_id, compound_id in conn.execute(
+                    f"SELECT paper_local_id, compound_id FROM molecules "
+                    f"WHERE paper_id = ? AND paper_local_id IN ({placeholders})",
+                    [paper_id, *chunk]
+                ):
+                    mapping.setdefault(str(paper_local_id), compound_id)
+        finally:
+            conn.close()
+        return mapping
+    
     def map_data_to_compounds(self, paper_id: str, data_records: List[Dict],
                              data_type: str) -> Tuple[List[Dict], List[Dict]]:
         """
@@ -278,13 +317,18 @@ class EntityAligner:
         mapped = []
         unmapped = []
         
+        # 一次批量查询所有标签，不再逐条查询
+        local_to_compound = self.find_compounds_by_paper_local_ids(
+            paper_id, (record['paper_local_id'] for record in data_records if record.get('paper_local_id'))
+        )
+        
         for record in data_records:
             paper_local_id = record.get('paper_local_id')
             if not paper_local_id:
                 unmapped.append(record)
                 continue
             
-            compound_id = self.find_compound_by_paper_local_id(paper_id, paper_local_id)
+            compound_id = local_to_compound.get(str(paper_local_id))
             if compound_id:
                 record['compound_id'] = compound_id
                 mapped.append(record)
@@ -4,12 +4,23 @@
 图像分类模块 - 使用Qwen-VL进行图像分类
 """
 
+import re
 import json
+import atexit
 import time
+import io
+import os
 import base64
+import hashlib
+import importlib.util
+import sqlite3
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from utils.logger import setup_logger
 from config import (
     DASHSCOPE_API_KEY,
@@ -18,21 +29,71 @@ from config import (
     MAX_RETRY,
     SLEEP_BETWEEN,
     TIMEOUT_SEC,
-    FIGURE_TYPES
+    FIGURE_TYPES,
+    VL_IMAGE_MAX_EDGE,
+    VL_IMAGE_JPEG_QUALITY,
+    VL_IMAGE_RECOMPRESS_BYTES,
+    IMAGE_CLASSIFICATION_CACHE_PATH
 )
 
 logger = setup_logger(__name__)
 
+# 大图缩放和JPEG编码是CPU密集操作，放到小线程池中执行并限制并发数
+# （Pillow在缩放和编码时释放GIL；用线程而不是进程，避免在多线程进程中fork以及跨进程pickle大图）
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+RECOMPRESS_WORKERS = min(4, os.cpu_count() or 1)
+_recompress_pool = None
+_recompress_pool_lock = threading.Lock()
+
+
+def _recompress_bytes(raw: bytes, max_edge: int, quality: int) -> bytes:
+    """
+    缩放并重新压缩为JPEG（在压缩线程池中执行）
+    
+    Args:
+        raw: 原始图片数据
+        max_edge: 最长边像素
+        quality: JPEG质量
+        
+    Returns:
+        压缩后的图片数据
+    """
+    from PIL import Image
+    
+    with Image.open(io.BytesIO(raw)) as im:
+        im.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.convert('RGB').save(buf, 'JPEG', quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def _get_recompress_pool() -> ThreadPoolExecutor:
+    """获取图片压缩线程池（首次需要压缩时创建）"""
+    global _recompress_pool
+    if _recompress_pool is None:
+        with _recompress_pool_lock:
+            if _recompress_pool is None:
+                _recompress_pool = ThreadPoolExecutor(max_workers=RECOMPRESS_WORKERS,
+                                                      thread_name_prefix="recompress")
+                atexit.register(_recompress_pool.shutdown, wait=False, cancel_futures=True)
+    return _recompress_pool
+
 
 class ImageClassifier:
     """图像分类器 - 使用Qwen-VL"""
     
-    def __init__(self, api_key: str = DASHSCOPE_API_KEY):
+    # 匹配```json代码块的正则（预编译，避免每次解析时重新编译）
+    _JSON_BLOCK_RE = re.compile(r'```json\s*(\{.*?\})\s*```', re.DOTALL)
+    _JSON_ARRAY_BLOCK_RE = re.compile(r'```json\s*(\[.*?\])\s*```', re.DOTALL)
+    
+    def __init__(self, api_key: str = DASHSCOPE_API_KEY,
+                 cache_path: Optional[Path] = IMAGE_CLASSIFICATION_CACHE_PATH):
         """
         初始化图像分类器
         
         Args:
             api_key: API密钥
+            cache_path: 分类结果缓存（sqlite）路径，为None时不缓存
         """
         self.api_key = api_key
         self.headers = {
@@ -40,6 +101,14 @@ class ImageClassifier:
             "Authorization": f"Bearer {api_key}"
         }
         self.system_prompt = self._build_system_prompt()
+        # 复用连接（keep-alive），并发分类时不必每张图重新建立TLS连接
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        # 分类结果缓存 {内容哈希: 分类结果}，多线程共用一个连接
+        self.cache_path = cache_path
+        self._cache_conn = None
+        self._cache_lock = threading.Lock()
     
     def _build_system_prompt(self) -> str:
         """构建系统提示词"""
@@ -70,6 +139,9 @@ class ImageClassifier:
         """
         将图片编码为base64
         
+        超过VL_IMAGE_RECOMPRESS_BYTES的图片会先缩放并转为JPEG，
+        分类结果不受影响，但上传数据量大幅减少。
+        
         Args:
             image_path: 图片路径
             
@@ -78,14 +150,115 @@ class ImageClassifier:
         """
         try:
             with open(image_path, 'rb') as f:
-                return base64.b64encode(f.read()).decode('utf-8')
+                raw = f.read()
+            if len(raw) > VL_IMAGE_RECOMPRESS_BYTES:
+                raw = self._recompress_image(raw, image_path)
+            
+            return base64.b64encode(raw).decode('utf-8')
         except Exception as e:
             logger.error(f"图片编码失败 {image_path}: {e}")
             return None
     
+    def _recompress_image(self, raw: bytes, image_path: str) -> bytes:
+        """
+        缩放并重新压缩为JPEG（Pillow不可用或失败时返回原始数据）
+        
+        Args:
+            raw: 原始图片数据
+            image_path: 图片路径（用于日志）
+            
+        Returns:
+            压缩后的图片数据
+        """
+        if not PIL_AVAILABLE:
+            return raw
+        
+        try:
+            compressed = _get_recompress_pool().submit(
+                _recompress_bytes, raw, VL_IMAGE_MAX_EDGE, VL_IMAGE_JPEG_QUALITY
+            ).result()
+        except Exception as e:
+            logger.warning(f"图片压缩失败，使用原图 {image_path}: {e}")
+            return raw
+        
+        if len(compressed) >= len(raw):
+            return raw
+        logger.debug(f"图片已压缩 {Path(image_path).name}: {len(raw)} -> {len(compressed)} bytes")
+        return compressed
+    
+    def _hash_image(self, image_path: str) -> Optional[str]:
+        """
+        计算图片内容哈希（用于批量去重）
+        
+        Args:
+            image_path: 图片路径
+            
+        Returns:
+            内容哈希（读取失败时返回None）
+        """
+        try:
+            with open(image_path, 'rb') as f:
+                return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        except Exception as e:
+            logger.error(f"读取图片失败 {image_path}: {e}")
+            return None
+    
+    def _cache_connection(self) -> sqlite3.Connection:
+        """获取分类缓存连接（调用方持有_cache_lock）"""
+        if self._cache_conn is None:
+            conn = sqlite3.connect(str(self.cache_path), timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS class_cache (hash TEXT PRIMARY KEY, result TEXT)")
+            conn.commit()
+            self._cache_conn = conn
+        return self._cache_conn
+    
+    def _get_cached(self, image_hash: Optional[str]) -> Optional[Dict]:
+        """
+        查询分类缓存
+        
+        Args:
+            image_hash: 图片内容哈希
+            
+        Returns:
+            缓存的分类结果，未命中或未启用缓存时返回None
+        """
+        if not self.cache_path or not image_hash:
+            return None
+        try:
+            with self._cache_lock:
+                row = self._cache_connection().execute(
+                    "SELECT result FROM class_cache WHERE hash = ?", (image_hash,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  读取分类缓存失败: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+    
+    def _set_cached(self, image_hash: Optional[str], result: Dict) -> None:
+        """
+        写入分类缓存（只缓存成功结果）
+        
+        Args:
+            image_hash: 图片内容哈希
+            result: 分类结果
+        """
+        if not self.cache_path or not image_hash or not result:
+            return
+        try:
+            with self._cache_lock:
+                conn = self._cache_connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO class_cache (hash, result) VALUES (?, ?)",
+                    (image_hash, json.dumps(result, ensure_ascii=False))
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  写入分类缓存失败: {e}")
+    
     def classify_image(self, image_path: str) -> Optional[Dict]:
         """
-        分类单张图片
+        分类单张图片（相同内容的图片直接返回缓存结果）
         
         Args:
             image_path: 图片路径
@@ -97,6 +270,26 @@ class ImageClassifier:
             logger.error(f"图片不存在: {image_path}")
             return None
         
+        image_hash = self._hash_image(image_path) if self.cache_path else None
+        cached = self._get_cached(image_hash)
+        if cached:
+            logger.info(f"✅ 图片分类命中缓存: {Path(image_path).name} -> {cached.get('figure_type')}")
+            return cached
+        
+        classification = self._classify_image_uncached(image_path)
+        self._set_cached(image_hash, classification)
+        return classification
+    
+    def _classify_image_uncached(self, image_path: str) -> Optional[Dict]:
+        """
+        请求API分类单张图片
+        
+        Args:
+            image_path: 图片路径
+            
+        Returns:
+            分类结果字典
+        """
         # 对于Qwen-VL，我们使用multimodal API
         # 注意：实际使用时需要根据具体的API格式调整
         image_base64 = self._encode_image(image_path)
@@ -105,48 +298,23 @@ class ImageClassifier:
         
         user_message = "请对这张图片进行分类，并按照指定的JSON格式输出结果。"
         
+        user_content = [
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{image_base64}"
+                }
+            },
+            {
+                "type": "text",
+                "text": user_message
+            }
+        ]
+        
         for attempt in range(MAX_RETRY):
             try:
-                # 构建请求数据 - 适配Qwen多模态格式
-                payload = {
-                    "model": "qwen-vl-plus",  # 或 qwen-vl-max
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": self.system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{image_base64}"
-                                    }
-                                },
-                                {
-                                    "type": "text",
-                                    "text": user_message
-                                }
-                            ]
-                        }
-                    ],
-                    "temperature": TEMPERATURE,
-                }
-                
-                response = requests.post(
-                    QWEN_CHAT_ENDPOINT,
-                    headers=self.headers,
-                    json=payload,
-                    timeout=TIMEOUT_SEC
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    # 提取回复内容
-                    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    
+                content = self._request_completion(user_content)
+                if content is not None:
                     # 解析JSON
                     classification = self._parse_response(content)
                     if classification:
@@ -154,8 +322,6 @@ class ImageClassifier:
                         return classification
                     else:
                         logger.warning(f"无法解析分类结果: {content}")
-                else:
-                    logger.warning(f"API请求失败 ({response.status_code}): {response.text}")
                 
             except Exception as e:
                 logger.error(f"分类图片出错 (尝试 {attempt+1}/{MAX_RETRY}): {e}")
@@ -166,6 +332,125 @@ class ImageClassifier:
         logger.error(f"图片分类失败: {image_path}")
         return None
     
+    def _request_completion(self, user_content: List[Dict]) -> Optional[str]:
+        """
+        发送一次多模态请求
+        
+        Args:
+            user_content: 用户消息内容（图片与文本片段列表）
+            
+        Returns:
+            模型回复文本，请求失败时返回None
+        """
+        # 构建请求数据 - 适配Qwen多模态格式
+        payload = {
+            "model": "qwen-vl-plus",  # 或 qwen-vl-max
+            "messages": [
+                {
+                    "role": "system",
+                    "content": self.system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": user_content
+                }
+            ],
+            "temperature": TEMPERATURE,
+        }
+        
+        response = self.session.post(
+            QWEN_CHAT_ENDPOINT,
+            json=payload,
+            timeout=TIMEOUT_SEC
+        )
+        
+        if response.status_code != 200:
+            logger.warning(f"API请求失败 ({response.status_code}): {response.text}")
+            return None
+        
+        result = response.json()
+        # 提取回复内容
+        return result.get("choices", [{}])[0].get("message", {}).get("content", "")
+    
+    def classify_group(self, image_paths: List[str]) -> Optional[List[Dict]]:
+        """
+        在一次请求中分类多张图片（命中缓存的图片不再发送）
+        
+        Args:
+            image_paths: 图片路径列表
+            
+        Returns:
+            与输入顺序一致的分类结果列表，失败时返回None
+        """
+        if not self.cache_path:
+            return self._classify_group_uncached(image_paths)
+        
+        hashes = [self._hash_image(p) if Path(p).exists() else None for p in image_paths]
+        results = [self._get_cached(h) for h in hashes]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if len(misses) < len(image_paths):
+            logger.info(f"✅ 分类缓存命中 {len(image_paths) - len(misses)}/{len(image_paths)} 张图片")
+        if misses:
+            if len(misses) == 1:
+                # 只剩一张时按单图格式请求
+                classification = self._classify_image_uncached(image_paths[misses[0]])
+                classifications = [classification] if classification else None
+            else:
+                classifications = self._classify_group_uncached([image_paths[i] for i in misses])
+            if classifications is None:
+                return None
+            for i, classification in zip(misses, classifications):
+                results[i] = classification
+                self._set_cached(hashes[i], classification)
+        return results
+    
+    def _classify_group_uncached(self, image_paths: List[str]) -> Optional[List[Dict]]:
+        """
+        请求API在一次请求中分类多张图片
+        
+        Args:
+            image_paths: 图片路径列表
+            
+        Returns:
+            与输入顺序一致的分类结果列表，失败时返回None
+        """
+        user_content = []
+        for i, image_path in enumerate(image_paths, 1):
+            image_base64 = self._encode_image(image_path) if Path(image_path).exists() else None
+            if not image_base64:
+                return None
+            user_content.append({"type": "text", "text": f"Image {i}:"})
+            user_content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}
+            })
+        
+        user_content.append({
+            "type": "text",
+            "text": (
+                f"请按顺序对以上{len(image_paths)}张图片分别进行分类，"
+                f"输出一个包含{len(image_paths)}个元素的JSON数组，每个元素使用指定的JSON格式。"
+            )
+        })
+        
+        for attempt in range(MAX_RETRY):
+            try:
+                content = self._request_completion(user_content)
+                if content is not None:
+                    classifications = self._parse_batch_response(content, len(image_paths))
+                    if classifications:
+                        for image_path, classification in zip(image_paths, classifications):
+                            logger.info(f"✅ 图片分类成功: {Path(image_path).name} -> {classification['figure_type']}")
+                        return classifications
+                    logger.warning(f"无法解析批量分类结果: {content}")
+            except Exception as e:
+                logger.error(f"批量分类出错 (尝试 {attempt+1}/{MAX_RETRY}): {e}")
+            
+            if attempt < MAX_RETRY - 1:
+                time.sleep(SLEEP_BETWEEN)
+        
+        return None
+    
     def _parse_response(self, content: str) -> Optional[Dict]:
         """
         解析LLM响应内容
@@ -189,24 +474,59 @@ class ImageClassifier:
                 return result
         except json.JSONDecodeError:
             # 尝试提取JSON代码块
-            import re
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', content, re.DOTALL)
+            json_match = self._JSON_BLOCK_RE.search(content)
             if json_match:
                 try:
                     result = json.loads(json_match.group(1))
                     if "figure_type" in result and "is_molecular_structure" in result:
                         return result
-                except:
+                except json.JSONDecodeError:
                     pass
         
         return None
     
-    def classify_batch(self, image_paths: list) -> Dict[str, Dict]:
+    def _parse_batch_response(self, content: str, expected: int) -> Optional[List[Dict]]:
+        """
+        解析多图请求的JSON数组响应
+        
+        Args:
+            content: 响应内容
+            expected: 期望的结果数量
+            
+        Returns:
+            分类结果列表，数量或格式不符时返回None
+        """
+        try:
+            results = json.loads(content)
+        except json.JSONDecodeError:
+            json_match = self._JSON_ARRAY_BLOCK_RE.search(content)
+            if not json_match:
+                return None
+            try:
+                results = json.loads(json_match.group(1))
+            except json.JSONDecodeError:
+                return None
+        
+        if not isinstance(results, list) or len(results) != expected:
+            return None
+        
+        for result in results:
+            if not isinstance(result, dict):
+                return None
+            if "figure_type" not in result or "is_molecular_structure" not in result:
+                return None
+            if result["figure_type"] not in FIGURE_TYPES:
+                logger.warning(f"无效的figure_type: {result['figure_type']}")
+                return None
+        return results
+    
+    def classify_batch(self, image_paths: List[str], images_per_request: int = 4) -> Dict[str, Dict]:
         """
         批量分类图片
         
         Args:
             image_paths: 图片路径列表
+            images_per_request: 每次请求打包的图片数量
             
         Returns:
             分类结果字典 {image_path: classification_result}
@@ -216,20 +536,43 @@ class ImageClassifier:
         
         logger.info(f"开始批量分类 {total} 张图片")
         
-        for i, image_path in enumerate(image_paths, 1):
-            logger.info(f"处理进度: {i}/{total}")
-            result = self.classify_image(image_path)
-            if result:
-                results[image_path] = result
+        # 按内容哈希分组，相同内容的图片只请求一次
+        groups = defaultdict(list)
+        for image_path in image_paths:
+            groups[self._hash_image(image_path) or image_path].append(image_path)
+        
+        if len(groups) < total:
+            logger.info(f"检测到重复图片，实际需要分类 {len(groups)} 张")
+        
+        group_list = list(groups.values())
+        chunk_size = max(1, images_per_request)
+        chunks = [group_list[i:i + chunk_size] for i in range(0, len(group_list), chunk_size)]
+        
+        for i, chunk in enumerate(chunks, 1):
+            logger.info(f"处理进度: {i}/{len(chunks)}")
+            representatives = [members[0] for members in chunk]
+            
+            classifications = None
+            if len(representatives) > 1:
+                classifications = self.classify_group(representatives)
+                if classifications is None:
+                    logger.warning("批量分类失败，回退为逐张分类")
+            if classifications is None:
+                classifications = [self.classify_image(p) for p in representatives]
+            
+            for members, result in zip(chunk, classifications):
+                if result:
+                    for image_path in members:
+                        results[image_path] = result
             
             # 避免请求过快
-            if i < total:
+            if i < len(chunks):
                 time.sleep(0.5)
         
         logger.info(f"✅ 批量分类完成: {len(results)}/{total} 成功")
         return results
     
-    def save_results(self, results: Dict[str, Dict], output_path: str):
+    def save_results(self, results: Dict[str, Dict], output_path: str) -> None:
         """
         保存分类结果
         
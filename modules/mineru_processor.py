@@ -10,6 +10,7 @@ import json
 import zipfile
 import requests
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from utils.logger import setup_logger
 
@@ -115,32 +116,57 @@ class MinerUProcessor:
         Returns:
             提取结果列表
         """
-        url = f"{self.base_url}/extract-results/batch/{batch_id}"
+        return self.wait_for_batch_results([batch_id], max_wait).get(batch_id)
+    
+    def wait_for_batch_results(self, batch_ids: List[str], max_wait: int = 3600) -> Dict[str, List[Dict]]:
+        """
+        同时等待多个批量任务完成
+        
+        所有批次在同一轮询循环中查询，共享一个HTTP连接池，
+        每轮只休眠一次，多个批次的等待时间可以重叠。
+        
+        Args:
+            batch_ids: 批次ID列表
+            max_wait: 最大等待时间（秒）
+            
+        Returns:
+            已完成批次的结果字典 {batch_id: 提取结果列表}
+        """
+        finished = {}
+        pending = list(batch_ids)
         start = time.time()
         
-        while time.time() - start < max_wait:
-            try:
-                resp = requests.get(url, headers=self.headers, timeout=30)
-                if resp.status_code == 200:
-                    result = resp.json()
-                    if result.get("code") == 0:
-                        extract_results = result["data"]["extract_result"]
-                        states = [f"{r['file_name']}={r['state']}" for r in extract_results]
-                        logger.info(f"进度: {', '.join(states)}")
-                        
-                        if all(r['state'] in ['done', 'failed'] for r in extract_results):
-                            success_count = sum(1 for r in extract_results if r['state'] == 'done')
-                            logger.info(f"✅ 批次完成: {success_count}/{len(extract_results)} 成功")
-                            return extract_results
-                else:
-                    logger.warning(f"查询失败: {resp.status_code}")
-            except Exception as e:
-                logger.error(f"查询出错: {e}")
+        with requests.Session() as session:
+            session.headers.update(self.headers)
             
-            time.sleep(15)
+            while pending and time.time() - start < max_wait:
+                for batch_id in list(pending):
+                    url = f"{self.base_url}/extract-results/batch/{batch_id}"
+                    try:
+                        resp = session.get(url, timeout=30)
+                        if resp.status_code == 200:
+                            result = resp.json()
+                            if result.get("code") == 0:
+                                extract_results = result["data"]["extract_result"]
+                                states = [f"{r['file_name']}={r['state']}" for r in extract_results]
+                                logger.info(f"进度 [{batch_id}]: {', '.join(states)}")
+                                
+                                if all(r['state'] in ['done', 'failed'] for r in extract_results):
+                                    success_count = sum(1 for r in extract_results if r['state'] == 'done')
+                                    logger.info(f"✅ 批次 {batch_id} 完成: {success_count}/{len(extract_results)} 成功")
+                                    finished[batch_id] = extract_results
+                                    pending.remove(batch_id)
+                        else:
+                            logger.warning(f"查询失败 [{batch_id}]: {resp.status_code}")
+                    except Exception as e:
+                        logger.error(f"查询出错 [{batch_id}]: {e}")
+                
+                if pending:
+                    time.sleep(15)
         
-        logger.error("等待超时")
-        return None
+        if pending:
+            logger.error(f"等待超时: {', '.join(pending)}")
+        return finished
     
     def download_and_extract(self, result: Dict, output_dir: str) -> Optional[str]:
         """
@@ -177,8 +203,7 @@ class MinerUProcessor:
             
             # 解压
             extract_dir = Path(output_dir) / Path(file_name).stem
-            with zipfile.ZipFile(zip_path, "r") as zf:
-                zf.extractall(extract_dir)
+            self._extract_zip(zip_path, extract_dir)
             
             # 删除临时ZIP文件
             zip_path.unlink()
@@ -190,6 +215,59 @@ class MinerUProcessor:
             logger.error(f"下载解压失败: {e}")
             return None
     
+    def _extract_zip(self, zip_path: Path, extract_dir: Path, max_workers: int = None):
+        """
+        多线程解压ZIP文件（zlib解压时会释放GIL）
+        
+        Args:
+            zip_path: ZIP文件路径
+            extract_dir: 解压目录
+            max_workers: 最大线程数，默认使用CPU核数
+        """
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            members = zf.infolist()
+            
+            # 先串行创建目录，避免多线程同时创建同一目录时冲突
+            for member in members:
+                target = self._member_target(extract_dir, member)
+                (target if member.is_dir() else target.parent).mkdir(parents=True, exist_ok=True)
+            
+            files = [m for m in members if not m.is_dir()]
+            if len(files) <= 1:
+                zf.extractall(extract_dir)
+                return
+            
+            workers = min(max_workers or os.cpu_count() or 4, len(files))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda m: zf.extract(m, extract_dir), files))
+    
+    @staticmethod
+    def _member_target(extract_dir: Path, member: zipfile.ZipInfo) -> Path:
+        """
+        计算ZIP成员的解压路径（与 ZipFile._extract_member 相同的清理规则）
+        
+        Args:
+            extract_dir: 解压目录
+            member: ZIP成员
+            
+        Returns:
+            解压目录内的目标路径
+            
+        Raises:
+            ValueError: 成员路径清理后仍指向解压目录之外
+        """
+        arcname = member.filename.replace('/', os.path.sep)
+        if os.path.altsep:
+            arcname = arcname.replace(os.path.altsep, os.path.sep)
+        # 去掉盘符和开头的分隔符，丢弃空段、"."和".."
+        arcname = os.path.splitdrive(arcname)[1]
+        parts = [x for x in arcname.split(os.path.sep) if x not in ('', os.path.curdir, os.path.pardir)]
+        root = extract_dir.resolve()
+        target = root.joinpath(*parts).resolve()
+        if target != root and root not in target.parents:
+            raise ValueError(f"ZIP成员路径越出解压目录: {member.filename}")
+        return target
+    
     def parse_pdfs(self, pdf_files: List[str], output_dir: str) -> List[str]:
         """
         处理多个PDF文件
@@ -248,41 +326,54 @@ class MinerUProcessor:
         Returns:
             JSON文件路径
         """
-        extract_path = Path(extract_dir)
+        extract_dir = str(extract_dir)
         
-        if not extract_path.exists():
+        if not os.path.isdir(extract_dir):
             logger.error(f"目录不存在: {extract_dir}")
             return None
         
         # 优先查找layout.json（MinerU的标准输出）
-        layout_json = extract_path / "layout.json"
-        if layout_json.exists():
+        layout_json = os.path.join(extract_dir, "layout.json")
+        if os.path.isfile(layout_json):
             logger.info(f"找到layout.json: {layout_json}")
-            return str(layout_json)
+            return layout_json
         
         # 查找auto目录下的JSON文件
-        auto_dir = extract_path / "auto"
-        if auto_dir.exists():
-            json_files = list(auto_dir.glob("*.json"))
+        auto_dir = os.path.join(extract_dir, "auto")
+        if os.path.isdir(auto_dir):
+            json_files = self._scan_json_files(auto_dir)
             if json_files:
                 logger.info(f"在auto目录找到JSON: {json_files[0]}")
-                return str(json_files[0])
+                return json_files[0]
         
         # 直接在根目录查找所有JSON文件
-        json_files = list(extract_path.glob("*.json"))
+        json_files = self._scan_json_files(extract_dir)
         if json_files:
             # 优先选择layout.json或model.json
             for json_file in json_files:
-                if json_file.name in ['layout.json', 'model.json']:
+                if os.path.basename(json_file) in ['layout.json', 'model.json']:
                     logger.info(f"找到JSON文件: {json_file}")
-                    return str(json_file)
+                    return json_file
             # 否则返回第一个
             logger.info(f"找到JSON文件: {json_files[0]}")
-            return str(json_files[0])
+            return json_files[0]
         
-        logger.warning(f"未在 {extract_dir} 中找到JSON文件，目录内容: {[f.name for f in extract_path.iterdir()]}")
+        logger.warning(f"未在 {extract_dir} 中找到JSON文件，目录内容: {os.listdir(extract_dir)}")
         return None
     
+    def _scan_json_files(self, directory: str) -> List[str]:
+        """
+        单次scandir列出目录下的JSON文件
+        
+        Args:
+            directory: 目录路径
+            
+        Returns:
+            JSON文件路径列表
+        """
+        with os.scandir(directory) as it:
+            return [entry.path for entry in it if entry.name.endswith(".json") and entry.is_file()]
+    
     def get_images_dir(self, extract_dir: str) -> Optional[str]:
         """
         获取解压目录中的图片目录
@@ -293,18 +384,17 @@ class MinerUProcessor:
         Returns:
             图片目录路径
         """
-        extract_path = Path(extract_dir)
+        extract_dir = str(extract_dir)
         
         # 查找auto目录下的images目录
-        auto_images = extract_path / "auto" / "images"
-        if auto_images.exists() and auto_images.is_dir():
-            return str(auto_images)
+        auto_images = os.path.join(extract_dir, "auto", "images")
+        if os.path.isdir(auto_images):
+            return auto_images
         
         # 查找根目录下的images目录
-        images_dir = extract_path / "images"
-        if images_dir.exists() and images_dir.is_dir():
-            return str(images_dir)
+        images_dir = os.path.join(extract_dir, "images")
+        if os.path.isdir(images_dir):
+            return images_dir
         
         logger.warning(f"未在 {extract_dir} 中找到images目录")
         return None
-
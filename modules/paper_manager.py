@@ -28,7 +28,7 @@ class PaperManager:
         self.db_path = db_path
         self._init_database()
     
-    def _init_database(self):
+    def _init_database(self) -> None:
         """初始化数据库"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -114,16 +114,17 @@ class PaperManager:
             论文数据列表
         """
         conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
+        # 直接用原始元组+列名构建字典，比sqlite3.Row逐行转换更快
         cursor.execute("SELECT * FROM papers ORDER BY year DESC, paper_id")
+        cols = [d[0] for d in cursor.description]
         rows = cursor.fetchall()
         conn.close()
         
-        return [dict(row) for row in rows]
+        return [dict(zip(cols, row)) for row in rows]
     
-    def update_paper(self, paper_id: str, updates: Dict):
+    def update_paper(self, paper_id: str, updates: Dict) -> None:
         """
         更新论文记录
         
@@ -150,7 +151,7 @@ class PaperManager:
         finally:
             conn.close()
     
-    def delete_paper(self, paper_id: str):
+    def delete_paper(self, paper_id: str) -> None:
         """
         删除论文记录
         
@@ -170,15 +171,33 @@ class PaperManager:
         finally:
             conn.close()
     
-    def export_to_json(self, output_path: str):
+    def export_to_json(self, output_path: str, batch_size: int = 500) -> None:
         """
         导出论文数据到JSON
         
+        直接以数据库为数据源，按批读取并逐条写出，不把全表载入内存；
+        输出格式与 json.dump(list_papers(), indent=2) 一致。
+        
         Args:
             output_path: 输出文件路径
+            batch_size: 每批从数据库读取的行数
         """
-        papers = self.list_papers()
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(papers, f, indent=2, ensure_ascii=False)
-        logger.info(f"✅ 导出 {len(papers)} 篇论文到 {output_path}")
-
+        conn = sqlite3.connect(self.db_path)
+        count = 0
+        try:
+            cursor = conn.execute("SELECT * FROM papers ORDER BY year DESC, paper_id")
+            cols = [d[0] for d in cursor.description]
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write("[")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        item = json.dumps(dict(zip(cols, row)), indent=2, ensure_ascii=False)
+                        f.write(("," if count else "") + "\n  " + item.replace("\n", "\n  "))
+                        count += 1
+                f.write("\n]" if count else "]")
+        finally:
+            conn.close()
+        logger.info(f"✅ 导出 {count} 篇论文到 {output_path}")
@@ -4,11 +4,25 @@
 质量控制与校验模块
 """
 
+import re
 import json
 import time
+import hashlib
+import random
+import numbers
+import threading
 import requests
-from typing import Dict, List, Tuple
+import numpy as np
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from functools import lru_cache
+from itertools import islice
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from utils.logger import setup_logger
+from utils.smiles_utils import parse_and_score_smiles, RDKIT_AVAILABLE
+from utils.json_utils import json_dumps, json_loads, json_dump_file, json_load_file, JSONDecodeError
 from config import (
     LAMBDA_RANGE,
     FWHM_RANGE,
@@ -21,11 +35,64 @@ from config import (
     TEMPERATURE,
     MAX_RETRY,
     SLEEP_BETWEEN,
-    TIMEOUT_SEC
+    TIMEOUT_SEC,
+    LLM_CONCURRENCY,
+    LLM_RATE_LIMIT_PER_SEC
 )
 
 logger = setup_logger(__name__)
 
+_INF = float("inf")
+
+# 数值校验表：(字段, 下限, 上限, 问题描述模板, 是否判为invalid)
+# 超出[下限, 上限]即记录问题；单边检查用±inf表示，只比较适用的一侧（NaN不报问题），
+# 双边范围检查中NaN视为越界
+_PHOTOPHYSICAL_CHECKS = (
+    ("lambda_PL_nm", LAMBDA_RANGE[0], LAMBDA_RANGE[1], f"lambda_PL_nm={{}} 超出合理范围 {LAMBDA_RANGE}", True),
+    ("lambda_em_nm", LAMBDA_RANGE[0], LAMBDA_RANGE[1], f"lambda_em_nm={{}} 超出合理范围 {LAMBDA_RANGE}", True),
+    ("FWHM_nm", FWHM_RANGE[0], FWHM_RANGE[1], f"FWHM_nm={{}} 超出合理范围 {FWHM_RANGE}", True),
+    ("Delta_EST_eV", 0, _INF, "Delta_EST_eV={} 为负值，不合理", True),
+    ("Delta_EST_eV", -_INF, 1.0, "Delta_EST_eV={} > 1.0 eV，可能不是TADF材料，需确认", False),
+    ("Phi_PL", PHI_PL_RANGE[0], PHI_PL_RANGE[1], f"Phi_PL={{}} 超出范围 {PHI_PL_RANGE}", True),
+    ("tau_prompt_ns", 0, _INF, "tau_prompt_ns={} 为负值", True),
+    ("tau_delayed_us", 0, _INF, "tau_delayed_us={} 为负值", True),
+)
+
+_DEVICE_CHECKS = (
+    ("lambda_EL_nm", LAMBDA_RANGE[0], LAMBDA_RANGE[1], f"lambda_EL_nm={{}} 超出合理范围 {LAMBDA_RANGE}", True),
+    ("EQE_max_percent", EQE_RANGE[0], EQE_RANGE[1], f"EQE_max_percent={{}} 超出范围 {EQE_RANGE}", True),
+    ("CIE_x", 0, 1, "CIE_x={} 超出范围 [0, 1]", True),
+    ("CIE_y", 0, 1, "CIE_y={} 超出范围 [0, 1]", True),
+    ("L_max_cd_m2", 0, _INF, "L_max_cd_m2={} 为负值", True),
+)
+
+_QUALITY_FLAGS = ("valid", "suspect", "invalid")
+
+# 流式验证时每块的记录数
+VALIDATE_CHUNK_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def _compile_checks(checks: Tuple) -> Tuple[Tuple[str, ...], np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+                                            np.ndarray]:
+    """
+    将校验表编译为向量化所需的数组
+    
+    Args:
+        checks: 数值校验表
+        
+    Returns:
+        (字段列表, 每条规则对应的字段列下标, 下限数组, 上限数组, 严重程度数组 1=suspect/2=invalid,
+         是否为双边范围检查的布尔数组)
+    """
+    keys = tuple(dict.fromkeys(check[0] for check in checks))
+    check_columns = np.array([keys.index(check[0]) for check in checks], dtype=np.intp)
+    lo = np.array([check[1] for check in checks], dtype=np.float64)
+    hi = np.array([check[2] for check in checks], dtype=np.float64)
+    severity = np.array([2 if check[4] else 1 for check in checks], dtype=np.int8)
+    two_sided = np.isfinite(lo) & np.isfinite(hi)
+    return keys, check_columns, lo, hi, severity, two_sided
+
 
 class QualityController:
     """质量控制器 - 自动规则校验"""
@@ -70,114 +137,72 @@ class QualityController:
             }
         }
     
-    def validate_photophysical_record(self, record: Dict) -> Tuple[str, List[str]]:
+    def _validate_record(self, record: Dict, checks: Tuple) -> Tuple[str, List[str]]:
         """
-        验证光物性记录
+        按校验表逐字段验证单条记录
         
         Args:
-            record: 光物性数据记录
+            record: 数据记录
+            checks: 数值校验表
             
         Returns:
             (质量标记, 问题列表)
         """
         issues = []
-        
-        # 检查波长
-        lambda_pl = record.get("lambda_PL_nm")
-        if lambda_pl is not None:
-            if not (LAMBDA_RANGE[0] <= lambda_pl <= LAMBDA_RANGE[1]):
-                issues.append(f"lambda_PL_nm={lambda_pl} 超出合理范围 {LAMBDA_RANGE}")
-        
-        lambda_em = record.get("lambda_em_nm")
-        if lambda_em is not None:
-            if not (LAMBDA_RANGE[0] <= lambda_em <= LAMBDA_RANGE[1]):
-                issues.append(f"lambda_em_nm={lambda_em} 超出合理范围 {LAMBDA_RANGE}")
-        
-        # 检查FWHM
-        fwhm = record.get("FWHM_nm")
-        if fwhm is not None:
-            if not (FWHM_RANGE[0] <= fwhm <= FWHM_RANGE[1]):
-                issues.append(f"FWHM_nm={fwhm} 超出合理范围 {FWHM_RANGE}")
-        
-        # 检查ΔE_ST
-        delta_est = record.get("Delta_EST_eV")
-        if delta_est is not None:
-            if delta_est < 0:
-                issues.append(f"Delta_EST_eV={delta_est} 为负值，不合理")
-            elif delta_est > 1.0:
-                issues.append(f"Delta_EST_eV={delta_est} > 1.0 eV，可能不是TADF材料，需确认")
-        
-        # 检查量子产率
-        phi_pl = record.get("Phi_PL")
-        if phi_pl is not None:
-            if not (PHI_PL_RANGE[0] <= phi_pl <= PHI_PL_RANGE[1]):
-                issues.append(f"Phi_PL={phi_pl} 超出范围 {PHI_PL_RANGE}")
-        
-        # 检查寿命数值是否合理
-        tau_prompt = record.get("tau_prompt_ns")
-        if tau_prompt is not None and tau_prompt < 0:
-            issues.append(f"tau_prompt_ns={tau_prompt} 为负值")
-        
-        tau_delayed = record.get("tau_delayed_us")
-        if tau_delayed is not None and tau_delayed < 0:
-            issues.append(f"tau_delayed_us={tau_delayed} 为负值")
+        append = issues.append
+        get = record.get
+        has_invalid = False
+        has_suspect = False
+        
+        for key, lo, hi, template, is_invalid in checks:
+            value = get(key)
+            if value is None:
+                continue
+            if hi == _INF:
+                out_of_range = value < lo
+            elif lo == -_INF:
+                out_of_range = value > hi
+            else:
+                out_of_range = not (lo <= value <= hi)
+            if out_of_range:
+                append(template.format(value))
+                if is_invalid:
+                    has_invalid = True
+                else:
+                    has_suspect = True
         
         # 确定质量标记
-        if len(issues) == 0:
-            quality_flag = "valid"
-        elif any("超出" in issue or "为负值" in issue for issue in issues):
-            quality_flag = "invalid"
-        else:
-            quality_flag = "suspect"
+        quality_flag = "invalid" if has_invalid else ("suspect" if has_suspect else "valid")
         
         return quality_flag, issues
     
+    def validate_photophysical_record(self, record: Dict) -> Tuple[str, List[str]]:
+        """
+        验证光物性记录
+        
+        检查波长、FWHM、ΔE_ST、量子产率及寿命是否在合理范围内
+        
+        Args:
+            record: 光物性数据记录
+            
+        Returns:
+            (质量标记, 问题列表)
+        """
+        return self._validate_record(record, _PHOTOPHYSICAL_CHECKS)
+    
     def validate_device_record(self, record: Dict) -> Tuple[str, List[str]]:
         """
         验证器件记录
         
+        检查EL波长、EQE、CIE坐标及亮度是否在合理范围内
+        
         Args:
             record: 器件数据记录
             
         Returns:
             (质量标记, 问题列表)
         """
-        issues = []
-        
-        # 检查EL波长
-        lambda_el = record.get("lambda_EL_nm")
-        if lambda_el is not None:
-            if not (LAMBDA_RANGE[0] <= lambda_el <= LAMBDA_RANGE[1]):
-                issues.append(f"lambda_EL_nm={lambda_el} 超出合理范围 {LAMBDA_RANGE}")
-        
-        # 检查EQE
-        eqe_max = record.get("EQE_max_percent")
-        if eqe_max is not None:
-            if not (EQE_RANGE[0] <= eqe_max <= EQE_RANGE[1]):
-                issues.append(f"EQE_max_percent={eqe_max} 超出范围 {EQE_RANGE}")
-        
-        # 检查CIE坐标
-        cie_x = record.get("CIE_x")
-        cie_y = record.get("CIE_y")
-        if cie_x is not None and not (0 <= cie_x <= 1):
-            issues.append(f"CIE_x={cie_x} 超出范围 [0, 1]")
-        if cie_y is not None and not (0 <= cie_y <= 1):
-            issues.append(f"CIE_y={cie_y} 超出范围 [0, 1]")
-        
-        # 检查亮度
-        l_max = record.get("L_max_cd_m2")
-        if l_max is not None and l_max < 0:
-            issues.append(f"L_max_cd_m2={l_max} 为负值")
-        
-        # 确定质量标记
-        if len(issues) == 0:
-            quality_flag = "valid"
-        elif any("超出" in issue or "为负值" in issue for issue in issues):
-            quality_flag = "invalid"
-        else:
-            quality_flag = "suspect"
-        
-        return quality_flag, issues
+        return self._validate_record(record, _DEVICE_CHECKS)
     
     def validate_smiles(self, smiles: str) -> Tuple[bool, str]:
         """
@@ -192,65 +217,131 @@ class QualityController:
         if not smiles:
             return False, "Empty SMILES"
         
-        try:
-            from rdkit import Chem
-            from rdkit.Chem import Descriptors
-            
-            mol = Chem.MolFromSmiles(smiles)
-            if mol is None:
-                return False, "Cannot parse SMILES"
-            
-            # 检查分子量（TADF材料通常不会太小或太大）
-            mw = Descriptors.MolWt(mol)
-            if mw < 100:
-                return False, f"Molecular weight too small: {mw:.1f}"
-            elif mw > 2000:
-                return False, f"Molecular weight too large: {mw:.1f}"
-            
-            # 检查原子数
-            num_atoms = mol.GetNumAtoms()
-            if num_atoms < 10:
-                return False, f"Too few atoms: {num_atoms}"
-            
-            return True, ""
-            
-        except ImportError:
+        if not RDKIT_AVAILABLE:
             logger.warning("RDKit未安装，跳过详细验证")
             return True, ""
-        except Exception as e:
-            return False, f"Validation error: {str(e)}"
+        
+        parsed, error_msg, mw, num_atoms = parse_and_score_smiles(smiles)
+        if error_msg:
+            return False, error_msg
+        if not parsed:
+            return False, "Cannot parse SMILES"
+        
+        # 检查分子量（TADF材料通常不会太小或太大）
+        if mw < 100:
+            return False, f"Molecular weight too small: {mw:.1f}"
+        elif mw > 2000:
+            return False, f"Molecular weight too large: {mw:.1f}"
+        
+        # 检查原子数
+        if num_atoms < 10:
+            return False, f"Too few atoms: {num_atoms}"
+        
+        return True, ""
     
-    def batch_validate_photophysical(self, records: List[Dict]) -> List[Dict]:
+    def _vectorized_validate(self, records: List[Dict], checks: Tuple) -> Tuple[np.ndarray, List[List[str]]]:
         """
-        批量验证光物性记录
+        按列向量化执行数值校验
+        
+        记录转为 (N, K) 的float64矩阵（每列对应一条校验规则），
+        与上下限向量一次广播比较得到 (N, K) 的越界掩码，
+        只有越界的单元才在Python层格式化问题描述。
+        结果与逐条校验一致：缺失值(None)跳过，双边范围检查中NaN视为越界。
         
         Args:
             records: 记录列表
+            checks: 数值校验表
             
         Returns:
-            添加了质量标记的记录列表
+            (质量标记编码数组 0=valid/1=suspect/2=invalid, 每条记录的问题列表)
+            
+        Raises:
+            TypeError: 存在非数值字段（包括"450"这类数字字符串，不做隐式转换）
         """
-        logger.info(f"开始批量验证 {len(records)} 条光物性记录")
-        
-        valid_count = 0
-        suspect_count = 0
-        invalid_count = 0
+        keys, check_columns, lo, hi, severity, two_sided = _compile_checks(checks)
+        
+        n = len(records)
+        values = np.empty((n, len(keys)), dtype=np.float64)
+        missing = np.zeros((n, len(keys)), dtype=bool)
+        for j, key in enumerate(keys):
+            column = [r.get(key) for r in records]
+            for i, v in enumerate(column):
+                if v is None:
+                    missing[i, j] = True
+                    column[i] = np.nan
+                elif not isinstance(v, numbers.Real):
+                    raise TypeError(f"{key}={v!r} 不是数值")
+            values[:, j] = column
+        
+        # 原地比较/合并，整个校验只分配少量 (N, K) 布尔数组
+        matrix = values[:, check_columns]
+        issue_mask = np.less(matrix, lo)
+        scratch = np.greater(matrix, hi)
+        np.logical_or(issue_mask, scratch, out=issue_mask)
+        # NaN与上下限比较均为False：双边范围检查需单独标记（与逐条校验一致），缺失值产生的NaN不算问题
+        np.isnan(matrix, out=scratch)
+        np.logical_and(scratch, ~missing[:, check_columns], out=scratch)
+        np.logical_and(scratch, two_sided, out=scratch)
+        np.logical_or(issue_mask, scratch, out=issue_mask)
+        flags = np.multiply(issue_mask, severity, dtype=np.int8).max(axis=1, initial=0)
+        
+        # nonzero按行优先返回，同一行内保持校验表顺序，与逐条校验的输出一致
+        issues = [[] for _ in range(n)]
+        for i, j in zip(*np.nonzero(issue_mask)):
+            key, _, _, template, _ = checks[j]
+            issues[i].append(template.format(records[i][key]))
+        
+        return flags, issues
+    
+    def _batch_validate(self, records: List[Dict], checks: Tuple,
+                        validate_record: Callable[[Dict], Tuple[str, List[str]]]) -> List[List[str]]:
+        """
+        批量校验记录并写入质量标记（quality_flag）
         
-        for record in records:
-            quality_flag, issues = self.validate_photophysical_record(record)
-            record['quality_flag'] = quality_flag
-            record['quality_issues'] = issues
+        Args:
+            records: 记录列表
+            checks: 数值校验表
+            validate_record: 逐条校验函数（数值无法转为float时回退使用）
             
-            if quality_flag == "valid":
-                valid_count += 1
-            elif quality_flag == "suspect":
-                suspect_count += 1
-            else:
-                invalid_count += 1
+        Returns:
+            与记录一一对应的问题列表
+        """
+        try:
+            flags, issues = self._vectorized_validate(records, checks)
+        except (TypeError, ValueError):
+            # 存在非数值字段，回退到逐条校验
+            results = [validate_record(record) for record in records]
+            flags = np.array([_QUALITY_FLAGS.index(flag) for flag, _ in results], dtype=np.int8)
+            issues = [record_issues for _, record_issues in results]
+        
+        for record, flag in zip(records, flags):
+            record['quality_flag'] = _QUALITY_FLAGS[flag]
         
+        valid_count, suspect_count, invalid_count = np.bincount(flags, minlength=3)
         logger.info(f"✅ 验证完成: 有效={valid_count}, 可疑={suspect_count}, 无效={invalid_count}")
+        return issues
+    
+    def _batch_validate_attached(self, records: List[Dict], checks: Tuple,
+                                 validate_record: Callable[[Dict], Tuple[str, List[str]]]) -> List[Dict]:
+        """批量校验记录，质量标记和问题列表（quality_issues）都写入记录"""
+        issues = self._batch_validate(records, checks, validate_record)
+        for record, record_issues in zip(records, issues):
+            record['quality_issues'] = record_issues
         return records
     
+    def batch_validate_photophysical(self, records: List[Dict]) -> List[Dict]:
+        """
+        批量验证光物性记录
+        
+        Args:
+            records: 记录列表
+            
+        Returns:
+            添加了质量标记和问题列表的记录列表
+        """
+        logger.info(f"开始批量验证 {len(records)} 条光物性记录")
+        return self._batch_validate_attached(records, _PHOTOPHYSICAL_CHECKS, self.validate_photophysical_record)
+    
     def batch_validate_device(self, records: List[Dict]) -> List[Dict]:
         """
         批量验证器件记录
@@ -259,49 +350,162 @@ class QualityController:
             records: 记录列表
             
         Returns:
-            添加了质量标记的记录列表
+            添加了质量标记和问题列表的记录列表
         """
         logger.info(f"开始批量验证 {len(records)} 条器件记录")
+        return self._batch_validate_attached(records, _DEVICE_CHECKS, self.validate_device_record)
+    
+    def batch_flag_photophysical(self, records: List[Dict]) -> Tuple[List[Dict], List[List[str]]]:
+        """
+        批量验证光物性记录，只写入质量标记，问题列表单独返回（统计报告时无需逐条携带）
         
-        valid_count = 0
-        suspect_count = 0
-        invalid_count = 0
+        Args:
+            records: 记录列表
+            
+        Returns:
+            (添加了质量标记的记录列表, 与记录一一对应的问题列表)
+        """
+        logger.info(f"开始批量验证 {len(records)} 条光物性记录")
+        return records, self._batch_validate(records, _PHOTOPHYSICAL_CHECKS, self.validate_photophysical_record)
+    
+    def batch_flag_device(self, records: List[Dict]) -> Tuple[List[Dict], List[List[str]]]:
+        """
+        批量验证器件记录，只写入质量标记，问题列表单独返回
         
-        for record in records:
-            quality_flag, issues = self.validate_device_record(record)
-            record['quality_flag'] = quality_flag
-            record['quality_issues'] = issues
+        Args:
+            records: 记录列表
             
-            if quality_flag == "valid":
-                valid_count += 1
-            elif quality_flag == "suspect":
-                suspect_count += 1
-            else:
-                invalid_count += 1
+        Returns:
+            (添加了质量标记的记录列表, 与记录一一对应的问题列表)
+        """
+        logger.info(f"开始批量验证 {len(records)} 条器件记录")
+        return records, self._batch_validate(records, _DEVICE_CHECKS, self.validate_device_record)
+    
+    def _iter_validate(self, records: Iterable[Dict], checks: Tuple,
+                       validate_record: Callable[[Dict], Tuple[str, List[str]]]) -> Iterator[Dict]:
+        """
+        分块校验记录并逐条产出（每块内仍使用向量化校验）
         
-        logger.info(f"✅ 验证完成: 有效={valid_count}, 可疑={suspect_count}, 无效={invalid_count}")
-        return records
+        Args:
+            records: 记录列表或迭代器
+            checks: 数值校验表
+            validate_record: 逐条校验函数
+            
+        Yields:
+            添加了质量标记和问题列表的记录
+        """
+        it = iter(records)
+        while True:
+            chunk = list(islice(it, VALIDATE_CHUNK_SIZE))
+            if not chunk:
+                return
+            yield from self._batch_validate_attached(chunk, checks, validate_record)
+    
+    def iter_validate_photophysical(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        流式验证光物性记录，可直接交给DatasetBuilder.insert_photophysics_records
+        
+        Args:
+            records: 记录列表或迭代器
+            
+        Yields:
+            添加了质量标记的记录
+        """
+        return self._iter_validate(records, _PHOTOPHYSICAL_CHECKS, self.validate_photophysical_record)
+    
+    def iter_validate_device(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        流式验证器件记录，可直接交给DatasetBuilder.insert_device_records
+        
+        Args:
+            records: 记录列表或迭代器
+            
+        Yields:
+            添加了质量标记的记录
+        """
+        return self._iter_validate(records, _DEVICE_CHECKS, self.validate_device_record)
 
 
 class LLMReviewer:
     """LLM审核器 - 使用LLM审核抽取结果"""
     
-    def __init__(self, api_key: str = DASHSCOPE_API_KEY):
+    REVIEW_SYSTEM_PROMPT = """你是一个严谨的科学数据审核专家。请审核从表格中抽取的数据是否准确。
+
+审核要点：
+1. 数据是否与表格内容一致
+2. 是否存在列错位或数据混淆
+3. 单位是否正确转换
+4. 是否有明显错误
+
+输出JSON格式：
+{
+    "status": "ok" 或 "needs_review",
+    "issues": ["问题描述1", "问题描述2", ...],
+    "confidence": 0.0-1.0
+}"""
+    
+    # 匹配响应中的JSON对象/数组（模型可能在前后输出说明文字）
+    _JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+    _JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+    
+    def __init__(self, api_key: str = DASHSCOPE_API_KEY, cache_path: Optional[str] = None):
         """
         初始化LLM审核器
         
         Args:
             api_key: API密钥
+            cache_path: 审核结果缓存文件（JSON），为None时只在进程内缓存
         """
         self.api_key = api_key
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
+        # 复用连接（keep-alive），避免每次请求重新建立TLS连接
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+        # 多线程共享的限速器状态
+        self._rate_lock = threading.Lock()
+        self._next_request_time = 0.0
+        # 审核结果缓存 {输入哈希: 审核结果}，相同(记录, 表格)不重复调用LLM
+        self.cache_path = cache_path
+        self._review_cache = {}
+        if cache_path and Path(cache_path).exists():
+            try:
+                self._review_cache = json_load_file(cache_path)
+            except (OSError, JSONDecodeError) as e:
+                logger.warning(f"审核缓存加载失败 {cache_path}: {e}")
+    
+    @staticmethod
+    def _review_key(record: Dict, table: str) -> str:
+        """
+        计算(记录, 表格)的内容哈希，忽略已有的llm_review字段
+        
+        Args:
+            record: 抽取的数据
+            table: 原始表格内容
+            
+        Returns:
+            十六进制哈希
+        """
+        content = {k: v for k, v in record.items() if k != 'llm_review'}
+        raw = json.dumps([content, table], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _throttle(self):
+        """限速：保证所有线程合计不超过LLM_RATE_LIMIT_PER_SEC"""
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_request_time - now
+            self._next_request_time = max(now, self._next_request_time) + 1.0 / LLM_RATE_LIMIT_PER_SEC
+        if wait > 0:
+            time.sleep(wait)
     
     def _call_llm(self, system_prompt: str, user_message: str) -> str:
         """调用LLM"""
         for attempt in range(MAX_RETRY):
+            self._throttle()
             try:
                 payload = {
                     "model": MODEL_NAME,
@@ -312,9 +516,8 @@ class LLMReviewer:
                     "temperature": TEMPERATURE,
                 }
                 
-                response = requests.post(
+                response = self.session.post(
                     QWEN_CHAT_ENDPOINT,
-                    headers=self.headers,
                     json=payload,
                     timeout=TIMEOUT_SEC
                 )
@@ -343,60 +546,167 @@ class LLMReviewer:
         Returns:
             审核结果
         """
-        system_prompt = """你是一个严谨的科学数据审核专家。请审核从表格中抽取的数据是否准确。
-
-审核要点：
-1. 数据是否与表格内容一致
-2. 是否存在列错位或数据混淆
-3. 单位是否正确转换
-4. 是否有明显错误
-
-输出JSON格式：
-{
-    "status": "ok" 或 "needs_review",
-    "issues": ["问题描述1", "问题描述2", ...],
-    "confidence": 0.0-1.0
-}"""
-        
         user_message = f"""原始表格：
 {source_table}
 
 抽取的数据：
-{json.dumps(extracted_data, indent=2, ensure_ascii=False)}
+{json_dumps(extracted_data, indent=True)}
 
 请审核以上抽取结果的准确性。"""
         
-        response = self._call_llm(system_prompt, user_message)
+        response = self._call_llm(self.REVIEW_SYSTEM_PROMPT, user_message)
+        
+        # 去掉模型可能输出的前后说明文字，只解析JSON对象部分
+        match = self._JSON_OBJECT_RE.search(response)
+        if match:
+            try:
+                review_result = json_loads(match.group(0))
+                if isinstance(review_result, dict):
+                    return review_result
+            except JSONDecodeError:
+                pass
+        
+        # 解析失败，返回默认结果
+        return {"status": "needs_review", "issues": ["无法解析审核结果"], "confidence": 0.0}
+    
+    def review_extraction_batch(self, items: List[Tuple[Dict, str]]) -> List[Optional[Dict]]:
+        """
+        在一次LLM调用中审核多条抽取结果
+        
+        Args:
+            items: (抽取的数据, 原始表格内容) 列表
+            
+        Returns:
+            与输入顺序一致的审核结果列表，模型未返回的条目为None
+        """
+        payload = [
+            {"idx": i, "table": table, "record": record}
+            for i, (record, table) in enumerate(items)
+        ]
         
+        user_message = f"""请逐条审核以下{len(items)}条抽取结果的准确性。
+每条包含编号idx、原始表格table和抽取的数据record。
+
+{json_dumps(payload, indent=True)}
+
+请输出一个JSON数组，每个元素使用上述审核结果格式，并额外包含对应的"idx"字段。"""
+        
+        response = self._call_llm(self.REVIEW_SYSTEM_PROMPT, user_message)
+        
+        reviews = [None] * len(items)
+        match = self._JSON_ARRAY_RE.search(response)
+        if not match:
+            return reviews
         try:
-            review_result = json.loads(response)
-            return review_result
-        except:
-            # 解析失败，返回默认结果
-            return {"status": "needs_review", "issues": ["无法解析审核结果"], "confidence": 0.0}
+            parsed = json_loads(match.group(0))
+        except JSONDecodeError:
+            return reviews
+        
+        for review in parsed if isinstance(parsed, list) else []:
+            if not isinstance(review, dict):
+                continue
+            idx = review.pop("idx", None)
+            if isinstance(idx, int) and 0 <= idx < len(items):
+                reviews[idx] = review
+        return reviews
     
-    def batch_review(self, data_records: List[Dict], source_tables: List[str]) -> List[Dict]:
+    def _review_chunk(self, items: List[Tuple[Dict, str]]) -> List[Dict]:
+        """
+        审核一组记录：单条直接审核，多条合并为一次请求，缺失的结果逐条补审
+        
+        Args:
+            items: (抽取的数据, 原始表格内容) 列表
+            
+        Returns:
+            与输入顺序一致的审核结果列表
+        """
+        if len(items) == 1:
+            return [self.review_extraction(*items[0])]
+        
+        reviews = self.review_extraction_batch(items)
+        missing = sum(1 for review in reviews if review is None)
+        if missing:
+            logger.warning(f"批量审核有 {missing}/{len(items)} 条未返回结果，逐条补审")
+        return [
+            review if review is not None else self.review_extraction(record, table)
+            for review, (record, table) in zip(reviews, items)
+        ]
+    
+    def batch_review(self, data_records: List[Dict], source_tables: List[str],
+                     sample_rate: float = 0.05, records_per_request: int = 10) -> List[Dict]:
         """
         批量审核
         
+        规则校验已判为valid且无问题的记录直接标记为ok，不调用LLM；
+        其中按sample_rate随机抽取一部分仍送审，用于发现规则遗漏。
+        
         Args:
             data_records: 数据记录列表
             source_tables: 对应的原始表格列表
+            sample_rate: valid记录的抽检比例
+            records_per_request: 每次LLM请求合并审核的记录数
             
         Returns:
             添加了审核结果的记录列表
         """
-        logger.info(f"开始LLM审核 {len(data_records)} 条记录")
+        total = len(data_records)
+        logger.info(f"开始LLM审核 {total} 条记录")
+        
+        pairs = []
+        for record, table in zip(data_records, source_tables):
+            if (record.get('quality_flag') == 'valid' and not record.get('quality_issues')
+                    and random.random() >= sample_rate):
+                record['llm_review'] = {
+                    "status": "ok",
+                    "issues": [],
+                    "confidence": 0.95,
+                    "source": "local-skip"
+                }
+            else:
+                pairs.append((record, table))
         
-        for i, (record, table) in enumerate(zip(data_records, source_tables), 1):
-            if i % 10 == 0:
-                logger.info(f"审核进度: {i}/{len(data_records)}")
-            
-            review = self.review_extraction(record, table)
-            record['llm_review'] = review
+        if len(pairs) < total:
+            logger.info(f"本地预筛跳过 {total - len(pairs)} 条valid记录，送审 {len(pairs)} 条")
+        
+        # 按内容哈希去重：命中缓存的直接复用，重复输入只审核一次
+        groups = {}
+        for record, table in pairs:
+            key = self._review_key(record, table)
+            if key in self._review_cache:
+                record['llm_review'] = dict(self._review_cache[key])
+            else:
+                groups.setdefault(key, []).append((record, table))
+        
+        if len(groups) < len(pairs):
+            logger.info(f"去重/缓存命中后实际送审 {len(groups)} 条")
+        
+        keys = list(groups)
+        unique_pairs = [groups[key][0] for key in keys]
+        total = len(unique_pairs)
+        
+        # 多条记录合并为一次请求，摊薄系统提示词和请求开销
+        chunk_size = max(1, records_per_request)
+        chunks = [
+            (keys[i:i + chunk_size], unique_pairs[i:i + chunk_size])
+            for i in range(0, total, chunk_size)
+        ]
+        
+        if chunks:
+            done = 0
+            with ThreadPoolExecutor(max_workers=min(LLM_CONCURRENCY, len(chunks))) as executor:
+                futures = {executor.submit(self._review_chunk, chunk): chunk_keys for chunk_keys, chunk in chunks}
+                for future in as_completed(futures):
+                    chunk_keys = futures[future]
+                    for key, review in zip(chunk_keys, future.result()):
+                        for record, _ in groups[key]:
+                            record['llm_review'] = dict(review)
+                        if review.get("issues") != ["无法解析审核结果"]:
+                            self._review_cache[key] = review
+                    done += len(chunk_keys)
+                    logger.info(f"审核进度: {done}/{total}")
             
-            # 避免请求过快
-            time.sleep(0.5)
+            if self.cache_path:
+                json_dump_file(self._review_cache, self.cache_path)
         
         logger.info("✅ LLM审核完成")
         return data_records
@@ -438,9 +748,10 @@ class QualityReport:
         if total == 0:
             return {"total": 0}
         
-        valid = sum(1 for r in data if r.get('quality_flag') == 'valid')
-        suspect = sum(1 for r in data if r.get('quality_flag') == 'suspect')
-        invalid = sum(1 for r in data if r.get('quality_flag') == 'invalid')
+        counts = Counter(r.get('quality_flag') for r in data)
+        valid = counts['valid']
+        suspect = counts['suspect']
+        invalid = counts['invalid']
         
         return {
             "total": total,
@@ -456,9 +767,10 @@ class QualityReport:
         if total == 0:
             return {"total": 0}
         
-        ok = sum(1 for r in data if r.get('status') == 'ok')
-        low_conf = sum(1 for r in data if r.get('status') == 'low_confidence')
-        failed = sum(1 for r in data if r.get('status') == 'parse_failed')
+        counts = Counter(r.get('status') for r in data)
+        ok = counts['ok']
+        low_conf = counts['low_confidence']
+        failed = counts['parse_failed']
         
         return {
             "total": total,
@@ -470,7 +782,6 @@ class QualityReport:
     
     def save_report(self, report: Dict, output_path: str):
         """保存质量报告"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        json_dump_file(report, output_path)
         logger.info(f"✅ 质量报告已保存到 {output_path}")
 
@@ -4,12 +4,19 @@
 分子结构识别模块 - 使用DECIMER进行结构识别
 """
 
-import json
+import os
+import mimetypes
 import requests
+import numpy as np
+from requests.adapters import HTTPAdapter
 from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from utils.logger import setup_logger
-from config import DECIMER_API_URL, DECIMER_TIMEOUT, SMILES_CONFIDENCE_THRESHOLD
+from utils.smiles_utils import parse_and_score_smiles, RDKIT_AVAILABLE
+from utils.json_utils import json_dump_file
+from config import DECIMER_API_URL, DECIMER_TIMEOUT, DECIMER_CONCURRENCY, SMILES_CONFIDENCE_THRESHOLD
 
 logger = setup_logger(__name__)
 
@@ -25,30 +32,55 @@ class StructureRecognizer:
             api_url: DECIMER API URL
         """
         self.api_url = api_url
+        # 复用连接池，连接数与批量识别并发数匹配
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=DECIMER_CONCURRENCY, pool_maxsize=DECIMER_CONCURRENCY * 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
     
-    def recognize_structure(self, image_path: str) -> Optional[Dict]:
+    def recognize_structure(self, image_path: str, image_bytes: Optional[bytes] = None) -> Optional[Dict]:
         """
         识别单张结构图
         
         Args:
-            image_path: 图片路径
+            image_path: 图片路径（提供image_bytes时仅用作上传文件名）
+            image_bytes: 已在内存中的图片数据，提供时不再读取文件
             
         Returns:
             识别结果字典
         """
-        if not Path(image_path).exists():
+        if image_bytes is None and not Path(image_path).exists():
             logger.error(f"图片不存在: {image_path}")
             return None
         
+        return self._recognize(image_path, image_bytes)
+    
+    def _recognize(self, image_path: str, image_bytes: Optional[bytes] = None) -> Optional[Dict]:
+        """
+        上传并识别结构图（调用方已确认图片存在，不再stat）
+        
+        Args:
+            image_path: 图片路径
+            image_bytes: 已在内存中的图片数据
+            
+        Returns:
+            识别结果字典
+        """
         try:
+            # 一次性读入内存，作为(文件名, 数据, MIME)上传，避免requests再次读取文件对象
+            if image_bytes is None:
+                with open(image_path, 'rb') as f:
+                    image_bytes = f.read()
+            
+            filename = Path(image_path).name
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            
             # 上传图片到DECIMER API
-            with open(image_path, 'rb') as f:
-                files = {'image': f}
-                response = requests.post(
-                    self.api_url,
-                    files=files,
-                    timeout=DECIMER_TIMEOUT
-                )
+            response = self.session.post(
+                self.api_url,
+                files={'image': (filename, image_bytes, content_type)},
+                timeout=DECIMER_TIMEOUT
+            )
             
             if response.status_code == 200:
                 result = response.json()
@@ -63,13 +95,21 @@ class StructureRecognizer:
                 # 验证SMILES
                 is_valid, error_msg = self._validate_smiles(pred_smiles)
                 
+                # 确定识别状态
+                if not is_valid:
+                    status = "parse_failed"
+                elif global_confidence < SMILES_CONFIDENCE_THRESHOLD:
+                    status = "low_confidence"
+                else:
+                    status = "ok"
+                
                 recognition_result = {
                     'pred_smiles': pred_smiles,
                     'global_confidence': global_confidence,
                     'token_confidences': token_confidences,
                     'is_valid': is_valid,
                     'error_msg': error_msg,
-                    'status': self._determine_status(is_valid, global_confidence)
+                    'status': status
                 }
                 
                 logger.info(f"✅ 结构识别成功: {Path(image_path).name} -> {pred_smiles[:50]}... (conf: {global_confidence:.3f})")
@@ -96,8 +136,17 @@ class StructureRecognizer:
             return 0.0
         
         # 使用平均值作为全局置信度
-        confidences = [tc.get('confidence', 0) if isinstance(tc, dict) else tc for tc in token_confidences]
-        return sum(confidences) / len(confidences)
+        try:
+            # 纯数值列表直接转换
+            confidences = np.asarray(token_confidences, dtype=np.float64)
+        except (TypeError, ValueError):
+            # 含 {"confidence": x} 字典的列表
+            confidences = np.fromiter(
+                (tc.get('confidence', 0) if isinstance(tc, dict) else tc for tc in token_confidences),
+                dtype=np.float64,
+                count=len(token_confidences)
+            )
+        return float(confidences.mean())
     
     def _validate_smiles(self, smiles: str) -> Tuple[bool, str]:
         """
@@ -112,43 +161,49 @@ class StructureRecognizer:
         if not smiles:
             return False, "Empty SMILES"
         
-        try:
-            # 尝试使用RDKit验证
-            from rdkit import Chem
-            mol = Chem.MolFromSmiles(smiles)
-            if mol is None:
-                return False, "Invalid SMILES - cannot parse"
-            
-            # 检查是否有异常价态
-            # （这里可以添加更多的化学合理性检查）
-            return True, ""
-            
-        except ImportError:
+        if not RDKIT_AVAILABLE:
             # 如果没有RDKit，进行基本的字符检查
             logger.warning("RDKit未安装，仅进行基本验证")
             if len(smiles) < 3:
                 return False, "SMILES too short"
             return True, ""
-        except Exception as e:
-            return False, f"Validation error: {str(e)}"
+        
+        # 使用RDKit验证（解析结果按SMILES缓存）
+        parsed, error_msg, _, _ = parse_and_score_smiles(smiles)
+        if error_msg:
+            return False, error_msg
+        if not parsed:
+            return False, "Invalid SMILES - cannot parse"
+        
+        # 检查是否有异常价态
+        # （这里可以添加更多的化学合理性检查）
+        return True, ""
     
-    def _determine_status(self, is_valid: bool, confidence: float) -> str:
+    def _filter_existing(self, image_paths: List[str]) -> List[str]:
         """
-        确定识别状态
+        过滤掉不存在的图片（每个目录只读取一次）
         
         Args:
-            is_valid: SMILES是否有效
-            confidence: 置信度
+            image_paths: 图片路径列表
             
         Returns:
-            状态字符串
-        """
-        if not is_valid:
-            return "parse_failed"
-        elif confidence < SMILES_CONFIDENCE_THRESHOLD:
-            return "low_confidence"
-        else:
-            return "ok"
+            存在的图片路径列表（保持原顺序）
+        """
+        dir_entries = {}
+        existing = []
+        for image_path in image_paths:
+            parent, name = os.path.split(str(image_path))
+            if parent not in dir_entries:
+                try:
+                    with os.scandir(parent or '.') as it:
+                        dir_entries[parent] = {entry.name for entry in it if entry.is_file()}
+                except OSError:
+                    dir_entries[parent] = set()
+            if name in dir_entries[parent]:
+                existing.append(image_path)
+            else:
+                logger.error(f"图片不存在: {image_path}")
+        return existing
     
     def recognize_batch(self, image_paths: List[str]) -> Dict[str, Dict]:
         """
@@ -165,16 +220,23 @@ class StructureRecognizer:
         
         logger.info(f"开始批量识别 {total} 张结构图")
         
-        for i, image_path in enumerate(image_paths, 1):
-            logger.info(f"处理进度: {i}/{total}")
-            result = self.recognize_structure(image_path)
-            if result:
-                results[image_path] = result
+        # 按目录一次scandir确认文件存在，避免逐张stat
+        existing = self._filter_existing(image_paths)
+        
+        # 并发请求DECIMER，重叠网络往返时间；map保持输入顺序
+        if existing:
+            with ThreadPoolExecutor(max_workers=min(DECIMER_CONCURRENCY, len(existing))) as executor:
+                for i, (image_path, result) in enumerate(
+                        zip(existing, executor.map(self._recognize, existing)), 1):
+                    logger.info(f"处理进度: {i}/{len(existing)}")
+                    if result:
+                        results[image_path] = result
         
         # 统计
-        ok_count = sum(1 for r in results.values() if r['status'] == 'ok')
-        low_conf_count = sum(1 for r in results.values() if r['status'] == 'low_confidence')
-        failed_count = sum(1 for r in results.values() if r['status'] == 'parse_failed')
+        status_counts = Counter(r['status'] for r in results.values())
+        ok_count = status_counts['ok']
+        low_conf_count = status_counts['low_confidence']
+        failed_count = status_counts['parse_failed']
         
         logger.info(f"✅ 批量识别完成: 成功={ok_count}, 低置信度={low_conf_count}, 失败={failed_count}")
         return results
@@ -187,8 +249,7 @@ class StructureRecognizer:
             results: 识别结果字典
             output_path: 输出文件路径
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        json_dump_file(results, output_path)
         logger.info(f"✅ 识别结果已保存到 {output_path}")
 
 
@@ -245,7 +306,6 @@ class StructureDatabase:
         Args:
             output_path: 输出文件路径
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.structures, f, indent=2, ensure_ascii=False)
+        json_dump_file(self.structures, output_path)
         logger.info(f"✅ 导出 {len(self.structures)} 条结构记录到 {output_path}")
 
@@ -10,18 +10,63 @@ DECIMER REST API 服务端
 
 import os
 import io
+import re
+import sys
+import json
 import time
+import queue
+import atexit
+import signal
+import asyncio
+import sqlite3
+import hashlib
+import secrets
+import select
 import logging
+import threading
 import tempfile
 import subprocess
+import importlib.util
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict
+from typing import Optional, Tuple, List, Dict, Iterator
 
-from flask import Flask, request, jsonify, Response
-from werkzeug.utils import secure_filename
+from flask import Flask, Request, request, Response
+from werkzeug.exceptions import BadRequest
+
+from decimer_tf_config import configure_tensorflow
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # ==================== 配置 ====================
+class DisallowedUpload(BadRequest):
+    """上传文件类型不允许（在解析到文件头时抛出，不再读取文件内容）"""
+    
+    def __init__(self, filename: str):
+        super().__init__()
+        self.filename = filename
+
+
+class UploadRequest(Request):
+    """上传文件始终保存在内存中（大小受MAX_CONTENT_LENGTH限制）"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # multipart解析器读到文件头时调用，扩展名不允许就立即中止解析
+        if filename and not allowed_file(filename):
+            raise DisallowedUpload(filename)
+        # werkzeug默认超过500KB就落盘到临时文件，随后又被整体读回内存
+        return io.BytesIO()
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 # 服务配置
 HOST = "0.0.0.0"
@@ -34,8 +79,47 @@ DECIMER_MODE = os.getenv("DECIMER_MODE", "python")  # "python" 或 "cli"
 DECIMER_CLI = os.getenv("DECIMER_CLI", "decimer")
 DECIMER_TIMEOUT = int(os.getenv("DECIMER_TIMEOUT", "30"))
 
-# 临时文件目录
-TEMP_DIR = Path(tempfile.gettempdir()) / "decimer_temp"
+# GPU部署：所有推理由服务进程内唯一的批处理线程完成，避免多个CUDA上下文争用同一块GPU
+DECIMER_GPU = os.getenv("DECIMER_GPU", "0") == "1"
+
+# 常驻worker进程数：Python模式为推理进程池大小，CLI模式为常驻CLI worker数量
+# DECIMER_WORKERS=0（默认）时Python模式在服务进程内推理，CLI模式每次请求启动一个CLI进程。
+# 每个推理进程各自加载一份数GB的模型，且每个gunicorn worker各建一个进程池，需要时再显式开启
+DECIMER_WORKERS = int(os.getenv("DECIMER_WORKERS", "0"))
+# gunicorn worker数（start_decimer_server.sh导出，gunicorn也以此作为 -w 的默认值）
+SERVER_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# 所有gunicorn worker的推理进程总数不超过CPU核数
+DECIMER_MAX_WORKERS = max(1, (os.cpu_count() or 1) // SERVER_WORKERS)
+DECIMER_WORKER_PYTHON = os.getenv("DECIMER_WORKER_PYTHON", sys.executable)
+DECIMER_WORKER_STARTUP_TIMEOUT = int(os.getenv("DECIMER_WORKER_STARTUP_TIMEOUT", "300"))
+
+# TensorFlow配置：显存按需增长、XLA自动聚类；设置预热图片可在启动时完成XLA编译
+DECIMER_XLA = os.getenv("DECIMER_XLA", "1") == "1"
+DECIMER_WARMUP_IMAGE = os.getenv("DECIMER_WARMUP_IMAGE", "")
+
+# 推理精度："float32"（默认）、"mixed_float16"、"mixed_bfloat16" 或 "auto"（Ampere及以上用bfloat16，否则float16）
+# 低精度需先在回归样本上确认SMILES输出一致再开启
+DECIMER_PRECISION = os.getenv("DECIMER_PRECISION", "float32")
+
+# 识别结果缓存：按图片内容哈希，内存LRU + sqlite持久化
+DECIMER_CACHE_SIZE = int(os.getenv("DECIMER_CACHE_SIZE", "10000"))
+DECIMER_CACHE_PATH = os.getenv("DECIMER_CACHE_PATH", str(Path(tempfile.gettempdir()) / "decimer_cache.db"))
+
+# 每次请求启动CLI时的最大并发进程数，避免多个TF进程同时抢占GPU显存
+DECIMER_CLI_CONCURRENCY = int(os.getenv(
+    "DECIMER_CLI_CONCURRENCY", "1" if DECIMER_GPU else str(max(1, (os.cpu_count() or 2) // 2))
+))
+
+# Python模式微批处理配置：在时间窗口内合并并发请求
+DECIMER_MAX_BATCH = int(os.getenv("DECIMER_MAX_BATCH", "8"))
+DECIMER_BATCH_TIMEOUT_MS = int(os.getenv("DECIMER_BATCH_TIMEOUT_MS", "20"))
+
+# 临时文件目录：DECIMER只接受文件路径，Linux下放在tmpfs(/dev/shm)中，上传图片不落盘
+_SHM_DIR = Path("/dev/shm")
+if _SHM_DIR.is_dir() and os.access(_SHM_DIR, os.W_OK):
+    TEMP_DIR = _SHM_DIR / "decimer_temp"
+else:
+    TEMP_DIR = Path(tempfile.gettempdir()) / "decimer_temp"
 TEMP_DIR.mkdir(exist_ok=True)
 
 # 日志配置
@@ -45,27 +129,121 @@ logging.basicConfig(
 )
 logger = logging.getLogger("DECIMER-Server")
 
+if DECIMER_WORKERS > DECIMER_MAX_WORKERS:
+    logger.warning(
+        f"⚠️  DECIMER_WORKERS={DECIMER_WORKERS} × {SERVER_WORKERS} 个服务进程超过CPU核数，"
+        f"每个服务进程限制为 {DECIMER_MAX_WORKERS} 个"
+    )
+    DECIMER_WORKERS = DECIMER_MAX_WORKERS
+
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
 
 # ==================== DECIMER Python包模式 ====================
-try:
-    if DECIMER_MODE == "python":
-        from DECIMER import predict_SMILES
+# 导入时只检查包是否存在，不加载模型：TensorFlow不是fork安全的，
+# 模型必须在gunicorn fork出worker之后、在实际推理的进程里加载（见 get_batcher / warm_up）
+DECIMER_AVAILABLE = False
+if DECIMER_MODE == "python":
+    if importlib.util.find_spec("DECIMER") is not None:
         DECIMER_AVAILABLE = True
-        logger.info("✅ DECIMER Python包已加载")
-except ImportError:
-    DECIMER_AVAILABLE = False
-    if DECIMER_MODE == "python":
+        logger.info("✅ 已找到DECIMER Python包")
+    else:
         logger.warning("⚠️  DECIMER Python包未安装，将使用CLI模式")
         DECIMER_MODE = "cli"
 
+_predict_fn = None
+
+
+def _configure_tensorflow():
+    """配置TensorFlow（需在DECIMER加载模型之前调用）"""
+    policy = configure_tensorflow(DECIMER_PRECISION, DECIMER_XLA)
+    if policy and policy != "float32":
+        logger.info(f"DECIMER推理精度: {policy}")
+
+
+def _load_decimer():
+    """加载DECIMER模型（推理进程池的initializer；进程内推理时由批处理线程调用）"""
+    global _predict_fn
+    if _predict_fn is None:
+        _configure_tensorflow()
+        from DECIMER import predict_SMILES
+        _predict_fn = predict_SMILES
+        
+        # 预热一次，让XLA在第一个真实请求之前完成编译
+        if DECIMER_WARMUP_IMAGE and os.path.exists(DECIMER_WARMUP_IMAGE):
+            try:
+                predict_SMILES(DECIMER_WARMUP_IMAGE)
+            except Exception as e:
+                logger.warning(f"⚠️  DECIMER预热失败: {e}")
+
+
+def _predict_batch(image_paths: List[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    在已加载模型的进程中识别一批图片
+    
+    Args:
+        image_paths: 图片路径列表
+        
+    Returns:
+        [(smiles, error)] 列表，与输入一一对应
+    """
+    _load_decimer()
+    results = []
+    for image_path in image_paths:
+        try:
+            results.append((_predict_fn(image_path), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+
+def _warn_fork_after_load():
+    """已加载模型的进程被fork时告警（子进程继承的TensorFlow运行时可能在首次推理时卡死）"""
+    if _predict_fn is not None:
+        logger.warning("⚠️  DECIMER模型已加载的进程正在fork，子进程推理可能卡死；请勿使用 gunicorn --preload")
+
+
+os.register_at_fork(before=_warn_fork_after_load)
+
 
 # ==================== 工具函数 ====================
+# CLI原始输出超过该长度时不再随响应返回
+MAX_RAW_OUTPUT_LENGTH = 16 * 1024
+
+
+def json_response(data: Dict, status: int = 200) -> Response:
+    """
+    构造JSON响应（优先使用orjson序列化）
+    
+    Args:
+        data: 响应数据
+        status: HTTP状态码
+        
+    Returns:
+        Flask响应对象
+    """
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False)
+    return Response(body, status=status, mimetype="application/json")
+
+
+_ALLOWED_EXTENSIONS = frozenset(ALLOWED_EXTENSIONS)
+
+
 def allowed_file(filename: str) -> bool:
     """检查文件扩展名是否允许"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, sep, ext = filename.rpartition('.')
+    return bool(sep) and ext.lower() in _ALLOWED_EXTENSIONS
+
+
+# CLI输出解析：一次扫描同时匹配SMILES行和置信度行
+_DECIMER_OUTPUT_RE = re.compile(
+    r"^[ \t]*(?:predicted[ \t]+)?smiles:[ \t]*(?P<smiles>.*?)[ \t\r]*$"
+    r"|^(?P<label>[^:\n]*confidence[^:\n]*):[ \t]*(?P<conf>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)[ \t\r]*$",
+    re.IGNORECASE | re.MULTILINE
+)
 
 
 def parse_decimer_output(stdout: str) -> Tuple[Optional[str], Optional[float], List[Dict]]:
@@ -82,32 +260,492 @@ def parse_decimer_output(stdout: str) -> Tuple[Optional[str], Optional[float], L
     global_confidence = None
     token_confidences = []
     
-    lines = stdout.splitlines()
-    
-    for i, line in enumerate(lines):
-        line = line.strip()
-        
-        # 提取SMILES
-        if line.lower().startswith("smiles:") or line.lower().startswith("predicted smiles:"):
-            smiles = line.split(":", 1)[1].strip()
-        
-        # 提取置信度
-        elif "confidence" in line.lower():
-            parts = line.split(":")
-            if len(parts) == 2:
-                try:
-                    conf_value = float(parts[1].strip())
-                    if "global" in line.lower():
-                        global_confidence = conf_value
-                    else:
-                        # Token级别置信度
-                        token_confidences.append({"confidence": conf_value})
-                except ValueError:
-                    pass
+    for match in _DECIMER_OUTPUT_RE.finditer(stdout):
+        label = match.group("label")
+        if label is None:
+            # 提取SMILES
+            smiles = match.group("smiles")
+        elif "global" in label.lower():
+            global_confidence = float(match.group("conf"))
+        else:
+            # Token级别置信度
+            token_confidences.append({"confidence": float(match.group("conf"))})
     
     return smiles, global_confidence, token_confidences
 
 
+# 常见图片格式的文件头
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tif"),
+    (b"MM\x00*", "tif"),
+)
+
+
+def sniff_extension(image_bytes: bytes, filename: str) -> str:
+    """
+    根据文件头判断图片扩展名
+    
+    Args:
+        image_bytes: 图片数据
+        filename: 客户端提供的文件名（无法识别文件头时使用其扩展名）
+        
+    Returns:
+        扩展名（不含点）
+    """
+    for signature, ext in _IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return ext
+    return filename.rpartition('.')[2].lower()
+
+
+@contextmanager
+def staged_image(image_bytes: bytes, ext: str) -> Iterator[str]:
+    """
+    把上传图片写入临时目录（Linux下为tmpfs），退出时删除
+    
+    推理可能在其他进程或批处理线程中进行，且请求超时后仍可能在读取，
+    因此使用带扩展名、名称随机的真实文件：超时删除后对方只会读取失败，不会读到其他请求的数据。
+    
+    Args:
+        image_bytes: 图片数据
+        ext: 图片扩展名
+        
+    Yields:
+        图片路径
+    """
+    # 临时文件名不使用客户端文件名，无需安全化处理
+    temp_path = TEMP_DIR / f"{secrets.token_hex(8)}.{ext}"
+    try:
+        # 数据已整体在内存中，无缓冲一次写入
+        with open(temp_path, "wb", buffering=0) as f:
+            f.write(image_bytes)
+        yield str(temp_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+# ==================== DECIMER常驻worker ====================
+# worker进程只加载一次模型，之后从stdin逐行读取图片路径，每行输出一个JSON结果
+# 参数：服务端目录（用于导入decimer_tf_config）、推理精度、是否开启XLA，与服务进程内推理的配置一致
+_WORKER_SCRIPT = """
+import sys, json
+sys.path.insert(0, sys.argv[1])
+from decimer_tf_config import configure_tensorflow
+try:
+    configure_tensorflow(sys.argv[2], sys.argv[3] == "1")
+except Exception:
+    pass
+from DECIMER import predict_SMILES
+print(json.dumps({"ready": True}), flush=True)
+for line in sys.stdin:
+    path = line.strip()
+    if not path:
+        continue
+    try:
+        print(json.dumps({"smiles": predict_SMILES(path)}), flush=True)
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), flush=True)
+"""
+
+
+class DecimerWorker:
+    """单个预加载DECIMER模型的常驻子进程"""
+    
+    def __init__(self):
+        """启动worker进程（模型在后台加载，首次使用时等待就绪）"""
+        self.proc = subprocess.Popen(
+            [DECIMER_WORKER_PYTHON, "-c", _WORKER_SCRIPT,
+             str(Path(__file__).resolve().parent), DECIMER_PRECISION, "1" if DECIMER_XLA else "0"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self.ready = False
+        self._started = time.monotonic()
+        self._buffer = b""
+    
+    def _readline(self, timeout: float) -> Optional[bytes]:
+        """
+        读取一行输出
+        
+        Args:
+            timeout: 超时时间（秒）
+            
+        Returns:
+            一行输出（不含换行符），超时返回None
+        """
+        fd = self.proc.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise EOFError("DECIMER worker exited")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line
+    
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        等待模型加载完成（最多等待timeout秒，不超过启动超时的剩余时间）
+        
+        Args:
+            timeout: 本次最多等待的时间（秒）
+            
+        Returns:
+            是否已就绪；仍在加载中返回False
+        """
+        if self.ready:
+            return True
+        startup_remaining = self._started + DECIMER_WORKER_STARTUP_TIMEOUT - time.monotonic()
+        if self._readline(max(0.0, min(timeout, startup_remaining))) is not None:
+            self.ready = True
+        elif startup_remaining <= timeout:
+            raise TimeoutError("DECIMER worker startup timeout")
+        return self.ready
+    
+    def predict(self, image_path: str, timeout: float) -> Dict:
+        """
+        提交一张图片并等待结果（worker须已就绪）
+        
+        Args:
+            image_path: 图片路径
+            timeout: 超时时间（秒）
+            
+        Returns:
+            worker输出的结果字典 {"smiles": ...} 或 {"error": ...}
+        """
+        self.proc.stdin.write(image_path.encode("utf-8") + b"\n")
+        self.proc.stdin.flush()
+        
+        line = self._readline(timeout)
+        if line is None:
+            raise subprocess.TimeoutExpired(DECIMER_WORKER_PYTHON, timeout)
+        return json.loads(line)
+    
+    def close(self):
+        """终止worker进程"""
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+
+class DecimerWorkerPool:
+    """常驻DECIMER worker进程池，摊销每次请求的模型加载开销"""
+    
+    def __init__(self, size: int):
+        """
+        启动worker进程池
+        
+        Args:
+            size: worker数量
+        """
+        self.size = size
+        self.available = True
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(DecimerWorker())
+        logger.info(f"✅ 已启动 {size} 个DECIMER常驻worker")
+    
+    def predict(self, image_path: str, timeout: float) -> Dict:
+        """
+        借出一个空闲worker完成识别，用完归还
+        
+        等待空闲worker、等待模型加载和推理的总时间不超过timeout。
+        
+        Args:
+            image_path: 图片路径
+            timeout: 超时时间（秒）
+            
+        Returns:
+            worker输出的结果字典
+            
+        Raises:
+            EOFError: worker无法启动，worker池已不可用（调用方应改用CLI）
+            subprocess.TimeoutExpired: 超时
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise subprocess.TimeoutExpired(DECIMER_WORKER_PYTHON, timeout)
+        if worker is None:
+            # worker池已停用，把标记放回去唤醒其他等待的请求
+            self._idle.put(None)
+            raise EOFError("DECIMER worker pool unavailable")
+        
+        try:
+            ready = worker.wait_ready(deadline - time.monotonic())
+        except (EOFError, TimeoutError) as e:
+            # worker在就绪前退出或超过启动超时仍未就绪，说明该Python环境无法加载DECIMER，改用CLI
+            worker.close()
+            self._disable()
+            raise EOFError(str(e)) from e
+        if not ready:
+            # 模型仍在加载，worker状态正常，原样归还
+            self._release(worker)
+            raise subprocess.TimeoutExpired(DECIMER_WORKER_PYTHON, timeout)
+        
+        try:
+            return worker.predict(image_path, max(0.0, deadline - time.monotonic()))
+        except Exception:
+            # 运行中崩溃、超时或输出异常的worker状态不可信，替换为新进程
+            worker.close()
+            worker = DecimerWorker()
+            raise
+        finally:
+            self._release(worker)
+    
+    def _release(self, worker: DecimerWorker):
+        """
+        归还worker（worker池已停用时直接关闭）
+        
+        Args:
+            worker: 借出的worker
+        """
+        if self.available:
+            self._idle.put(worker)
+        else:
+            worker.close()
+    
+    def _disable(self):
+        """停用worker池：关闭空闲worker，之后的请求改用CLI"""
+        if not self.available:
+            return
+        self.available = False
+        logger.warning("⚠️  DECIMER worker无法启动，回退到每次请求调用CLI")
+        self.close()
+        self._idle.put(None)
+    
+    def close(self):
+        """关闭所有空闲worker"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
+
+
+_worker_pool: Optional[DecimerWorkerPool] = None
+_worker_pool_pid: Optional[int] = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> Optional[DecimerWorkerPool]:
+    """
+    获取当前进程的worker池（按进程创建，fork出的进程不共享父进程的管道）
+    
+    Returns:
+        worker池，CLI模式未启用worker时返回None
+    """
+    global _worker_pool, _worker_pool_pid
+    if DECIMER_MODE != "cli" or DECIMER_WORKERS <= 0:
+        return None
+    pid = os.getpid()
+    if _worker_pool_pid != pid:
+        with _worker_pool_lock:
+            if _worker_pool_pid != pid:
+                _worker_pool = DecimerWorkerPool(DECIMER_WORKERS)
+                _worker_pool_pid = pid
+                atexit.register(_worker_pool.close)
+    return _worker_pool
+
+
+# ==================== Python模式微批处理 ====================
+class BatchedPredictor:
+    """
+    在后台线程中收集并发请求，成批交给推理进程池（或进程内已加载的模型）
+    
+    进程内推理时该线程是唯一调用模型的线程，请求线程只负责入队和等待结果。
+    """
+    
+    def __init__(self, max_batch: int = DECIMER_MAX_BATCH, batch_timeout_ms: int = DECIMER_BATCH_TIMEOUT_MS):
+        """
+        启动批处理线程
+        
+        Args:
+            max_batch: 每批最多图片数
+            batch_timeout_ms: 凑批等待时间（毫秒）
+        """
+        self.max_batch = max_batch
+        self.batch_timeout = batch_timeout_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="decimer-batcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, image_path: str) -> Future:
+        """
+        提交一张图片
+        
+        Args:
+            image_path: 图片路径
+            
+        Returns:
+            结果为SMILES字符串的Future
+        """
+        future = Future()
+        self._queue.put((image_path, future))
+        return future
+    
+    def _collect(self) -> List[Tuple[str, Future]]:
+        """阻塞等待第一个任务，然后在时间窗口内尽量凑满一批"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _loop(self):
+        """批处理主循环"""
+        if DECIMER_AVAILABLE and get_inference_executor() is None:
+            # 进程内推理：在本线程（fork之后的服务进程）中加载模型，之后的推理都在本线程执行
+            try:
+                _load_decimer()
+                logger.info("✅ DECIMER模型已加载")
+            except Exception as e:
+                logger.error(f"❌ DECIMER模型加载失败: {e}")
+        while True:
+            batch = self._collect()
+            # 已超时并被取消的请求不再识别
+            batch = [(path, future) for path, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            
+            paths = [path for path, _ in batch]
+            executor = get_inference_executor()
+            if executor is None:
+                self._resolve(batch, _predict_batch(paths))
+                continue
+            
+            # 交给推理进程池后立即收集下一批，多个批次在不同进程中并行
+            try:
+                job = executor.submit(_predict_batch, paths)
+            except BrokenProcessPool as e:
+                reset_inference_executor(executor)
+                self._fail(batch, e)
+                continue
+            job.add_done_callback(lambda job, batch=batch, executor=executor: self._on_done(job, batch, executor))
+    
+    def _on_done(self, job: Future, batch: List[Tuple[str, Future]], executor: ProcessPoolExecutor):
+        """推理进程池完成一批后分发结果"""
+        error = job.exception()
+        if error is None:
+            self._resolve(batch, job.result())
+            return
+        if isinstance(error, BrokenProcessPool):
+            # 推理进程崩溃不影响服务进程，重建进程池
+            logger.error(f"❌ DECIMER推理进程异常退出: {error}")
+            reset_inference_executor(executor)
+        self._fail(batch, error)
+    
+    @staticmethod
+    def _resolve(batch: List[Tuple[str, Future]], results: List[Tuple[Optional[str], Optional[str]]]):
+        """按顺序把识别结果写回各请求"""
+        for (_, future), (smiles, error) in zip(batch, results):
+            if error is None:
+                future.set_result(smiles)
+            else:
+                future.set_exception(RuntimeError(error))
+    
+    @staticmethod
+    def _fail(batch: List[Tuple[str, Future]], error: BaseException):
+        """整批失败"""
+        for _, future in batch:
+            future.set_exception(error)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    获取当前进程的推理进程池（每个进程池worker启动时加载一次模型）
+    
+    Returns:
+        进程池，DECIMER_WORKERS=0 时返回None（在服务进程内推理）
+    """
+    global _executor, _executor_pid
+    if DECIMER_WORKERS <= 0:
+        return None
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _executor_lock:
+            if _executor_pid != pid:
+                # TensorFlow不是fork安全的，推理进程用spawn启动
+                _executor = ProcessPoolExecutor(
+                    max_workers=DECIMER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_load_decimer
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def reset_inference_executor(broken: ProcessPoolExecutor):
+    """
+    丢弃已损坏的推理进程池，下次使用时重建
+    
+    Args:
+        broken: 损坏的进程池
+    """
+    global _executor_pid
+    with _executor_lock:
+        if _executor is broken:
+            _executor_pid = None
+    broken.shutdown(wait=False)
+
+
+_batcher: Optional[BatchedPredictor] = None
+_batcher_pid: Optional[int] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> BatchedPredictor:
+    """
+    获取当前进程的批处理器（线程不随fork复制，按进程创建）
+    
+    Returns:
+        批处理器
+    """
+    global _batcher, _batcher_pid
+    pid = os.getpid()
+    if _batcher_pid != pid:
+        with _batcher_lock:
+            if _batcher_pid != pid:
+                _batcher = BatchedPredictor()
+                _batcher_pid = pid
+    return _batcher
+
+
+def warm_up():
+    """
+    在当前进程中提前启动模型加载（后台进行，不阻塞调用方），首个请求无需等待
+    
+    必须在fork之后调用：gunicorn worker中由wsgi导入时调用，开发服务器在启动前调用。
+    """
+    if DECIMER_MODE == "python" and DECIMER_AVAILABLE:
+        get_batcher()
+    get_worker_pool()
+
+
 # ==================== DECIMER调用函数 ====================
 def predict_smiles_python(image_path: str) -> Dict:
     """
@@ -120,12 +758,22 @@ def predict_smiles_python(image_path: str) -> Dict:
         识别结果字典
     """
     try:
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
         
-        # 调用DECIMER
-        smiles = predict_SMILES(image_path)
+        # 交给批处理线程，与其他并发请求合并
+        future = get_batcher().submit(image_path)
+        try:
+            smiles = future.result(timeout=DECIMER_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.error(f"❌ Python模式识别超时 (>{DECIMER_TIMEOUT}s)")
+            return {
+                "success": False,
+                "error": f"DECIMER timeout (>{DECIMER_TIMEOUT}s)",
+                "method": "python"
+            }
         
-        elapsed = time.time() - start_time
+        elapsed = (time.monotonic_ns() - start_ns) / 1e9
         
         # DECIMER Python包不直接提供置信度，我们返回空列表
         # 实际使用中可以通过修改DECIMER源码获取
@@ -149,9 +797,72 @@ def predict_smiles_python(image_path: str) -> Dict:
         }
 
 
+_cli_semaphore = threading.BoundedSemaphore(DECIMER_CLI_CONCURRENCY)
+_cli_waiting = 0
+_cli_waiting_lock = threading.Lock()
+
+
+def _run_cli_bounded(image_path: str) -> Tuple[str, str, int]:
+    """
+    在并发上限内运行DECIMER CLI
+    
+    Args:
+        image_path: 图片路径
+        
+    Returns:
+        (stdout, stderr, returncode)
+        
+    Raises:
+        subprocess.TimeoutExpired: 等待空位或运行超过DECIMER_TIMEOUT
+    """
+    global _cli_waiting
+    with _cli_waiting_lock:
+        _cli_waiting += 1
+    try:
+        acquired = _cli_semaphore.acquire(timeout=DECIMER_TIMEOUT)
+    finally:
+        with _cli_waiting_lock:
+            _cli_waiting -= 1
+    if not acquired:
+        raise subprocess.TimeoutExpired(DECIMER_CLI, DECIMER_TIMEOUT)
+    try:
+        return asyncio.run(_run_cli(image_path))
+    finally:
+        _cli_semaphore.release()
+
+
+async def _run_cli(image_path: str) -> Tuple[str, str, int]:
+    """
+    异步运行DECIMER CLI，超时后终止子进程
+    
+    Args:
+        image_path: 图片路径
+        
+    Returns:
+        (stdout, stderr, returncode)
+        
+    Raises:
+        subprocess.TimeoutExpired: 超过DECIMER_TIMEOUT
+    """
+    proc = await asyncio.create_subprocess_exec(
+        DECIMER_CLI, image_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), DECIMER_TIMEOUT)
+    except asyncio.TimeoutError:
+        # 终止整个进程组，避免CLI派生的子进程继续占用管道和CPU
+        os.killpg(proc.pid, signal.SIGKILL)
+        await proc.wait()
+        raise subprocess.TimeoutExpired(DECIMER_CLI, DECIMER_TIMEOUT)
+    return stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace"), proc.returncode
+
+
 def predict_smiles_cli(image_path: str) -> Dict:
     """
-    使用DECIMER CLI识别结构
+    使用DECIMER CLI识别结构（优先交给常驻worker，不可用时每次启动CLI进程）
     
     Args:
         image_path: 图片路径
@@ -159,21 +870,21 @@ def predict_smiles_cli(image_path: str) -> Dict:
     Returns:
         识别结果字典
     """
+    pool = get_worker_pool()
+    if pool is not None and pool.available:
+        try:
+            return _predict_smiles_worker(pool, image_path)
+        except EOFError:
+            pass
+    
     try:
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
         
         # 调用CLI
-        proc = subprocess.Popen(
-            [DECIMER_CLI, image_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        stdout, stderr, returncode = _run_cli_bounded(image_path)
+        elapsed = (time.monotonic_ns() - start_ns) / 1e9
         
-        stdout, stderr = proc.communicate(timeout=DECIMER_TIMEOUT)
-        elapsed = time.time() - start_time
-        
-        if proc.returncode != 0:
+        if returncode != 0:
             logger.error(f"❌ CLI返回错误: {stderr}")
             return {
                 "success": False,
@@ -183,13 +894,15 @@ def predict_smiles_cli(image_path: str) -> Dict:
         
         # 解析输出
         smiles, global_conf, token_confs = parse_decimer_output(stdout)
+        # 过长的原始输出不随响应返回
+        raw_output = stdout if len(stdout) <= MAX_RAW_OUTPUT_LENGTH else None
         
         if not smiles:
             logger.error(f"❌ 无法从CLI输出中提取SMILES")
             return {
                 "success": False,
                 "error": "Could not extract SMILES from CLI output",
-                "raw_output": stdout,
+                "raw_output": raw_output,
                 "method": "cli"
             }
         
@@ -199,7 +912,7 @@ def predict_smiles_cli(image_path: str) -> Dict:
             "token_confidences": token_confs,
             "global_confidence": global_conf,
             "elapsed_time": elapsed,
-            "raw_output": stdout,
+            "raw_output": raw_output,
             "method": "cli"
         }
         
@@ -222,6 +935,62 @@ def predict_smiles_cli(image_path: str) -> Dict:
         }
 
 
+def _predict_smiles_worker(pool: DecimerWorkerPool, image_path: str) -> Dict:
+    """
+    使用常驻worker识别结构
+    
+    Args:
+        pool: worker池
+        image_path: 图片路径
+        
+    Returns:
+        识别结果字典
+    """
+    try:
+        start_ns = time.monotonic_ns()
+        output = pool.predict(image_path, DECIMER_TIMEOUT)
+        elapsed = (time.monotonic_ns() - start_ns) / 1e9
+        
+        smiles = output.get("smiles")
+        if not smiles:
+            error = output.get("error") or "DECIMER worker returned empty SMILES"
+            logger.error(f"❌ worker识别失败: {error}")
+            return {
+                "success": False,
+                "error": error,
+                "method": "cli"
+            }
+        
+        result = {
+            "success": True,
+            "smiles": smiles,
+            "token_confidences": [],
+            "global_confidence": None,
+            "elapsed_time": elapsed,
+            "method": "cli"
+        }
+        
+        logger.info(f"✅ 识别成功 (worker): {smiles[:50]}... ({elapsed:.2f}s)")
+        return result
+        
+    except EOFError:
+        raise
+    except subprocess.TimeoutExpired:
+        logger.error(f"❌ worker超时 (>{DECIMER_TIMEOUT}s)")
+        return {
+            "success": False,
+            "error": f"DECIMER worker timeout (>{DECIMER_TIMEOUT}s)",
+            "method": "cli"
+        }
+    except Exception as e:
+        logger.error(f"❌ worker识别失败: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "method": "cli"
+        }
+
+
 def predict_smiles(image_path: str) -> Dict:
     """
     识别分子结构（自动选择模式）
@@ -238,18 +1007,118 @@ def predict_smiles(image_path: str) -> Dict:
         return predict_smiles_cli(image_path)
 
 
+# ==================== 识别结果缓存 ====================
+class PredictionCache:
+    """按图片内容哈希缓存识别结果（内存LRU + sqlite持久化）"""
+    
+    def __init__(self, db_path: str, max_size: int = DECIMER_CACHE_SIZE):
+        """
+        初始化缓存
+        
+        Args:
+            db_path: sqlite文件路径
+            max_size: 内存LRU最大条目数
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+    
+    @staticmethod
+    def key(image_bytes: bytes) -> str:
+        """
+        计算图片内容哈希
+        
+        Args:
+            image_bytes: 图片数据
+            
+        Returns:
+            十六进制哈希
+        """
+        return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前进程的sqlite连接（调用方持有锁）"""
+        pid = os.getpid()
+        if self._conn_pid != pid:
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, result TEXT)")
+            self._conn.commit()
+            self._conn_pid = pid
+        return self._conn
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        查询缓存
+        
+        Args:
+            key: 内容哈希
+            
+        Returns:
+            缓存的识别结果，未命中返回None
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            try:
+                row = self._connection().execute(
+                    "SELECT result FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  读取识别缓存失败: {e}")
+                return None
+            if row is None:
+                return None
+            result = json.loads(row[0])
+            self._remember(key, result)
+            return result
+    
+    def set(self, key: str, result: Dict):
+        """
+        写入缓存
+        
+        Args:
+            key: 内容哈希
+            result: 识别结果
+        """
+        with self._lock:
+            self._remember(key, result)
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO predictions (key, result) VALUES (?, ?)",
+                    (key, json.dumps(result, ensure_ascii=False))
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  写入识别缓存失败: {e}")
+    
+    def _remember(self, key: str, result: Dict):
+        """放入内存LRU（调用方持有锁）"""
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+
+prediction_cache = PredictionCache(DECIMER_CACHE_PATH)
+
+
 # ==================== API路由 ====================
 @app.route("/", methods=["GET"])
 def index():
     """服务首页"""
-    return jsonify({
+    return json_response({
         "service": "DECIMER REST API",
         "version": "1.0.0",
         "mode": DECIMER_MODE,
         "endpoints": {
             "/": "服务信息",
             "/health": "健康检查",
-            "/predict": "POST - 上传图片识别SMILES"
+            "/predict": "POST - 上传图片识别SMILES（?force=1 跳过缓存）"
         }
     })
 
@@ -257,10 +1126,11 @@ def index():
 @app.route("/health", methods=["GET"])
 def health_check():
     """健康检查"""
-    return jsonify({
+    return json_response({
         "status": "healthy",
         "mode": DECIMER_MODE,
         "python_available": DECIMER_AVAILABLE,
+        "cli_waiting": _cli_waiting,
         "timestamp": time.time()
     })
 
@@ -274,77 +1144,102 @@ def predict():
     # 检查是否有文件
     if 'image' not in request.files:
         logger.warning("请求缺少image字段")
-        return jsonify({
+        return json_response({
             "success": False,
             "error": "No image file provided. Use 'image' field in multipart/form-data"
-        }), 400
+        }, 400)
     
     file = request.files['image']
     
     # 检查文件名
     if file.filename == '':
         logger.warning("空文件名")
-        return jsonify({
+        return json_response({
             "success": False,
             "error": "Empty filename"
-        }), 400
+        }, 400)
     
     # 检查文件类型
     if not allowed_file(file.filename):
         logger.warning(f"不支持的文件类型: {file.filename}")
-        return jsonify({
+        return json_response({
             "success": False,
             "error": f"File type not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-        }), 400
+        }, 400)
     
-    # 保存临时文件
-    filename = secure_filename(file.filename)
-    timestamp = int(time.time() * 1000)
-    temp_filename = f"{timestamp}_{filename}"
-    temp_path = TEMP_DIR / temp_filename
+    filename = file.filename
     
     try:
-        file.save(str(temp_path))
-        logger.info(f"📥 接收文件: {filename} -> {temp_path}")
+        image_bytes = file.read()
         
-        # 调用DECIMER
-        result = predict_smiles(str(temp_path))
+        # 相同内容的图片直接返回缓存结果，?force=1 强制重新识别
+        cache_key = prediction_cache.key(image_bytes)
+        if request.args.get("force") != "1":
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"♻️  命中识别缓存: {filename}")
+                return json_response({**cached, "cached": True}, 200)
         
-        # 清理临时文件
-        try:
-            temp_path.unlink()
-        except:
-            pass
+        with staged_image(image_bytes, sniff_extension(image_bytes, filename)) as image_path:
+            logger.info(f"📥 接收文件: {filename} -> {image_path}")
+            
+            # 调用DECIMER
+            result = predict_smiles(image_path)
+        
+        if result.get("success"):
+            prediction_cache.set(cache_key, result)
         
         # 返回结果
         if result.get("success"):
-            return jsonify(result), 200
+            return json_response(result, 200)
         else:
-            return jsonify(result), 500
+            return json_response(result, 500)
             
     except Exception as e:
         logger.error(f"❌ 处理请求时出错: {e}")
-        
-        # 清理临时文件
-        try:
-            if temp_path.exists():
-                temp_path.unlink()
-        except:
-            pass
-        
-        return jsonify({
+        return json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
+
+
+@app.before_request
+def reject_early():
+    """在读取请求体之前拒绝过大或非multipart的上传"""
+    if request.path != "/predict" or request.method != "POST":
+        return None
+    
+    if request.content_length is not None and request.content_length > MAX_CONTENT_LENGTH:
+        logger.warning(f"请求体过大: {request.content_length} bytes")
+        return request_entity_too_large(None)
+    
+    if request.mimetype != "multipart/form-data":
+        logger.warning("请求缺少image字段")
+        return json_response({
+            "success": False,
+            "error": "No image file provided. Use 'image' field in multipart/form-data"
+        }, 400)
+    
+    return None
+
+
+@app.errorhandler(DisallowedUpload)
+def disallowed_upload(error):
+    """文件类型不允许"""
+    logger.warning(f"不支持的文件类型: {error.filename}")
+    return json_response({
+        "success": False,
+        "error": f"File type not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+    }, 400)
 
 
 @app.errorhandler(413)
 def request_entity_too_large(error):
     """文件过大处理"""
-    return jsonify({
+    return json_response({
         "success": False,
         "error": f"File too large. Maximum size: {MAX_CONTENT_LENGTH // (1024*1024)}MB"
-    }), 413
+    }, 413)
 
 
 # ==================== 主函数 ====================
@@ -360,6 +1255,10 @@ if __name__ == "__main__":
     logger.info(f"允许的文件类型: {', '.join(ALLOWED_EXTENSIONS)}")
     logger.info("=" * 60)
     
+    # 开发服务器模式下提前加载模型/启动worker，首个请求无需等待
+    warm_up()
+    
+    # 生产环境请使用 gunicorn wsgi:application（不加--preload，见 start_decimer_server.sh）
     app.run(
         host=HOST,
         port=PORT,
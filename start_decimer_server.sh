@@ -9,6 +9,22 @@ GREEN='\033[0;32m'
 YELLOW='\033[1;33m'
 NC='\033[0m' # No Color
 
+# 服务参数
+HOST=${HOST:-0.0.0.0}
+PORT=${PORT:-8000}
+WORKERS=${WORKERS:-2}
+THREADS=${THREADS:-4}
+DECIMER_TIMEOUT=${DECIMER_TIMEOUT:-60}
+
+# GPU模式下多个进程无法共享同一份模型，固定为单进程多线程
+if [ "${DECIMER_GPU:-0}" = "1" ]; then
+    WORKERS=1
+    THREADS=8
+fi
+
+# server.py按服务进程数限制每个进程的推理worker数
+export WEB_CONCURRENCY=$WORKERS
+
 # 启动服务
 echo ""
 echo -e "${GREEN}========================================${NC}"
@@ -18,14 +34,15 @@ echo ""
 
 # 选择启动方式
 if command -v gunicorn &> /dev/null; then
+    # 不使用--preload：TensorFlow不是fork安全的，每个worker在fork之后导入wsgi时各自加载模型
+    GUNICORN_CMD="gunicorn -w $WORKERS -k gthread --threads $THREADS -b $HOST:$PORT --timeout $DECIMER_TIMEOUT wsgi:application"
     echo "检测到gunicorn，使用多进程模式..."
-    echo "启动命令: gunicorn -w 2 -b $HOST:$PORT server:app"
+    echo "启动命令: $GUNICORN_CMD"
     echo ""
-    gunicorn -w 2 -b $HOST:$PORT server:app
+    exec $GUNICORN_CMD
 else
     echo "使用Flask开发服务器（单进程）"
     echo "生产环境建议安装gunicorn: pip install gunicorn"
     echo ""
-    python3 server.py
+    exec python3 server.py
 fi
-
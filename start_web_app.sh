@@ -33,12 +33,31 @@ if ! curl -s http://localhost:8000/health > /dev/null 2>&1; then
     fi
 fi
 
+# 服务参数
+HOST=${HOST:-0.0.0.0}
+PORT=${PORT:-5000}
+THREADS=${THREADS:-8}
+
 # 启动Flask应用
 echo "🚀 启动Flask Web应用..."
-echo "   应用地址: http://localhost:5000"
+echo "   应用地址: http://localhost:$PORT"
 echo "   按 Ctrl+C 停止服务"
 echo ""
 
 cd "$(dirname "$0")"
-python3 web_app.py
+if command -v gunicorn &> /dev/null && [ "${DEV:-0}" != "1" ]; then
+    # 固定单进程多线程：处理结果、图片路径缓存、任务队列和数据库同步线程都在进程内存中，
+    # 多个worker之间无法共享，日志文件轮转也不支持多进程同时写入
+    # 超时放宽到300秒，批量结构识别等较慢的同步请求不会被当作卡死的worker重启
+    GUNICORN_CMD="gunicorn -w 1 -k gthread --threads $THREADS -b $HOST:$PORT --timeout 300 web_wsgi:application"
+    echo "检测到gunicorn，使用单进程多线程模式..."
+    echo "启动命令: $GUNICORN_CMD"
+    echo ""
+    exec $GUNICORN_CMD
+else
+    echo "使用Flask开发服务器（单进程，DEV=1 时开启调试模式）"
+    echo "生产环境建议安装gunicorn: pip install gunicorn"
+    echo ""
+    exec python3 web_app.py
+fi
 
@@ -9,6 +9,11 @@ let currentTable = null;
 let currentPage = 1;
 let currentSearch = '';
 let tablePagination = null;
+let pageCursors = {};  // 页码 -> 键集分页游标（上一页最后一行的rowid）
+
+// 数据库同步状态轮询：每秒一次，最多轮询的次数（超过后提示仍在同步）
+const SYNC_POLL_INTERVAL_MS = 1000;
+const SYNC_POLL_MAX_ATTEMPTS = 120;
 
 // 页面加载完成后初始化
 document.addEventListener('DOMContentLoaded', function() {
@@ -194,16 +199,36 @@ async function loadPapers() {
     listContainer.innerHTML = '<p class="loading">加载中...</p>';
     
     try {
-        const response = await fetch('/api/papers');
-        const result = await response.json();
+        // NDJSON流式接口：每收到一行就渲染一篇论文
+        const response = await fetch('/api/papers/stream');
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let count = 0;
         
-        if (result.success && result.papers.length > 0) {
-            listContainer.innerHTML = '';
-            result.papers.forEach(paper => {
-                const item = createPaperItem(paper);
-                listContainer.appendChild(item);
-            });
-        } else {
+        const renderLine = (line) => {
+            if (!line.trim()) return;
+            if (count === 0) {
+                listContainer.innerHTML = '';
+            }
+            listContainer.appendChild(createPaperItem(JSON.parse(line)));
+            count++;
+        };
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.forEach(renderLine);
+        }
+        renderLine(buffer + decoder.decode());
+        
+        if (count === 0) {
             listContainer.innerHTML = '<p class="loading">暂无论文，请上传PDF文件</p>';
         }
     } catch (error) {
@@ -328,6 +353,36 @@ function switchDataType(type) {
     loadPaperData();
 }
 
+// 等待后台同步到数据库完成，返回最终状态（状态过期时返回null，轮询超时时返回{status: 'timeout'}）
+async function waitForSync(statusKey) {
+    for (let attempt = 0; attempt < SYNC_POLL_MAX_ATTEMPTS; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, SYNC_POLL_INTERVAL_MS));
+        const response = await fetch(`/api/status/${statusKey}`);
+        const result = await response.json();
+        if (!result.success) {
+            return null;
+        }
+        if (result.status.status === 'completed' || result.status.status === 'error') {
+            return result.status;
+        }
+    }
+    return {status: 'timeout'};
+}
+
+// 显示同步结果提示
+async function showSyncResult(statusKey, successMessage) {
+    const status = await waitForSync(statusKey);
+    if (!status) {
+        showToast('同步状态已过期，请刷新页面', 'warning');
+    } else if (status.status === 'timeout') {
+        showToast('数据库同步仍在进行中，请稍后刷新页面查看结果', 'warning');
+    } else if (status.status === 'error' || status.warning) {
+        showToast(status.message, 'warning');
+    } else {
+        showToast(successMessage || status.message, 'success');
+    }
+}
+
 // 保存数据
 async function saveData() {
     if (!currentPaperId || !currentPaperData) {
@@ -352,7 +407,8 @@ async function saveData() {
         const result = await response.json();
         
         if (result.success) {
-            showToast('保存成功，已同步到数据库', 'success');
+            showToast('保存成功，正在同步到数据库...', 'success');
+            await showSyncResult(result.status_key, '保存成功，已同步到数据库');
         } else {
             showToast('保存失败: ' + result.message, 'error');
         }
@@ -647,11 +703,12 @@ async function fillSmiles() {
             const result = await response.json();
             
             if (result.success) {
-                showToast('已填充到数据并同步到数据库', 'success');
+                showToast('已填充到数据，正在同步到数据库...', 'success');
                 // 重新加载数据以确保同步
                 setTimeout(() => {
                     openPaperModal(currentPaperId);
                 }, 500);
+                await showSyncResult(result.status_key, '已填充到数据并同步到数据库');
             } else {
                 showToast('填充成功，但同步到数据库失败: ' + result.message, 'warning');
             }
@@ -1180,9 +1237,17 @@ async function loadTableData(page = 1) {
         return;
     }
     
+    const search = searchInput ? searchInput.value.trim() : '';
+    // 切换表或搜索条件后，已记录的游标和总数失效
+    if (tableName !== currentTable || search !== currentSearch) {
+        pageCursors = {};
+        tablePagination = null;
+    }
+    // 同一查询内翻页时沿用已知总数（第1页总是重新统计）
+    const knownPagination = page > 1 && tablePagination && tablePagination.total !== null ? tablePagination : null;
     currentTable = tableName;
     currentPage = page;
-    currentSearch = searchInput ? searchInput.value.trim() : '';
+    currentSearch = search;
     
     container.innerHTML = '<p class="loading">加载中...</p>';
     
@@ -1195,6 +1260,12 @@ async function loadTableData(page = 1) {
         if (currentSearch) {
             params.append('search', currentSearch);
         }
+        if (pageCursors[page] !== undefined) {
+            params.append('cursor', pageCursors[page]);
+        }
+        if (knownPagination) {
+            params.append('skip_count', '1');
+        }
         
         const response = await fetch(`/api/database/${tableName}?${params.toString()}`);
         if (!response.ok) {
@@ -1207,6 +1278,13 @@ async function loadTableData(page = 1) {
         
         if (result.success) {
             tablePagination = result.pagination;
+            if (tablePagination.total === null && knownPagination) {
+                tablePagination.total = knownPagination.total;
+                tablePagination.pages = knownPagination.pages;
+            }
+            if (result.pagination.next_cursor !== null && result.pagination.next_cursor !== undefined) {
+                pageCursors[page + 1] = result.pagination.next_cursor;
+            }
             displayTableData(result.data, result.columns);
             updatePaginationControls();
         } else {
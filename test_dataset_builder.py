@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据集构建器测试脚本：批量插入（executemany）及出错时的逐条回退
+"""
+
+import sys
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from modules.dataset_builder import DatasetBuilder
+
+
+def make_photophysics_records(paper_id, count):
+    """生成字段组合不同的光物性记录（会被分成多个executemany批次）"""
+    records = []
+    for i in range(count):
+        record = {
+            'paper_id': paper_id,
+            'paper_local_id': str(i),
+            'compound_id': f'C{i}',
+            'lambda_PL_nm': 400.0 + i,
+        }
+        if i % 3 == 0:
+            record['Phi_PL'] = 0.5
+        records.append(record)
+    return records
+
+
+def fetch_rows(db_path, sql):
+    """读取查询结果"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_batch_insert():
+    """批量插入：所有记录入库，主键按 paper_id_paper_local_id_compound_id 生成"""
+    print("=" * 60)
+    print("测试1: 批量插入")
+    print("=" * 60)
+    
+    builder = DatasetBuilder(Path(tempfile.mkdtemp()))
+    records = make_photophysics_records('P1', 1200)
+    count = builder.insert_photophysics_records(iter(records))
+    rows = fetch_rows(builder.photophysics_db, "SELECT record_id, lambda_PL_nm, Phi_PL FROM photophysics ORDER BY rowid")
+    
+    expected = [(f'P1_{i}_C{i}', 400.0 + i, 0.5 if i % 3 == 0 else None) for i in range(1200)]
+    if count != 1200 or sorted(rows) != sorted(expected):
+        print(f"❌ 入库结果不符: 处理 {count} 条, 表中 {len(rows)} 行")
+        return False
+    print(f"✅ 入库 {len(rows)} 条记录，字段值与输入一致")
+    return True
+
+
+def test_reinsert_updates():
+    """重复同步：INSERT OR REPLACE更新已存在的记录，不产生重复行"""
+    print("\n" + "=" * 60)
+    print("测试2: 重复插入更新已有记录")
+    print("=" * 60)
+    
+    builder = DatasetBuilder(Path(tempfile.mkdtemp()))
+    builder.insert_photophysics_records(make_photophysics_records('P1', 10))
+    updated = make_photophysics_records('P1', 10)
+    for record in updated:
+        record['lambda_PL_nm'] = 500.0
+    builder.insert_photophysics_records(updated)
+    rows = fetch_rows(builder.photophysics_db, "SELECT COUNT(*), MIN(lambda_PL_nm), MAX(lambda_PL_nm) FROM photophysics")
+    
+    if rows[0] != (10, 500.0, 500.0):
+        print(f"❌ 更新结果不符: {rows[0]}")
+        return False
+    print("✅ 10 条记录被更新，没有重复行")
+    return True
+
+
+def test_fallback_skips_bad_record():
+    """批次中有无法绑定的值时逐条回退：只跳过出错的记录，其余记录照常入库"""
+    print("\n" + "=" * 60)
+    print("测试3: 批量失败时逐条回退")
+    print("=" * 60)
+    
+    builder = DatasetBuilder(Path(tempfile.mkdtemp()))
+    records = make_photophysics_records('P1', 9)
+    # 列表无法绑定为SQL参数，executemany会在该行报错
+    records[4]['lambda_PL_nm'] = [470.0]
+    # 缺少paper_id的记录在分批前就被跳过
+    records.append({'paper_local_id': 'x', 'compound_id': 'Cx', 'lambda_PL_nm': 450.0})
+    count = builder.insert_photophysics_records(records)
+    rows = fetch_rows(builder.photophysics_db, "SELECT record_id FROM photophysics")
+    
+    stored = {row[0] for row in rows}
+    expected = {f'P1_{i}_C{i}' for i in range(9) if i != 4}
+    if count != 10 or stored != expected:
+        print(f"❌ 回退结果不符: 处理 {count} 条, 入库 {sorted(stored)}")
+        return False
+    print(f"✅ 跳过 2 条问题记录，其余 {len(stored)} 条正常入库")
+    return True
+
+
+def test_device_records():
+    """器件记录：主键按 emitter_compound_id 生成"""
+    print("\n" + "=" * 60)
+    print("测试4: 器件记录插入")
+    print("=" * 60)
+    
+    builder = DatasetBuilder(Path(tempfile.mkdtemp()))
+    records = [
+        {'paper_id': 'P2', 'paper_local_id': str(i), 'emitter_compound_id': f'E{i}', 'EQE_max_percent': 20.0 + i}
+        for i in range(5)
+    ]
+    count = builder.insert_device_records(records)
+    rows = fetch_rows(builder.devices_db, "SELECT device_id FROM devices ORDER BY device_id")
+    
+    if count != 5 or [row[0] for row in rows] != [f'P2_{i}_E{i}' for i in range(5)]:
+        print(f"❌ 器件入库结果不符: {rows}")
+        return False
+    print("✅ 5 条器件记录入库")
+    return True
+
+
+def main():
+    """主函数"""
+    tests = [test_batch_insert, test_reinsert_updates, test_fallback_skips_bad_record, test_device_records]
+    tests_passed = sum(1 for test in tests if test())
+    tests_total = len(tests)
+    
+    # 输出总结
+    print("\n" + "=" * 60)
+    print(f"通过: {tests_passed}/{tests_total}")
+    print("=" * 60)
+    
+    if tests_passed == tests_total:
+        print("\n🎉 所有测试通过!")
+        return 0
+    print("\n⚠️  部分测试失败")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+质量控制测试脚本：向量化批量校验与逐条校验结果必须一致
+"""
+
+import sys
+import random
+import numpy as np
+
+from modules.quality_control import QualityController, _PHOTOPHYSICAL_CHECKS, _DEVICE_CHECKS
+
+# 测试配置
+RECORD_COUNT = 2000
+SEED = 42
+
+
+def random_value(lo, hi):
+    """生成校验字段的随机取值：缺失、NaN、各种数值类型、范围内外的值"""
+    span = 1000.0 if hi == float('inf') else (hi - lo)
+    choice = random.random()
+    if choice < 0.15:
+        return None
+    if choice < 0.2:
+        return float('nan')
+    if choice < 0.25:
+        return random.choice([True, False])
+    if choice < 0.35:
+        return np.int64(random.randint(int(lo - span), int(lo + 2 * span)))
+    if choice < 0.45:
+        return random.randint(int(lo - span), int(lo + 2 * span))
+    return random.uniform(lo - span / 2, lo + span * 1.5)
+
+
+def make_records(checks, count):
+    """按校验表生成随机记录"""
+    fields = {}
+    for key, lo, hi, _, _ in checks:
+        fields.setdefault(key, (lo, hi))
+    records = []
+    for _ in range(count):
+        record = {key: random_value(lo, hi) for key, (lo, hi) in fields.items()}
+        # 部分记录缺少字段
+        for key in random.sample(list(record), random.randint(0, 2)):
+            del record[key]
+        records.append(record)
+    return records
+
+
+def compare_paths(name, checks, validate_record):
+    """同一批记录分别走向量化和逐条校验，比较质量标记和问题列表"""
+    print("\n" + "=" * 60)
+    print(f"测试: {name} 向量化校验与逐条校验一致")
+    print("=" * 60)
+    
+    qc = QualityController()
+    records = make_records(checks, RECORD_COUNT)
+    flags, issues = qc._vectorized_validate(records, checks)
+    
+    mismatches = 0
+    for record, flag, record_issues in zip(records, flags, issues):
+        expected_flag, expected_issues = validate_record(record)
+        if ("valid", "suspect", "invalid")[flag] != expected_flag or record_issues != expected_issues:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"❌ 不一致: {record}")
+                print(f"   向量化: {flag} {record_issues}")
+                print(f"   逐条:   {expected_flag} {expected_issues}")
+    
+    nan_flagged = sum(1 for r, f in zip(records, flags)
+                      if f and any(isinstance(v, float) and v != v for v in r.values()))
+    print(f"   记录数: {len(records)}, 含NaN且被标记: {nan_flagged}")
+    if mismatches:
+        print(f"❌ {mismatches} 条记录结果不一致")
+        return False
+    print("✅ 两条路径结果完全一致")
+    return True
+
+
+def test_photophysical_parity():
+    """光物性记录"""
+    qc = QualityController()
+    return compare_paths("光物性", _PHOTOPHYSICAL_CHECKS, qc.validate_photophysical_record)
+
+
+def test_device_parity():
+    """器件记录"""
+    qc = QualityController()
+    return compare_paths("器件", _DEVICE_CHECKS, qc.validate_device_record)
+
+
+def test_numeric_string_rejected():
+    """数字字符串不能被向量化路径隐式转换为数值"""
+    print("\n" + "=" * 60)
+    print("测试: 数字字符串不做隐式转换")
+    print("=" * 60)
+    
+    qc = QualityController()
+    records = [{"lambda_PL_nm": 450.0}, {"lambda_PL_nm": "450"}]
+    try:
+        qc._vectorized_validate(records, _PHOTOPHYSICAL_CHECKS)
+    except TypeError as e:
+        print(f"✅ 向量化路径拒绝非数值字段: {e}")
+    else:
+        print("❌ 向量化路径把 \"450\" 当作数值通过了校验")
+        return False
+    
+    # 批量校验回退到逐条校验，与逐条校验的行为一致
+    for validate in (qc.batch_validate_photophysical, lambda recs: [qc.validate_photophysical_record(r) for r in recs]):
+        try:
+            validate([dict(r) for r in records])
+        except TypeError:
+            continue
+        print("❌ 数字字符串应与逐条校验一样报错")
+        return False
+    print("✅ 批量校验与逐条校验对数字字符串的处理一致")
+    return True
+
+
+def test_nan_values():
+    """NaN的处理与原逐条校验一致：单边检查（ΔE_ST、寿命、亮度）不报问题，双边范围检查视为越界"""
+    print("\n" + "=" * 60)
+    print("测试: NaN值的校验结果")
+    print("=" * 60)
+    
+    qc = QualityController()
+    nan = float('nan')
+    cases = [
+        (qc.validate_photophysical_record, _PHOTOPHYSICAL_CHECKS, {"Delta_EST_eV": nan}, ("valid", [])),
+        (qc.validate_photophysical_record, _PHOTOPHYSICAL_CHECKS, {"tau_prompt_ns": nan, "tau_delayed_us": nan},
+         ("valid", [])),
+        (qc.validate_photophysical_record, _PHOTOPHYSICAL_CHECKS, {"lambda_PL_nm": nan},
+         ("invalid", ["lambda_PL_nm=nan 超出合理范围 (200, 800)"])),
+        (qc.validate_device_record, _DEVICE_CHECKS, {"L_max_cd_m2": nan}, ("valid", [])),
+        (qc.validate_device_record, _DEVICE_CHECKS, {"CIE_x": nan}, ("invalid", ["CIE_x=nan 超出范围 [0, 1]"])),
+    ]
+    for validate_record, checks, record, expected in cases:
+        flags, issues = qc._vectorized_validate([record], checks)
+        vectorized = (("valid", "suspect", "invalid")[flags[0]], issues[0])
+        if validate_record(record) != expected or vectorized != expected:
+            print(f"❌ {record}: 逐条 {validate_record(record)}, 向量化 {vectorized}, 期望 {expected}")
+            return False
+    print(f"✅ {len(cases)} 个NaN用例在两条路径上结果均符合预期")
+    return True
+
+
+def main():
+    """主函数"""
+    random.seed(SEED)
+    
+    tests = [test_photophysical_parity, test_device_parity, test_nan_values, test_numeric_string_rejected]
+    tests_passed = sum(1 for test in tests if test())
+    tests_total = len(tests)
+    
+    # 输出总结
+    print("\n" + "=" * 60)
+    print(f"通过: {tests_passed}/{tests_total}")
+    print("=" * 60)
+    
+    if tests_passed == tests_total:
+        print("\n🎉 所有测试通过!")
+        return 0
+    print("\n⚠️  部分测试失败")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
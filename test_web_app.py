@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web应用数据层测试脚本（使用临时目录，不读写data目录下的真实数据）
+"""
+
+import sys
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import web_app
+from modules.entity_aligner import EntityAligner
+
+
+def use_temp_paper_store():
+    """把论文存储切换到新的临时目录，返回该目录"""
+    storage = Path(tempfile.mkdtemp())
+    with web_app._paper_store_lock:
+        if web_app._paper_store_conn is not None:
+            web_app._paper_store_conn.close()
+        web_app._paper_store_conn = None
+        web_app._paper_store_pid = None
+    web_app.DATA_STORAGE = storage
+    web_app.PAPER_STORE_PATH = storage / "papers_kv.db"
+    return storage
+
+
+def test_legacy_json_migration():
+    """旧版逐篇JSON文件在首次访问时导入papers_kv，内容与原文件一致"""
+    print("=" * 60)
+    print("测试: 旧版JSON论文数据导入papers_kv")
+    print("=" * 60)
+    
+    storage = use_temp_paper_store()
+    papers = {}
+    for i in range(3):
+        paper_id = f"paper_{i}"
+        papers[paper_id] = {
+            'paper_id': paper_id,
+            'title': f'标题 {i}',
+            'created_at': f'2024-01-0{i + 1}T00:00:00',
+            'photophysical_data': [{'paper_local_id': str(j)} for j in range(i)],
+            'device_data': [],
+            'molecular_figures': [],
+            'tables': [{'table_id': 't1', 'markdown_table': '|a|'}],
+            'paragraphs': [{'para_id': 'p1', 'text': '正文'}],
+        }
+        with open(storage / f"{paper_id}.json", 'w', encoding='utf-8') as f:
+            json.dump(papers[paper_id], f, ensure_ascii=False)
+    
+    listed = web_app.list_papers()
+    if [p['paper_id'] for p in listed] != ['paper_2', 'paper_1', 'paper_0']:
+        print(f"❌ 列表顺序或内容不符: {listed}")
+        return False
+    if [p['photophysical_count'] for p in listed] != [2, 1, 0]:
+        print(f"❌ 冗余计数列不符: {listed}")
+        return False
+    for paper_id, data in papers.items():
+        if web_app.load_paper_data(paper_id) != data:
+            print(f"❌ 导入后数据不一致: {paper_id}")
+            return False
+    print("✅ 3 篇旧版论文已导入，列表和详情与原文件一致")
+    
+    # 删除论文时旧文件一并删除，重新打开存储也不会再次导入
+    web_app.delete_paper_data('paper_1')
+    if (storage / "paper_1.json").exists():
+        print("❌ 删除论文后旧版JSON文件仍然存在")
+        return False
+    with web_app._paper_store_lock:
+        web_app._paper_store_pid = None
+    if web_app.load_paper_data('paper_1') is not None or len(web_app.list_papers()) != 2:
+        print("❌ 已删除的论文被重新导入")
+        return False
+    print("✅ 删除后不会被重新导入")
+    return True
+
+
+def test_body_column_migration():
+    """没有body列的旧版papers_kv表会补上该列，旧行的正文仍从blob读取"""
+    print("\n" + "=" * 60)
+    print("测试: 旧版papers_kv表补充body列")
+    print("=" * 60)
+    
+    storage = use_temp_paper_store()
+    old_data = {'paper_id': 'old', 'title': '旧论文', 'created_at': '2023', 'tables': [{'table_id': 't'}]}
+    conn = sqlite3.connect(str(storage / "papers_kv.db"))
+    conn.execute(
+        "CREATE TABLE papers_kv (paper_id TEXT PRIMARY KEY, title TEXT, created_at TEXT, "
+        "phys_count INT, dev_count INT, figs_count INT, config_name TEXT, blob BLOB)"
+    )
+    conn.execute(
+        "INSERT INTO papers_kv VALUES (?, ?, ?, 0, 0, 0, NULL, ?)",
+        ('old', '旧论文', '2023', json.dumps(old_data, ensure_ascii=False).encode('utf-8'))
+    )
+    conn.commit()
+    conn.close()
+    
+    if web_app.load_paper_data('old') != old_data:
+        print("❌ 旧行数据读取不一致")
+        return False
+    new_data = {'paper_id': 'new', 'title': '新论文', 'created_at': '2024', 'paragraphs': [{'text': 'x'}]}
+    web_app.save_paper_data('new', new_data)
+    if web_app.load_paper_data('new') != new_data:
+        print("❌ 新行数据读取不一致")
+        return False
+    print("✅ body列已补充，新旧两种行都能正确读取")
+    return True
+
+
+def molecules_rows(entity_aligner):
+    """读取molecules表的 compound_id -> (paper_local_id, name, smiles)"""
+    conn = sqlite3.connect(str(entity_aligner.db_path))
+    try:
+        return {
+            row[0]: row[1:]
+            for row in conn.execute("SELECT compound_id, paper_local_id, name, smiles FROM molecules")
+        }
+    finally:
+        conn.close()
+
+
+def add_abort_trigger(entity_aligner, compound_id):
+    """更新指定compound时抛错，模拟批量写入中途失败"""
+    conn = sqlite3.connect(str(entity_aligner.db_path))
+    conn.execute(
+        "CREATE TRIGGER abort_update BEFORE UPDATE ON molecules "
+        f"WHEN OLD.compound_id = '{compound_id}' BEGIN SELECT RAISE(ABORT, 'simulated failure'); END"
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_compound_creation():
+    """未映射记录批量创建compound：有SMILES按SMILES生成ID，否则使用临时ID；已有记录只在SMILES变化时更新"""
+    print("\n" + "=" * 60)
+    print("测试: 批量创建compound记录")
+    print("=" * 60)
+    
+    entity_aligner = EntityAligner(Path(tempfile.mkdtemp()) / "molecules.db")
+    existing_id = entity_aligner._generate_compound_id("CCO")
+    conn = sqlite3.connect(str(entity_aligner.db_path))
+    conn.execute("INSERT INTO molecules (compound_id, paper_id, smiles) VALUES (?, 'P0', '')", (existing_id,))
+    conn.commit()
+    conn.close()
+    
+    # 超过一个IN查询分块的记录数
+    records = [{'paper_local_id': str(i), 'name': f'M{i}'} for i in range(web_app.SQL_IN_CHUNK_SIZE + 20)]
+    records.append({'paper_local_id': 'a', 'name': 'Ethanol', 'smiles': 'CCO'})
+    records.append({'paper_local_id': 'b', 'name': 'Ethanol-2', 'smiles': 'CCO'})
+    records.append({'name': '缺少编号'})
+    resolved = web_app.ensure_compounds_for_records(entity_aligner, 'P1', records)
+    rows = molecules_rows(entity_aligner)
+    
+    if len(resolved) != len(records) - 1 or any('compound_id' not in r for r in resolved):
+        print(f"❌ 返回的记录不符: {len(resolved)} 条")
+        return False
+    if rows.get('P1_0') != ('0', 'M0', '') or len(rows) != web_app.SQL_IN_CHUNK_SIZE + 21:
+        print(f"❌ 临时compound记录不符: {rows.get('P1_0')}, 共 {len(rows)} 行")
+        return False
+    # 已有记录的SMILES为空：第一条记录更新它，第二条SMILES相同不再更新
+    if rows[existing_id] != ('a', 'Ethanol', 'CCO'):
+        print(f"❌ 已有compound记录更新不符: {rows[existing_id]}")
+        return False
+    print(f"✅ 新建 {len(rows) - 1} 条compound记录，已有记录按SMILES更新")
+    return True
+
+
+def test_smiles_sync():
+    """SMILES同步：已映射记录按compound_id更新，未映射记录按paper_local_id查找后更新"""
+    print("\n" + "=" * 60)
+    print("测试: 同步molecules表SMILES")
+    print("=" * 60)
+    
+    entity_aligner = EntityAligner(Path(tempfile.mkdtemp()) / "molecules.db")
+    conn = sqlite3.connect(str(entity_aligner.db_path))
+    conn.executemany(
+        "INSERT INTO molecules (compound_id, paper_id, paper_local_id, smiles) VALUES (?, ?, ?, ?)",
+        [('A', 'P1', '1', ''), ('B', 'P1', '2', 'CC'), ('C', 'P1', '3', 'CN'), ('D', 'P2', '4', '')]
+    )
+    conn.commit()
+    conn.close()
+    
+    phys_mapped = [{'compound_id': 'A', 'smiles': 'CCO'}, {'compound_id': 'B', 'smiles': 'CC'}]
+    # paper_local_id为整数时也能对应到TEXT列；P2的记录不属于本论文，不会被更新
+    phys_unmapped = [{'paper_local_id': 3, 'smiles': 'CNC'}, {'paper_local_id': '4', 'smiles': 'O'}]
+    updated = web_app.sync_molecule_smiles(entity_aligner, 'P1', phys_mapped, phys_unmapped)
+    smiles = {compound_id: row[2] for compound_id, row in molecules_rows(entity_aligner).items()}
+    
+    if updated != 2 or smiles != {'A': 'CCO', 'B': 'CC', 'C': 'CNC', 'D': ''}:
+        print(f"❌ 同步结果不符: 更新 {updated} 行, {smiles}")
+        return False
+    print("✅ 更新 2 行，未变化及其他论文的记录保持不变")
+    return True
+
+
+def test_molecules_rollback():
+    """批量写入中途失败时整批回滚，molecules表不留下部分写入"""
+    print("\n" + "=" * 60)
+    print("测试: molecules写入失败时回滚")
+    print("=" * 60)
+    
+    entity_aligner = EntityAligner(Path(tempfile.mkdtemp()) / "molecules.db")
+    existing_id = entity_aligner._generate_compound_id("CCO")
+    conn = sqlite3.connect(str(entity_aligner.db_path))
+    conn.execute("INSERT INTO molecules (compound_id, paper_id, smiles) VALUES (?, 'P0', '')", (existing_id,))
+    conn.execute("INSERT INTO molecules (compound_id, paper_id, paper_local_id, smiles) VALUES ('A', 'P1', '1', '')")
+    conn.commit()
+    conn.close()
+    add_abort_trigger(entity_aligner, existing_id)
+    before = molecules_rows(entity_aligner)
+    
+    # 新建记录先写入，随后更新已有记录时失败
+    records = [{'paper_local_id': str(i)} for i in range(10)] + [{'paper_local_id': 'x', 'smiles': 'CCO'}]
+    try:
+        web_app.ensure_compounds_for_records(entity_aligner, 'P1', records)
+        print("❌ 预期写入失败，但没有抛出异常")
+        return False
+    except sqlite3.DatabaseError:
+        pass
+    if molecules_rows(entity_aligner) != before:
+        print("❌ 创建compound失败后留下了部分写入")
+        return False
+    print("✅ 创建compound失败后整批回滚")
+    
+    # 第一条UPDATE成功，第二条失败
+    phys_mapped = [{'compound_id': 'A', 'smiles': 'CN'}, {'compound_id': existing_id, 'smiles': 'CCO'}]
+    try:
+        web_app.sync_molecule_smiles(entity_aligner, 'P1', phys_mapped, [])
+        print("❌ 预期同步失败，但没有抛出异常")
+        return False
+    except sqlite3.DatabaseError:
+        pass
+    if molecules_rows(entity_aligner) != before:
+        print("❌ SMILES同步失败后留下了部分写入")
+        return False
+    print("✅ SMILES同步失败后整批回滚")
+    return True
+
+
+def use_temp_dataset(row_count):
+    """在临时目录中建立photophysics数据集表（删除部分行使rowid不连续），返回数据库路径"""
+    database_dir = Path(tempfile.mkdtemp())
+    web_app.DATABASE_DIR = database_dir
+    web_app.SEARCH_INDEX_DIR = database_dir / "search_index"
+    db_path = database_dir / "photophysics.db"
+    names = ['DMAC-TRZ', '4CzIPN', 'PXZ-TRZ', '二苯基砜']
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE photophysics (record_id TEXT PRIMARY KEY, name TEXT, smiles TEXT, Phi_PL REAL)")
+    conn.executemany(
+        "INSERT INTO photophysics VALUES (?, ?, ?, ?)",
+        [(f"r{i:05d}", names[i % len(names)], 'C' * (i % 7 + 1) + 'N', round(i / row_count, 4))
+         for i in range(row_count)]
+    )
+    conn.execute("DELETE FROM photophysics WHERE rowid % 11 = 0")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def fetch_all_pages(client, per_page, search='', use_cursor=True):
+    """逐页读取表数据，返回 (全部record_id, 第一页返回的总数)"""
+    ids = []
+    total = None
+    page = 1
+    cursor = None
+    while True:
+        url = f"/api/database/photophysics?per_page={per_page}&page={page}&search={search}"
+        if use_cursor and cursor is not None:
+            url += f"&cursor={cursor}"
+        result = client.get(url).get_json()
+        if total is None:
+            total = result['pagination']['total']
+        ids.extend(row['record_id'] for row in result['data'])
+        cursor = result['pagination']['next_cursor']
+        page += 1
+        if len(result['data']) < per_page or (use_cursor and cursor is None):
+            break
+    return ids, total
+
+
+def test_keyset_pagination():
+    """键集分页（cursor）与OFFSET分页返回相同的行，顺序与rowid一致"""
+    print("\n" + "=" * 60)
+    print("测试: 数据浏览键集分页")
+    print("=" * 60)
+    
+    db_path = use_temp_dataset(1000)
+    conn = sqlite3.connect(str(db_path))
+    expected = [row[0] for row in conn.execute("SELECT record_id FROM photophysics ORDER BY rowid")]
+    expected_trz = [row[0] for row in conn.execute(
+        "SELECT record_id FROM photophysics WHERE name LIKE '%TRZ%' ORDER BY rowid")]
+    conn.close()
+    client = web_app.app.test_client()
+    
+    for search, rows in (('', expected), ('TRZ', expected_trz)):
+        by_cursor, total = fetch_all_pages(client, 37, search)
+        by_offset, _ = fetch_all_pages(client, 37, search, use_cursor=False)
+        if by_cursor != rows or by_offset != rows or total != len(rows):
+            print(f"❌ 分页结果不符 (search={search!r}): cursor {len(by_cursor)} 行, "
+                  f"offset {len(by_offset)} 行, 期望 {len(rows)} 行, total={total}")
+            return False
+        print(f"✅ search={search!r}: cursor与offset分页均返回 {len(rows)} 行，顺序一致")
+    return True
+
+
+def test_search_index_matches_like():
+    """trigram全文索引搜索与LIKE搜索结果一致；浏览请求不建索引，数据变化后回退LIKE"""
+    print("\n" + "=" * 60)
+    print("测试: 全文索引搜索与LIKE搜索一致")
+    print("=" * 60)
+    
+    if not web_app.FTS5_TRIGRAM_AVAILABLE:
+        print("⚠️  当前SQLite不支持FTS5 trigram，跳过")
+        return True
+    
+    db_path = use_temp_dataset(3000)
+    client = web_app.app.test_client()
+    terms = ['TRZ', 'trz', 'CzI', '二苯基', 'CCCN', '0.12', 'C"N', 'zzz']
+    
+    def search_all(term, use_index):
+        web_app.FTS5_TRIGRAM_AVAILABLE = use_index
+        try:
+            return fetch_all_pages(client, 500, term)
+        finally:
+            web_app.FTS5_TRIGRAM_AVAILABLE = True
+    
+    # 浏览请求只读取索引，不创建索引
+    search_all('TRZ', True)
+    if web_app.search_index_ready(db_path, 'photophysics') is not None:
+        print("❌ 浏览请求创建了全文索引")
+        return False
+    
+    web_app.refresh_search_indexes()
+    if web_app.search_index_ready(db_path, 'photophysics') is None:
+        print("❌ 刷新后全文索引不可用")
+        return False
+    for term in terms:
+        by_index = search_all(term, True)
+        by_like = search_all(term, False)
+        if by_index != by_like:
+            print(f"❌ 搜索 {term!r} 结果不一致: 索引 {by_index[1]} 条, LIKE {by_like[1]} 条")
+            return False
+    print(f"✅ {len(terms)} 个搜索词的索引结果与LIKE一致")
+    
+    # 数据库内不应出现索引表
+    conn = sqlite3.connect(str(db_path))
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    conn.execute("INSERT INTO photophysics VALUES ('new', 'NEWTRZ', 'C', 0.5)")
+    conn.commit()
+    conn.close()
+    if tables != ['photophysics']:
+        print(f"❌ 数据集数据库中出现了额外的表: {tables}")
+        return False
+    
+    # 写入后索引过期，回退LIKE仍能搜到新记录
+    if web_app.search_index_ready(db_path, 'photophysics') is not None or search_all('NEWTRZ', True)[1] != 1:
+        print("❌ 数据变化后没有回退到LIKE搜索")
+        return False
+    web_app.refresh_search_indexes()
+    if search_all('newtrz', True) != search_all('newtrz', False) or search_all('TRZ', True) != search_all('TRZ', False):
+        print("❌ 重建索引后结果不一致")
+        return False
+    print("✅ 数据变化后回退LIKE，重建后索引结果仍与LIKE一致")
+    return True
+
+
+def main():
+    """主函数"""
+    tests = [
+        test_legacy_json_migration, test_body_column_migration,
+        test_compound_creation, test_smiles_sync, test_molecules_rollback,
+        test_keyset_pagination, test_search_index_matches_like,
+    ]
+    tests_passed = sum(1 for test in tests if test())
+    tests_total = len(tests)
+    
+    # 输出总结
+    print("\n" + "=" * 60)
+    print(f"通过: {tests_passed}/{tests_total}")
+    print("=" * 60)
+    
+    if tests_passed == tests_total:
+        print("\n🎉 所有测试通过!")
+        return 0
+    print("\n⚠️  部分测试失败")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
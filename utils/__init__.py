@@ -5,6 +5,10 @@
 """
 
 from .logger import setup_logger
+from .json_utils import json_dumps, json_loads, json_dump_file, json_load_file
 
-__all__ = ['setup_logger']
+__all__ = [
+    'setup_logger',
+    'json_dumps', 'json_loads', 'json_dump_file', 'json_load_file',
+]
 
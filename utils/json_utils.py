@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON工具 - 优先使用orjson，未安装时回退到标准库json
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，两种实现都可以这样捕获
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def json_dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """
+    序列化为UTF-8编码的JSON字节串（非ASCII字符不转义）
+
+    Args:
+        obj: 待序列化对象
+        indent: 是否使用2空格缩进
+
+    Returns:
+        JSON字节串
+    """
+    if orjson is not None:
+        option = _ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # orjson不支持的类型（如超过64位的整数），交给标准库处理
+            pass
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    """
+    序列化为JSON字符串（非ASCII字符不转义）
+
+    Args:
+        obj: 待序列化对象
+        indent: 是否使用2空格缩进
+
+    Returns:
+        JSON字符串
+    """
+    return json_dumps_bytes(obj, indent).decode('utf-8')
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """
+    解析JSON字符串或字节串
+
+    Args:
+        data: JSON数据
+
+    Returns:
+        解析后的对象
+
+    Raises:
+        JSONDecodeError: JSON格式错误
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dump_file(obj: Any, output_path: Union[str, Path], indent: bool = True):
+    """
+    将对象写入JSON文件（直接写字节，跳过str编码步骤）
+
+    Args:
+        obj: 待序列化对象
+        output_path: 输出文件路径
+        indent: 是否使用2空格缩进
+    """
+    with open(output_path, 'wb') as f:
+        f.write(json_dumps_bytes(obj, indent))
+
+
+def json_load_file(input_path: Union[str, Path]) -> Any:
+    """
+    读取JSON文件
+
+    Args:
+        input_path: 文件路径
+
+    Returns:
+        解析后的对象
+    """
+    with open(input_path, 'rb') as f:
+        return json_loads(f.read())
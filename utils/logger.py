@@ -4,42 +4,104 @@
 日志工具
 """
 
-import logging
+import os
 import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
 from pathlib import Path
 from config import LOG_FORMAT, LOG_LEVEL, LOG_FILE
 
+# 文件和控制台处理器只在根日志记录器上配置一次，各模块的记录器通过传播共用；
+# 调用线程只把日志放入队列，格式化和写文件由后台监听线程完成
+_root_configured = False
+_configure_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+def _configure_root(log_file: Path):
+    """
+    配置根日志记录器（进程内只执行一次）
+
+    Args:
+        log_file: 日志文件路径
+    """
+    global _listener, _queue_handler
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    # 按大小轮转，避免日志无限增长
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'
+    )
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_stop_listener)
+
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    # 第三方库仍只输出WARNING及以上
+    root.setLevel(logging.WARNING)
+
+
+def _stop_listener():
+    """停止当前进程的监听线程并写出队列中剩余的日志"""
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener_after_fork():
+    """
+    fork出的子进程中没有监听线程（如gunicorn --preload先在主进程导入应用再fork worker），
+    为子进程换一个新队列并启动自己的监听线程，否则日志只会堆积在队列里
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, *_listener.handlers, respect_handler_level=True
+    )
+    _queue_handler.queue = log_queue
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
 
 def setup_logger(name: str, log_file: Path = LOG_FILE) -> logging.Logger:
     """
     设置日志记录器
-    
+
     Args:
         name: 日志记录器名称
-        log_file: 日志文件路径
-        
+        log_file: 日志文件路径（首次调用时用于配置共享的文件处理器）
+
     Returns:
         配置好的日志记录器
     """
+    global _root_configured
+    if not _root_configured:
+        with _configure_lock:
+            if not _root_configured:
+                _configure_root(log_file)
+                _root_configured = True
+
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, LOG_LEVEL))
-    
-    # 避免重复添加handler
-    if logger.handlers:
-        return logger
-    
-    # 文件处理器
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    
-    # 控制台处理器
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+    logger.propagate = True
     return logger
-
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SMILES解析工具（带缓存）
+"""
+
+from functools import lru_cache
+from typing import Tuple
+
+try:
+    from rdkit import Chem
+    from rdkit.Chem import Descriptors
+    RDKIT_AVAILABLE = True
+except ImportError:
+    Chem = None
+    Descriptors = None
+    RDKIT_AVAILABLE = False
+
+
+@lru_cache(maxsize=100_000)
+def parse_and_score_smiles(smiles: str) -> Tuple[bool, str, float, int]:
+    """
+    用RDKit解析SMILES并计算分子量和原子数
+
+    同一SMILES在不同论文中经常重复出现，结果按字符串缓存，
+    供结构识别和质量控制共用。调用前需确认RDKIT_AVAILABLE。
+
+    Args:
+        smiles: SMILES字符串
+
+    Returns:
+        (是否可解析, 异常信息, 分子量, 原子数)
+    """
+    try:
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            return False, "", 0.0, 0
+        return True, "", Descriptors.MolWt(mol), mol.GetNumAtoms()
+    except Exception as e:
+        return False, f"Validation error: {str(e)}", 0.0, 0
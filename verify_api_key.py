@@ -6,94 +6,424 @@
 
 import os
 import sys
+import json
+import time
+import hashlib
+import asyncio
+import argparse
+import tempfile
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ReadTimeoutError
 
-def verify_api_key(api_key=None):
-    """验证API Key是否有效"""
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# 复用连接，多次验证时跳过TCP/TLS握手
+_SESSION = None
+
+
+# 验证成功的结果在本地缓存一段时间（只缓存Key的SHA256，不保存Key本身）
+_CACHE_PATH = os.path.expanduser("~/.cache/dashscope_keycheck.json")
+_CACHE_TTL = 600
+_cache_lock = threading.Lock()
+
+
+def _key_hash(api_key: str) -> str:
+    """计算API Key的SHA256"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _load_cache() -> dict:
+    """读取验证缓存，文件不存在或损坏时返回空字典"""
+    try:
+        with open(_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _is_cached_valid(api_key: str) -> bool:
+    """API Key是否在有效期内验证通过过"""
+    entry = _load_cache().get(_key_hash(api_key))
+    return bool(entry and entry.get("ok") and time.time() - entry.get("ts", 0) < _CACHE_TTL)
+
+
+def _cache_valid(api_key: str):
+    """记录验证通过的API Key（原子替换缓存文件）"""
+    with _cache_lock:
+        cache = _load_cache()
+        now = time.time()
+        # 顺便清理过期条目
+        cache = {h: e for h, e in cache.items() if now - e.get("ts", 0) < _CACHE_TTL}
+        cache[_key_hash(api_key)] = {"ok": True, "ts": now}
+        try:
+            cache_dir = os.path.dirname(_CACHE_PATH)
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, _CACHE_PATH)
+        except OSError:
+            pass
+
+
+_BASE_URL = "https://dashscope.aliyuncs.com/"
+_MODELS_URL = _BASE_URL + "compatible-mode/v1/models"
+_CHAT_URL = _BASE_URL + "compatible-mode/v1/chat/completions"
+# (连接超时, 读取超时)：网络不通时约3秒即失败
+_TIMEOUT = (3.05, 7)
+_RETRIES = 3
+# 读取超时最多重试1次：服务端可能已在处理请求，欠费检查的POST重发会再计费一次，且每次要多等一个读取超时
+_READ_RETRIES = 1
+_BILLING_PAYLOAD = {
+    "model": "qwen-plus",
+    "messages": [
+        {"role": "user", "content": "Hello"}
+    ],
+    "max_tokens": 10
+}
+
+
+def _get_session() -> requests.Session:
+    """获取共享的HTTP会话（首次调用时创建）"""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = requests.Session()
+        # 超时、限流和网关错误自动指数退避重试
+        retry = Retry(
+            total=_RETRIES,
+            read=_READ_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=8)
+        _SESSION.mount("https://", adapter)
+        _SESSION.headers.update({"Content-Type": "application/json"})
+    return _SESSION
+
+
+def _warm_up_connection():
+    """并发验证前先建立一条TLS连接，DNS解析和握手只做一次"""
+    try:
+        _get_session().head(_BASE_URL, timeout=(3.05, 3), allow_redirects=False).close()
+    except requests.exceptions.RequestException:
+        pass
+
+
+def _mask_key(api_key: str) -> str:
+    """遮蔽API Key中间部分，用于输出"""
+    return f"{api_key[:20]}...{api_key[-10:]}"
+
+
+def _safe_json(response: requests.Response) -> dict:
+    """
+    解析响应JSON，非JSON响应（如网关HTML错误页）返回空字典
     
-    if not api_key:
-        # 从环境变量或用户输入获取
-        api_key = os.getenv("DASHSCOPE_API_KEY")
+    Args:
+        response: HTTP响应
         
-        if not api_key:
-            print("请输入您的DashScope API Key:")
-            api_key = input().strip()
-    
-    if not api_key or api_key == "你的API key":
-        print("❌ API Key为空或未设置")
-        return False
-    
-    print(f"\n🔍 验证API Key: {api_key[:20]}...{api_key[-10:]}")
+    Returns:
+        解析后的字典
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _send_probe(api_key: str, check_billing: bool) -> requests.Response:
+    """
+    发送验证请求：默认只查询模型列表验证鉴权，不调用模型、不消耗token
     
-    # 发送测试请求
-    url = "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions"
+    Args:
+        api_key: 待验证的API Key
+        check_billing: 鉴权通过后是否再发送一次对话请求检查账户欠费
+        
+    Returns:
+        最后一次请求的响应
+    """
+    session = _get_session()
     headers = {
-        "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
     
-    payload = {
-        "model": "qwen-plus",
-        "messages": [
-            {"role": "user", "content": "Hello"}
-        ],
-        "max_tokens": 10
-    }
+    response = session.get(_MODELS_URL, headers=headers, timeout=_TIMEOUT, allow_redirects=False)
+    if response.status_code == 200 and check_billing:
+        response.close()
+        # 欠费只会在调用模型时返回
+        response = session.post(_CHAT_URL, headers=headers, json=_BILLING_PAYLOAD,
+                                timeout=_TIMEOUT, allow_redirects=False)
+    return response
+
+
+def _precheck(api_key: str, use_cache: bool, check_billing: bool):
+    """
+    无需网络请求即可得出的结果：空Key或缓存命中
     
-    try:
-        print("⏳ 发送测试请求...")
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+    Returns:
+        结果字典，需要发送请求时返回None
+    """
+    if not api_key or api_key == "你的API key":
+        return {"ok": False, "kind": "empty", "status": None, "message": "", "text": ""}
+    
+    # 近期验证通过的Key直接返回，不再请求（缓存只能证明鉴权通过，检查欠费时不使用）
+    if use_cache and not check_billing and _is_cached_valid(api_key):
+        return {"ok": True, "kind": "cached", "status": None, "message": "", "text": ""}
+    return None
+
+
+def _interpret_response(api_key: str, response, check_billing: bool) -> dict:
+    """
+    根据响应状态码生成结果字典（requests与httpx的响应对象均可）
+    
+    Args:
+        api_key: 待验证的API Key
+        response: HTTP响应
+        check_billing: 是否为欠费检查请求
         
-        print(f"📥 响应状态: {response.status_code}")
+    Returns:
+        结果字典
+    """
+    result = {"ok": False, "kind": "unknown", "status": response.status_code, "message": "", "text": ""}
+    
+    if response.status_code == 200:
+        result.update(ok=True, kind="billing_ok" if check_billing else "ok")
+        # 只缓存成功结果，无效Key修正后可立即重新验证
+        _cache_valid(api_key)
         
-        if response.status_code == 200:
-            print("✅ API Key有效！账户状态正常")
-            
-            # 显示如何设置
-            print("\n💡 如何使用这个API Key:")
-            print("\n方法1: 环境变量（推荐）")
-            print(f'   export DASHSCOPE_API_KEY="{api_key}"')
-            
-            print("\n方法2: 修改config.py")
-            print(f'   DASHSCOPE_API_KEY = os.getenv("DASHSCOPE_API_KEY", "{api_key}")')
-            
-            return True
-            
-        elif response.status_code == 401:
-            print("❌ API Key无效")
-            error = response.json().get("error", {})
-            print(f"   错误: {error.get('message', '未知错误')}")
-            print("\n📝 解决方案:")
-            print("   1. 访问 https://dashscope.console.aliyun.com/apiKey")
-            print("   2. 创建新的API Key")
-            print("   3. 重新运行此脚本验证")
-            return False
-            
-        elif response.status_code == 400:
-            error = response.json().get("error", {})
-            error_code = error.get("code", "")
-            
-            if error_code == "Arrearage":
-                print("❌ 账户欠费")
-                print(f"   错误: {error.get('message', '')}")
-                print("\n📝 解决方案:")
-                print("   1. 访问 https://home.console.aliyun.com/")
-                print("   2. 充值或开通免费试用")
-                return False
-            else:
-                print(f"❌ 请求失败: {error.get('message', '未知错误')}")
-                return False
+    elif response.status_code == 401:
+        error = _safe_json(response).get("error") or {}
+        result.update(kind="invalid", message=error.get('message', '未知错误'))
+        
+    elif response.status_code == 400:
+        error = _safe_json(response).get("error") or {}
+        error_code = error.get("code", "")
+        
+        if error_code == "Arrearage":
+            result.update(kind="arrearage", message=error.get('message', ''))
         else:
-            print(f"❌ 未知错误: {response.status_code}")
-            print(f"   响应: {response.text}")
-            return False
+            result.update(kind="bad_request", message=error.get('message', '未知错误'))
+    else:
+        # 网关错误页可能很长，只保留开头
+        result["text"] = response.text[:500]
+    return result
+
+
+# 进程内记住验证通过的API Key：(Key的SHA256, 是否检查欠费) -> 结果字典
+# 只保存验证通过的结果，网络错误等失败结果下次仍会重新验证；字典中不保存Key明文
+_verified_results = {}
+_verified_lock = threading.Lock()
+
+
+def check_api_key(api_key: str, use_cache: bool = True, check_billing: bool = False) -> dict:
+    """
+    向DashScope发送测试请求验证API Key（不输出信息，可在多线程中调用）
+    
+    Args:
+        api_key: 待验证的API Key
+        use_cache: 是否使用本地及进程内验证缓存
+        check_billing: 是否检查账户欠费（会调用模型并消耗少量token）
+        
+    Returns:
+        结果字典 {"ok": 是否有效, "kind": 结果类型, "status": HTTP状态码, "message": 错误信息, "text": 原始响应}
+    """
+    if not use_cache:
+        return _check_api_key_uncached(api_key, use_cache, check_billing)
+    memo_key = (_key_hash(api_key), check_billing)
+    with _verified_lock:
+        cached = _verified_results.get(memo_key)
+    if cached is None:
+        # 验证期间不持有锁，不同Key可并发验证
+        result = _check_api_key_uncached(api_key, True, check_billing)
+        if not result["ok"]:
+            return result
+        with _verified_lock:
+            cached = _verified_results.setdefault(memo_key, result)
+    # 返回副本，调用方修改结果不会影响缓存
+    return dict(cached)
+
+
+def _check_api_key_uncached(api_key: str, use_cache: bool, check_billing: bool) -> dict:
+    """
+    check_api_key 的实际实现（不经过进程内缓存）
+    
+    Returns:
+        结果字典，格式同 check_api_key
+    """
+    result = _precheck(api_key, use_cache, check_billing)
+    if result is not None:
+        return result
+    
+    response = None
+    try:
+        response = _send_probe(api_key, check_billing)
+        return _interpret_response(api_key, response, check_billing)
             
     except requests.exceptions.Timeout:
-        print("❌ 请求超时")
-        return False
+        return {"ok": False, "kind": "timeout", "status": None, "message": "", "text": ""}
+    except requests.exceptions.ConnectionError as e:
+        # 重试次数用尽后，读取超时以 ConnectionError(MaxRetryError(ReadTimeoutError)) 的形式抛出
+        if isinstance(getattr(e.args[0] if e.args else None, "reason", None), ReadTimeoutError):
+            return {"ok": False, "kind": "timeout", "status": None, "message": "", "text": ""}
+        return {"ok": False, "kind": "error", "status": None, "message": str(e), "text": ""}
     except Exception as e:
-        print(f"❌ 错误: {e}")
-        return False
+        return {"ok": False, "kind": "error", "status": None, "message": str(e), "text": ""}
+    finally:
+        # 立即把连接归还连接池
+        if response is not None:
+            response.close()
+
+
+async def verify_api_key_async(client, api_key: str, use_cache: bool = True, check_billing: bool = False) -> dict:
+    """
+    使用httpx异步客户端验证API Key（HTTP/2下多个请求复用同一连接）
+    
+    Args:
+        client: httpx.AsyncClient
+        api_key: 待验证的API Key
+        use_cache: 是否使用本地验证缓存
+        check_billing: 是否检查账户欠费
+        
+    Returns:
+        结果字典，格式同 check_api_key
+    """
+    result = _precheck(api_key, use_cache, check_billing)
+    if result is not None:
+        return result
+    
+    headers = {
+        "Authorization": f"Bearer {api_key}"
+    }
+    try:
+        response = await client.get(_MODELS_URL, headers=headers)
+        if response.status_code == 200 and check_billing:
+            response = await client.post(_CHAT_URL, headers=headers, json=_BILLING_PAYLOAD)
+        return _interpret_response(api_key, response, check_billing)
+    except httpx.TimeoutException:
+        return {"ok": False, "kind": "timeout", "status": None, "message": "", "text": ""}
+    except Exception as e:
+        return {"ok": False, "kind": "error", "status": None, "message": str(e), "text": ""}
+
+
+async def _check_keys_async(keys: list, use_cache: bool, check_billing: bool) -> list:
+    """
+    在同一个异步客户端上并发验证多个API Key
+    
+    Returns:
+        结果字典列表，与keys一一对应
+    """
+    timeout = httpx.Timeout(_TIMEOUT[1], connect=_TIMEOUT[0])
+    transport_kwargs = {"retries": _RETRIES}
+    try:
+        # HTTP/2需要安装h2，未安装时退回HTTP/1.1
+        transport = httpx.AsyncHTTPTransport(http2=True, **transport_kwargs)
+    except ImportError:
+        transport = httpx.AsyncHTTPTransport(**transport_kwargs)
+    async with httpx.AsyncClient(transport=transport, timeout=timeout) as client:
+        return await asyncio.gather(*(
+            verify_api_key_async(client, key, use_cache, check_billing) for key in keys
+        ))
+
+
+def _print_result(api_key: str, result: dict):
+    """
+    输出单个API Key的验证结果（一次写入stdout）
+    
+    Args:
+        api_key: API Key
+        result: check_api_key 返回的结果字典
+    """
+    kind = result["kind"]
+    out = []
+    if kind != "empty":
+        out.append(f"\n🔍 验证API Key: {_mask_key(api_key)}")
+        if result["status"] is not None:
+            out.append(f"📥 响应状态: {result['status']}")
+    
+    if kind == "empty":
+        out.append("❌ API Key为空或未设置")
+        
+    elif kind in ("ok", "cached", "billing_ok"):
+        if kind == "billing_ok":
+            out.append("✅ API Key有效！账户状态正常")
+        elif kind == "cached":
+            out.append(f"✅ API Key有效！（{_CACHE_TTL // 60}分钟内已验证，使用缓存结果）")
+        else:
+            out.append("✅ API Key有效！（如需确认账户是否欠费，请加 --check-billing）")
+        
+        # 显示如何设置
+        out.append("\n💡 如何使用这个API Key:")
+        out.append("\n方法1: 环境变量（推荐）")
+        out.append(f'   export DASHSCOPE_API_KEY="{api_key}"')
+        
+        out.append("\n方法2: 修改config.py")
+        out.append(f'   DASHSCOPE_API_KEY = os.getenv("DASHSCOPE_API_KEY", "{api_key}")')
+        
+    elif kind == "invalid":
+        out.append("❌ API Key无效")
+        out.append(f"   错误: {result['message']}")
+        out.append("\n📝 解决方案:")
+        out.append("   1. 访问 https://dashscope.console.aliyun.com/apiKey")
+        out.append("   2. 创建新的API Key")
+        out.append("   3. 重新运行此脚本验证")
+        
+    elif kind == "arrearage":
+        out.append("❌ 账户欠费")
+        out.append(f"   错误: {result['message']}")
+        out.append("\n📝 解决方案:")
+        out.append("   1. 访问 https://home.console.aliyun.com/")
+        out.append("   2. 充值或开通免费试用")
+        
+    elif kind == "bad_request":
+        out.append(f"❌ 请求失败: {result['message']}")
+        
+    elif kind == "timeout":
+        out.append("❌ 请求超时（已自动重试）")
+        
+    elif kind == "error":
+        out.append(f"❌ 错误: {result['message']}")
+        
+    else:
+        out.append(f"❌ 未知错误: {result['status']}")
+        out.append(f"   响应: {result['text']}")
+    
+    # 整段一次写出，并发验证时各Key的输出不会交错
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
+
+
+def _prompt_for_key() -> str:
+    """从环境变量或用户输入获取API Key"""
+    api_key = os.getenv("DASHSCOPE_API_KEY")
+    
+    if not api_key:
+        print("请输入您的DashScope API Key:")
+        api_key = input().strip()
+    return api_key
+
+
+def verify_api_key(api_key=None, use_cache=True, check_billing=False):
+    """验证API Key是否有效"""
+    
+    if not api_key:
+        api_key = _prompt_for_key()
+    
+    result = check_api_key(api_key, use_cache, check_billing)
+    _print_result(api_key, result)
+    return result["ok"]
 
 
 def main():
@@ -101,16 +431,37 @@ def main():
     print("  DashScope API Key 验证工具")
     print("="*60 + "\n")
     
-    # 检查命令行参数
-    if len(sys.argv) > 1:
-        api_key = sys.argv[1]
+    parser = argparse.ArgumentParser(description="DashScope API Key 验证工具")
+    parser.add_argument("keys", nargs="*", help="待验证的API Key，可传入多个")
+    parser.add_argument("--no-cache", action="store_true", help="忽略本地验证缓存，强制重新请求")
+    parser.add_argument("--check-billing", action="store_true", help="额外发送一次对话请求检查账户是否欠费（消耗少量token）")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="使用httpx异步客户端（HTTP/2）验证，Key数量超过4个且已安装httpx时默认启用")
+    args = parser.parse_args()
+    use_cache = not args.no_cache
+    
+    # 命令行可传入多个API Key，并发验证
+    keys = args.keys or [_prompt_for_key()]
+    use_async = args.use_async or len(keys) > 4
+    if args.use_async and not HTTPX_AVAILABLE:
+        print("⚠️  未安装httpx，改用线程池验证（pip install 'httpx[http2]'）")
+    
+    print("⏳ 发送测试请求...")
+    if use_async and HTTPX_AVAILABLE:
+        results = asyncio.run(_check_keys_async(keys, use_cache, args.check_billing))
     else:
-        api_key = None
+        if len(keys) > 1:
+            _warm_up_connection()
+        with ThreadPoolExecutor(max_workers=min(8, len(keys))) as executor:
+            results = list(executor.map(lambda key: check_api_key(key, use_cache, args.check_billing), keys))
+    
+    for api_key, result in zip(keys, results):
+        _print_result(api_key, result)
     
-    result = verify_api_key(api_key)
+    success = all(result["ok"] for result in results)
     
     print("\n" + "="*60)
-    if result:
+    if success:
         print("✅ 验证成功！可以使用API了")
         print("\n下一步:")
         print("   python test_qwen_api.py  # 运行完整测试")
@@ -120,9 +471,8 @@ def main():
         print("   https://dashscope.console.aliyun.com/apiKey")
     print("="*60 + "\n")
     
-    return 0 if result else 1
+    return 0 if success else 1
 
 
 if __name__ == "__main__":
     sys.exit(main())
-
@@ -5,21 +5,30 @@ TADF数据抽取系统 - Flask Web应用后端
 """
 
 import os
-import json
+import atexit
+import logging
+import functools
+import hashlib
 import uuid
 import time
+import asyncio
 import threading
 import csv
 import io
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import quote
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import tempfile
+import mimetypes
 import shutil
 import requests
+from requests.adapters import HTTPAdapter
 import sqlite3
 
 # 导入项目模块
@@ -37,16 +46,45 @@ from modules.mineru_processor import MinerUProcessor
 from modules.document_parser import DocumentParser
 from modules.image_classifier import ImageClassifier
 from modules.structure_recognizer import StructureRecognizer
-from modules.data_extractor import DataExtractor
+from modules.data_extractor import DataExtractor, HTTPX_AVAILABLE
 from modules.entity_aligner import EntityAligner
 from modules.dataset_builder import DatasetBuilder
 from modules.quality_control import QualityController
 from modules.paper_manager import PaperManager
 from utils.logger import setup_logger
+from utils.json_utils import json_dumps, json_dumps_bytes, json_loads, json_dump_file, json_load_file
 
 logger = setup_logger(__name__)
 
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify/request.get_json使用json_utils（优先orjson）序列化和解析
+    
+    orjson不支持的类型（如Decimal）回退到Flask默认实现。与默认实现不同，键不排序、非ASCII字符不转义。
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        try:
+            return json_dumps(obj)
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        return json_loads(s)
+    
+    def response(self, *args, **kwargs) -> Response:
+        # 直接使用序列化得到的字节串作为响应体，省去str的编码和解码
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = json_dumps_bytes(obj)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
 # 配置
@@ -60,62 +98,655 @@ CONFIG_STORAGE.mkdir(parents=True, exist_ok=True)
 STATUS_STORAGE.mkdir(parents=True, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+_ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in sorted(ALLOWED_EXTENSIONS))
 app.config['UPLOAD_FOLDER'] = str(UPLOAD_FOLDER)
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB
+# 部署在支持X-Sendfile的反向代理（Apache mod_xsendfile、lighttpd）之后时设置 USE_X_SENDFILE=1，
+# PDF等文件由代理直接发送，不再经过Python读写
+app.config['USE_X_SENDFILE'] = os.getenv("USE_X_SENDFILE", "0") == "1"
+# 部署在nginx之后时设置 X_ACCEL_REDIRECT=1：图片和PDF只返回X-Accel-Redirect头，
+# 由nginx的internal location直接发送文件（location配置见WEB_APP_GUIDE.md）
+X_ACCEL_REDIRECT = os.getenv("X_ACCEL_REDIRECT", "0") == "1"
+# (nginx内部路径前缀, 对应的本地目录)
+X_ACCEL_LOCATIONS = (
+    ("/_protected/mineru/", os.path.abspath(MINERU_OUTPUT_DIR)),
+    ("/_protected/processed/", os.path.abspath(PROCESSED_DIR)),
+)
 
 # 全局状态存储（用于进度跟踪）
 processing_status = {}
 processing_results = {}
 
+# 图像分类时每次请求打包的图片数量
+IMAGES_PER_REQUEST = 4
+
+# PDF处理任务队列：上传请求只负责入队，同时运行的处理任务数有上限，其余任务排队等待
+# （工作线程非daemon，解释器退出前会等待已提交的任务完成）
+PDF_PROCESS_WORKERS = int(os.getenv("PDF_PROCESS_WORKERS", 2))
+pdf_process_executor = ThreadPoolExecutor(max_workers=PDF_PROCESS_WORKERS, thread_name_prefix="PDF-Process")
+
+# 图像分类/表格抽取请求的共享线程池，各任务复用工作线程（并发上限对所有任务合计生效，避免API限流）
+classify_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="Classify")
+extract_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="Extract")
+# 编辑后同步到数据集数据库的任务单线程依次执行，不占用请求线程，也避免多个同步同时写库
+db_sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DB-Sync")
+for _executor in (classify_executor, extract_executor):
+    atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+
 # SMILES识别锁（确保串行处理，避免DECIMER服务器并发问题）
 smiles_recognition_lock = threading.Lock()
 
+# DECIMER服务连接池（keep-alive），SMILES识别请求复用连接
+decimer_session = requests.Session()
+decimer_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+decimer_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# 无状态的处理器在各任务间共享，只在首次使用时构造（初始化数据库表、构建提示词等）
+_processors = {}
+_processors_lock = threading.Lock()
 
-def allowed_file(filename):
+
+def _get_processor(name: str, factory: Callable[[], object]):
+    """
+    获取共享的处理器实例（首次调用时构造）
+    
+    Args:
+        name: 实例名称
+        factory: 无参构造函数
+        
+    Returns:
+        处理器实例
+    """
+    processor = _processors.get(name)
+    if processor is None:
+        with _processors_lock:
+            processor = _processors.get(name)
+            if processor is None:
+                processor = factory()
+                _processors[name] = processor
+    return processor
+
+
+def allowed_file(filename: str) -> bool:
     """检查文件扩展名"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
+
+
+# ==================== SQLite连接 ====================
+# WAL模式下读写互不阻塞；synchronous=NORMAL每次提交只需一次fsync；其余参数让热点页和临时表留在内存
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA busy_timeout=5000;"
+    "PRAGMA cache_size=-20000;"
+    "PRAGMA temp_store=MEMORY;"
+)
+# 每个连接缓存的预编译语句数；热点SQL使用固定文本（模块常量），重复执行时不再重新解析和规划
+SQLITE_CACHED_STATEMENTS = 512
+# IN (...) 查询每批的参数个数
+SQL_IN_CHUNK_SIZE = 500
+
+# molecules表同步使用的SQL
+SQL_MOLECULES_SMILES_BY_ID = "SELECT compound_id, smiles FROM molecules WHERE compound_id IN ({placeholders})"
+SQL_MOLECULES_BY_LOCAL_ID = (
+    "SELECT compound_id, paper_local_id FROM molecules "
+    "WHERE paper_id = ? AND paper_local_id IN ({placeholders})"
+)
+SQL_MOLECULES_INSERT = (
+    "INSERT INTO molecules (compound_id, paper_id, paper_local_id, name, smiles) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SQL_MOLECULES_SET_SMILES = (
+    "UPDATE molecules "
+    "SET smiles = ?, paper_local_id = COALESCE(paper_local_id, ?), name = COALESCE(NULLIF(name, ''), ?) "
+    "WHERE compound_id = ?"
+)
+SQL_MOLECULES_SYNC_SMILES = (
+    "UPDATE molecules SET smiles = ? "
+    "WHERE compound_id = ? AND (smiles IS NULL OR smiles = '' OR smiles != ?)"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def sql_in(template: str, count: int) -> str:
+    """
+    把SQL模板中的 {placeholders} 展开为count个?（结果缓存，相同参数个数得到同一语句文本）
+    
+    Args:
+        template: 含 {placeholders} 的SQL模板
+        count: 参数个数
+        
+    Returns:
+        SQL语句
+    """
+    return template.format(placeholders=", ".join("?" * count))
+
+
+def open_db(path, readonly: bool = False) -> sqlite3.Connection:
+    """
+    打开数据集数据库连接并设置统一的PRAGMA
+    
+    Args:
+        path: 数据库文件路径
+        readonly: 是否只读（PRAGMA query_only，用于数据浏览接口）
+        
+    Returns:
+        数据库连接
+    """
+    conn = sqlite3.connect(str(path), check_same_thread=False, cached_statements=SQLITE_CACHED_STATEMENTS)
+    conn.executescript(_SQLITE_PRAGMAS)
+    if readonly:
+        conn.execute("PRAGMA query_only=1")
+    return conn
+
+
+# 数据浏览接口的只读连接按(线程, 数据库文件)缓存复用，避免每个请求重新打开连接、解析schema
+_read_conns = threading.local()
+_all_read_conns = []
+_all_read_conns_lock = threading.Lock()
+
+
+def get_read_conn(path) -> sqlite3.Connection:
+    """
+    获取当前线程对指定数据库的只读连接（首次使用时打开，row_factory为sqlite3.Row）
+    
+    Args:
+        path: 数据库文件路径
+        
+    Returns:
+        复用的只读连接（调用方不要关闭）
+    """
+    # fork出的子进程不能沿用父进程的连接
+    key = (os.getpid(), str(path))
+    conns = getattr(_read_conns, 'conns', None)
+    if conns is None:
+        conns = _read_conns.conns = {}
+    conn = conns.get(key)
+    if conn is None:
+        conn = open_db(path, readonly=True)
+        conn.row_factory = sqlite3.Row
+        conns[key] = conn
+        with _all_read_conns_lock:
+            _all_read_conns.append(conn)
+    return conn
+
+
+def _close_read_conns() -> None:
+    """进程退出时关闭所有缓存的只读连接"""
+    with _all_read_conns_lock:
+        for conn in _all_read_conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _all_read_conns.clear()
+
+
+atexit.register(_close_read_conns)
+
+
+def _db_signature(path: Path) -> Tuple:
+    """数据库文件（含WAL文件）的 (mtime_ns, size)，任一变化说明数据已被修改"""
+    signature = []
+    for file_path in (path, path.with_name(path.name + "-wal")):
+        try:
+            stat = file_path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
 
+@functools.lru_cache(maxsize=256)
+def _count_rows_cached(db_path: str, table_name: str, signature: Tuple,
+                       where_clause: str, params: Tuple) -> int:
+    """执行COUNT(*)，结果按数据库签名缓存（signature只参与缓存键）"""
+    return get_read_conn(db_path).execute(
+        f"SELECT COUNT(*) FROM {table_name} {where_clause}", params
+    ).fetchone()[0]
 
-def save_paper_data(paper_id: str, data: dict):
-    """保存论文数据到JSON文件"""
-    file_path = DATA_STORAGE / f"{paper_id}.json"
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def _check_fts5_trigram() -> bool:
+    """检查SQLite是否支持FTS5的trigram分词器（SQLite 3.34+）"""
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(a, tokenize='trigram')")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+# 数据浏览搜索：每个表建立trigram分词的FTS5索引，子串搜索不再对每列做LIKE全表扫描。
+# 索引放在 search_index 目录下单独的索引库中（不在数据集数据库里建表），
+# 数据集由多个模块写入（含INSERT OR REPLACE，不会触发DELETE触发器），因此不用触发器同步，
+# 而是在写入路径（论文处理完成、数据库同步完成、服务启动）后由后台线程重建；
+# 浏览请求只读取索引，索引与数据库签名不一致时回退到LIKE搜索
+FTS5_TRIGRAM_AVAILABLE = _check_fts5_trigram()
+FTS_MIN_TERM_LENGTH = 3  # trigram索引只能匹配至少3个字符的搜索词
+TABLE_STREAM_BATCH_ROWS = 100  # 流式返回表数据时每次取出并写出的行数
+SEARCH_INDEX_DIR = Path(PROCESSED_DIR) / "search_index"
+_fts_signatures = {}
+_fts_lock = threading.Lock()
+
+
+def dataset_db_files() -> Dict[str, Path]:
+    """数据浏览接口开放的表名 -> 所在数据库文件"""
+    return {
+        'papers': DATABASE_DIR / 'papers.db',
+        'molecules': DATABASE_DIR / 'molecules.db',
+        'photophysics': DATABASE_DIR / 'photophysics.db',
+        'devices': DATABASE_DIR / 'devices.db'
+    }
+
+
+def search_index_path(db_path: Path, table_name: str) -> Path:
+    """表对应的索引库文件（按数据库路径区分，避免不同目录下同名数据库共用索引）"""
+    digest = hashlib.sha1(str(Path(db_path).resolve()).encode('utf-8')).hexdigest()[:8]
+    return SEARCH_INDEX_DIR / f"{table_name}_{digest}.db"
+
+
+def _indexed_signature(index_path: Path) -> Optional[str]:
+    """读取索引库中记录的数据源签名（索引不存在时返回None）"""
+    if not index_path.exists():
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key='signature'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _drop_legacy_search_index(db_path: Path, table_name: str) -> None:
+    """删除旧版本建在数据集数据库内的 {table_name}_fts 索引表"""
+    fts_table = f"{table_name}_fts"
+    if not get_read_conn(db_path).execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts_table,)).fetchone():
+        return
+    conn = open_db(db_path)
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {fts_table}")
+        conn.commit()
+        logger.info(f"✅ 已删除数据库内的旧全文索引: {fts_table}")
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️  删除旧全文索引失败 {fts_table}: {e}")
+    finally:
+        conn.close()
+
+
+def refresh_search_index(db_path: Path, table_name: str) -> bool:
+    """
+    重建表的全文索引（写入路径调用，在后台线程执行；数据未变化时直接返回）
+    
+    Args:
+        db_path: 数据库文件路径
+        table_name: 表名（来自 dataset_db_files）
+        
+    Returns:
+        索引是否与当前数据一致
+    """
+    if not FTS5_TRIGRAM_AVAILABLE or not db_path.exists():
+        return False
+    index_path = search_index_path(db_path, table_name)
+    key = str(index_path)
+    with _fts_lock:
+        _drop_legacy_search_index(db_path, table_name)
+        # 签名在读取数据前取得，重建期间若有新写入，下次刷新会再次重建
+        signature = json_dumps(_db_signature(db_path))
+        if _fts_signatures.get(key, _indexed_signature(index_path)) == signature:
+            _fts_signatures[key] = signature
+            return True
+        SEARCH_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(index_path))
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")  # 重建期间浏览请求仍可读取旧索引
+            conn.execute("ATTACH DATABASE ? AS src", (str(db_path),))
+            columns = [row[1] for row in conn.execute(f"PRAGMA src.table_info({table_name})")]
+            if not columns:
+                return False
+            column_list = ", ".join(f'"{col}"' for col in columns)
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS fts")
+                conn.execute(
+                    f"CREATE VIRTUAL TABLE fts USING fts5({column_list}, content='', tokenize='trigram')"
+                )
+                conn.execute(
+                    f"INSERT INTO fts(rowid, {column_list}) SELECT rowid, {column_list} FROM src.{table_name}"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature,))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  建立全文索引失败 {table_name}: {e}")
+            return False
+        finally:
+            conn.close()
+        _fts_signatures[key] = signature
+        logger.info(f"✅ 已重建全文索引: {index_path.name}")
+    return True
+
+
+def refresh_search_indexes() -> None:
+    """重建所有数据集表的全文索引（数据未变化的表直接跳过）"""
+    for table_name, db_path in dataset_db_files().items():
+        try:
+            refresh_search_index(db_path, table_name)
+        except Exception as e:
+            logger.warning(f"⚠️  刷新全文索引失败 {table_name}: {e}")
+
+
+def schedule_search_index_refresh() -> None:
+    """在数据库同步线程中排队重建全文索引（与数据库写入串行，不占用请求线程）"""
+    if FTS5_TRIGRAM_AVAILABLE:
+        db_sync_executor.submit(refresh_search_indexes)
+
+
+def search_index_ready(db_path: Path, table_name: str) -> Optional[Path]:
+    """
+    浏览请求使用：返回与当前数据一致的索引库路径，索引缺失或过期时返回None（回退LIKE）
+    
+    Args:
+        db_path: 数据库文件路径
+        table_name: 表名（调用方已校验）
+        
+    Returns:
+        索引库路径或None
+    """
+    if not FTS5_TRIGRAM_AVAILABLE:
+        return None
+    index_path = search_index_path(db_path, table_name)
+    key = str(index_path)
+    signature = json_dumps(_db_signature(db_path))
+    if _fts_signatures.get(key) != signature:
+        indexed = _indexed_signature(index_path)
+        if indexed is None:
+            return None
+        _fts_signatures[key] = indexed
+        if indexed != signature:
+            return None
+    return index_path
+
+
+def attach_search_index(conn: sqlite3.Connection, index_path: Path) -> None:
+    """把索引库以别名 idx 挂到只读连接上（已挂载时跳过）"""
+    index_file = str(index_path.resolve())
+    attached = {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+    if attached.get('idx') == index_file:
+        return
+    if 'idx' in attached:
+        conn.execute("DETACH DATABASE idx")
+    conn.execute("ATTACH DATABASE ? AS idx", (index_file,))
+
+
+def count_rows(db_path: Path, table_name: str, where_clause: str = "", params: Tuple = ()) -> int:
+    """
+    统计表中（满足条件的）行数，数据库未修改时直接返回缓存结果
+    
+    Args:
+        db_path: 数据库文件路径
+        table_name: 表名（调用方已校验）
+        where_clause: WHERE子句
+        params: WHERE子句参数
+        
+    Returns:
+        行数
+    """
+    return _count_rows_cached(str(db_path), table_name, _db_signature(db_path), where_clause, tuple(params))
+
+
+# ==================== 论文数据存储（SQLite） ====================
+# 每篇论文一行：列表页需要的字段单独成列，列表查询无需解析JSON；
+# 体积最大的表格/段落全文单独存入body列，只需元数据的接口（查看PDF等）不读取和解析它们
+PAPER_STORE_PATH = DATA_STORAGE / "papers_kv.db"
+PAPER_BODY_KEYS = ('tables', 'paragraphs')
+_PAPER_INSERT_SQL = (
+    "INSERT OR REPLACE INTO papers_kv "
+    "(paper_id, title, created_at, phys_count, dev_count, figs_count, config_name, blob, body) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_paper_store_lock = threading.Lock()
+_paper_store_conn = None
+_paper_store_pid = None
+
+
+def _paper_summary_columns(data: Dict) -> Tuple:
+    """提取列表页使用的冗余列"""
+    extraction_config = data.get('extraction_config') or {}
+    return (
+        data.get('title', '未知标题'),
+        data.get('created_at', ''),
+        len(data.get('photophysical_data', [])),
+        len(data.get('device_data', [])),
+        len(data.get('molecular_figures', [])),
+        extraction_config.get('name') if isinstance(extraction_config, dict) else None,
+    )
+
+
+def _paper_row(paper_id: str, data: Dict, body: Optional[bytes] = None) -> Tuple:
+    """把论文数据拆分为元数据blob和正文body，生成papers_kv的一行"""
+    meta = {k: v for k, v in data.items() if k not in PAPER_BODY_KEYS}
+    if body is None:
+        body = json_dumps_bytes({k: data[k] for k in PAPER_BODY_KEYS if k in data})
+    return (paper_id, *_paper_summary_columns(data), json_dumps_bytes(meta), body)
+
+
+def encode_paper_body(table_records: Iterable[Dict], paragraph_records: Iterable[Dict]) -> bytes:
+    """
+    逐条序列化表格/段落正文，不先构造完整的字典列表
+    
+    每条记录生成后立即编码为字节，长论文的数千个段落不会同时以Python对象
+    和JSON两种形式驻留内存。
+    
+    Args:
+        table_records: 表格记录迭代器（DocumentParser.iter_table_records）
+        paragraph_records: 段落记录迭代器（DocumentParser.iter_paragraph_records）
+        
+    Returns:
+        body列的JSON字节串（解析结果与 {'tables': [...], 'paragraphs': [...]} 相同）
+    """
+    return b''.join((
+        b'{"tables":[',
+        b','.join(map(json_dumps_bytes, table_records)),
+        b'],"paragraphs":[',
+        b','.join(map(json_dumps_bytes, paragraph_records)),
+        b']}',
+    ))
+
+
+def _migrate_legacy_paper_files(conn: sqlite3.Connection) -> None:
+    """把旧版逐篇JSON文件导入SQLite（仅在表为空时执行一次，原文件保留）"""
+    rows = []
+    for file_path in DATA_STORAGE.glob("*.json"):
+        try:
+            data = json_load_file(file_path)
+            rows.append(_paper_row(data.get('paper_id', file_path.stem), data))
+        except Exception as e:
+            logger.error(f"导入旧版论文数据失败 {file_path}: {e}")
+    if rows:
+        conn.executemany(_PAPER_INSERT_SQL, rows)
+        conn.commit()
+        logger.info(f"✅ 已将 {len(rows)} 篇旧版JSON论文数据导入 {PAPER_STORE_PATH.name}")
+
+
+def _paper_store() -> sqlite3.Connection:
+    """获取当前进程的论文存储连接（调用方持有_paper_store_lock）"""
+    global _paper_store_conn, _paper_store_pid
+    pid = os.getpid()
+    if _paper_store_pid != pid:
+        conn = sqlite3.connect(str(PAPER_STORE_PATH), timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS papers_kv (
+                paper_id TEXT PRIMARY KEY,
+                title TEXT,
+                created_at TEXT,
+                phys_count INT,
+                dev_count INT,
+                figs_count INT,
+                config_name TEXT,
+                blob BLOB,
+                body BLOB
+            )
+        """)
+        # 旧版表没有body列，正文仍在blob中，读取时照常解析
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(papers_kv)")}
+        if 'body' not in columns:
+            conn.execute("ALTER TABLE papers_kv ADD COLUMN body BLOB")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_kv_created_at ON papers_kv (created_at DESC)")
+        conn.commit()
+        if conn.execute("SELECT 1 FROM papers_kv LIMIT 1").fetchone() is None:
+            _migrate_legacy_paper_files(conn)
+        _paper_store_conn = conn
+        _paper_store_pid = pid
+    return _paper_store_conn
+
+
+def save_paper_data(paper_id: str, data: Dict, body: Optional[bytes] = None) -> None:
+    """
+    保存论文数据到SQLite
+    
+    Args:
+        paper_id: 论文ID
+        data: 论文数据
+        body: 已编码的表格/段落正文（encode_paper_body的返回值），提供时不再从data中取
+    """
+    row = _paper_row(paper_id, data, body)
+    with _paper_store_lock:
+        conn = _paper_store()
+        conn.execute(_PAPER_INSERT_SQL, row)
+        conn.commit()
+    # 图片列表可能已变化，清空本进程的图片路径缓存
+    _resolve_image.cache_clear()
     logger.info(f"已保存论文数据: {paper_id}")
 
 
-def load_paper_data(paper_id: str) -> dict:
-    """从JSON文件加载论文数据"""
-    file_path = DATA_STORAGE / f"{paper_id}.json"
-    if file_path.exists():
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+def load_paper_data(paper_id: str) -> Optional[Dict]:
+    """从SQLite加载论文数据（元数据与表格/段落正文合并）"""
+    with _paper_store_lock:
+        row = _paper_store().execute(
+            "SELECT blob, body FROM papers_kv WHERE paper_id = ?", (paper_id,)
+        ).fetchone()
+    if not row:
+        return None
+    data = json_loads(row[0])
+    if row[1]:
+        data.update(json_loads(row[1]))
+    return data
+
+
+def load_paper_meta(paper_id: str) -> Optional[Dict]:
+    """
+    只加载论文元数据，不读取表格/段落正文
+    
+    Args:
+        paper_id: 论文ID
+        
+    Returns:
+        元数据字典，论文不存在时返回None
+    """
+    with _paper_store_lock:
+        row = _paper_store().execute(
+            "SELECT blob FROM papers_kv WHERE paper_id = ?", (paper_id,)
+        ).fetchone()
+    if row:
+        return json_loads(row[0])
     return None
 
 
-def save_status(status_key: str, status: dict):
-    """保存状态到文件系统"""
+def save_paper_meta(paper_id: str, meta: Dict) -> None:
+    """
+    只更新论文元数据，保留已保存的表格/段落正文
+    
+    Args:
+        paper_id: 论文ID
+        meta: load_paper_meta返回并修改后的元数据
+    """
+    with _paper_store_lock:
+        conn = _paper_store()
+        conn.execute(
+            "UPDATE papers_kv SET title = ?, created_at = ?, phys_count = ?, dev_count = ?, "
+            "figs_count = ?, config_name = ?, blob = ? WHERE paper_id = ?",
+            (*_paper_summary_columns(meta), json_dumps_bytes(meta), paper_id)
+        )
+        conn.commit()
+    _resolve_image.cache_clear()
+
+
+def delete_paper_data(paper_id: str) -> bool:
+    """
+    删除论文数据
+    
+    Returns:
+        论文是否存在
+    """
+    with _paper_store_lock:
+        conn = _paper_store()
+        deleted = conn.execute("DELETE FROM papers_kv WHERE paper_id = ?", (paper_id,)).rowcount
+        conn.commit()
+    _resolve_image.cache_clear()
+    # 旧版JSON文件一并删除，避免重新导入
+    legacy_file = DATA_STORAGE / f"{paper_id}.json"
+    if legacy_file.exists():
+        legacy_file.unlink()
+        deleted = True
+    return bool(deleted)
+
+
+# 状态文件写入节流：同一状态下仅进度变化时，最多每 STATUS_WRITE_INTERVAL 秒写一次
+# （查询优先读内存中的processing_status，文件只用于重启后恢复）
+STATUS_WRITE_INTERVAL = 0.25
+_FINAL_STATUSES = frozenset(('completed', 'error'))
+_last_status_write = {}
+_status_write_lock = threading.Lock()
+
+
+def save_status(status_key: str, status: Dict) -> None:
+    """保存状态到文件系统（节流，完成/出错状态总是立即写入）"""
+    state = status.get('status')
+    now = time.monotonic()
+    with _status_write_lock:
+        last = _last_status_write.get(status_key)
+        if (state not in _FINAL_STATUSES and last is not None
+                and last[1] == state and now - last[0] < STATUS_WRITE_INTERVAL):
+            return
+        _last_status_write[status_key] = (now, state)
+        if state in _FINAL_STATUSES:
+            # 最终状态之后不会再有写入，释放节流记录
+            _last_status_write.pop(status_key, None)
+    
     status_file = STATUS_STORAGE / f"{status_key}.json"
     try:
-        with open(status_file, 'w', encoding='utf-8') as f:
-            json.dump(status, f, indent=2, ensure_ascii=False)
+        # 先写临时文件再原子替换，读取方不会读到写了一半的文件
+        fd, tmp_path = tempfile.mkstemp(dir=STATUS_STORAGE, suffix=".tmp")
+        os.close(fd)
+        try:
+            json_dump_file(status, tmp_path)
+            os.replace(tmp_path, status_file)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
     except Exception as e:
         logger.error(f"保存状态失败: {e}")
 
 
-def load_status(status_key: str) -> dict:
+def load_status(status_key: str) -> Optional[Dict]:
     """从文件系统加载状态"""
     status_file = STATUS_STORAGE / f"{status_key}.json"
     if status_file.exists():
         try:
-            with open(status_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return json_load_file(status_file)
         except Exception as e:
             logger.error(f"加载状态失败: {e}")
     return None
 
 
-def delete_status(status_key: str):
+def delete_status(status_key: str) -> None:
     """删除状态文件"""
     status_file = STATUS_STORAGE / f"{status_key}.json"
     if status_file.exists():
@@ -125,79 +756,401 @@ def delete_status(status_key: str):
             logger.error(f"删除状态文件失败: {e}")
 
 
-def update_status(status_key: str, status: dict):
+def update_status(status_key: str, status: Dict) -> None:
     """更新状态（同时更新内存和文件系统）"""
     processing_status[status_key] = status
     save_status(status_key, status)
 
 
-def list_papers() -> list:
-    """列出所有已处理的论文"""
-    papers = []
-    for file_path in DATA_STORAGE.glob("*.json"):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                papers.append({
-                    'paper_id': data.get('paper_id', file_path.stem),
-                    'title': data.get('title', '未知标题'),
-                    'created_at': data.get('created_at', ''),
-                    'photophysical_count': len(data.get('photophysical_data', [])),
-                    'device_count': len(data.get('device_data', [])),
-                    'molecular_figures_count': len(data.get('molecular_figures', [])),
-                    'extraction_config': data.get('extraction_config', None)
-                })
-        except Exception as e:
-            logger.error(f"加载论文数据失败 {file_path}: {e}")
-    return sorted(papers, key=lambda x: x.get('created_at', ''), reverse=True)
+_PAPER_SUMMARY_SQL = (
+    "SELECT paper_id, title, created_at, phys_count, dev_count, figs_count, config_name "
+    "FROM papers_kv ORDER BY created_at DESC"
+)
+
+
+def _paper_summary(row: Tuple) -> Dict:
+    """把论文列表查询的一行转换为接口返回的字典"""
+    paper_id, title, created_at, phys_count, dev_count, figs_count, config_name = row
+    return {
+        'paper_id': paper_id,
+        'title': title,
+        'created_at': created_at,
+        'photophysical_count': phys_count,
+        'device_count': dev_count,
+        'molecular_figures_count': figs_count,
+        'extraction_config': {'name': config_name} if config_name else None
+    }
+
+
+def list_papers() -> List[Dict]:
+    """列出所有已处理的论文（只读冗余列，不解析JSON）"""
+    with _paper_store_lock:
+        rows = _paper_store().execute(_PAPER_SUMMARY_SQL).fetchall()
+    return [_paper_summary(row) for row in rows]
+
+
+def iter_papers() -> Iterator[Dict]:
+    """
+    逐条生成论文摘要（使用独立的只读连接，流式输出期间不占用共享连接）
+    
+    Yields:
+        论文摘要字典，顺序同 list_papers
+    """
+    # 确保表已创建、旧数据已导入
+    with _paper_store_lock:
+        _paper_store()
+    conn = sqlite3.connect(f"file:{PAPER_STORE_PATH}?mode=ro", uri=True, timeout=10)
+    try:
+        for row in conn.execute(_PAPER_SUMMARY_SQL):
+            yield _paper_summary(row)
+    finally:
+        conn.close()
 
 
-def save_extraction_config(config_name: str, config_data: dict):
+def save_extraction_config(config_name: str, config_data: Dict) -> None:
     """保存抽取配置"""
     file_path = CONFIG_STORAGE / f"{config_name}.json"
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(config_data, f, indent=2, ensure_ascii=False)
+    json_dump_file(config_data, file_path)
     logger.info(f"已保存抽取配置: {config_name}")
 
 
-def load_extraction_config(config_name: str) -> dict:
+def load_extraction_config(config_name: str) -> Optional[Dict]:
     """加载抽取配置"""
     file_path = CONFIG_STORAGE / f"{config_name}.json"
     if file_path.exists():
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return json_load_file(file_path)
     return None
 
 
-def list_extraction_configs() -> list:
-    """列出所有抽取配置"""
+# 配置摘要缓存 {文件名: (mtime_ns, size, 摘要)}，文件未变化时不再读取和解析
+_config_summary_cache = {}
+_config_cache_lock = threading.Lock()
+
+
+def list_extraction_configs() -> List[Dict]:
+    """列出所有抽取配置（按文件mtime缓存解析结果，只重新读取有变化的文件）"""
     configs = []
-    for file_path in CONFIG_STORAGE.glob("*.json"):
+    seen = set()
+    with os.scandir(CONFIG_STORAGE) as it:
+        entries = sorted(
+            (entry for entry in it if entry.name.endswith('.json') and entry.is_file()),
+            key=lambda entry: entry.name
+        )
+    for entry in entries:
+        seen.add(entry.name)
+        stat = entry.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with _config_cache_lock:
+            cached = _config_summary_cache.get(entry.name)
+        if cached and cached[0] == signature:
+            configs.append(cached[1])
+            continue
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                configs.append({
-                    'name': file_path.stem,
-                    'description': data.get('description', ''),
-                    'fields': data.get('fields', {})
-                })
+            data = json_load_file(entry.path)
+            summary = {
+                'name': entry.name[:-len('.json')],
+                'description': data.get('description', ''),
+                'fields': data.get('fields', {})
+            }
         except Exception as e:
-            logger.error(f"加载配置失败 {file_path}: {e}")
+            logger.error(f"加载配置失败 {entry.path}: {e}")
+            continue
+        with _config_cache_lock:
+            _config_summary_cache[entry.name] = (signature, summary)
+        configs.append(summary)
+    
+    # 清理已删除配置的缓存
+    with _config_cache_lock:
+        for name in set(_config_summary_cache) - seen:
+            del _config_summary_cache[name]
     return configs
 
 
-def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extraction_config: dict = None):
+def persist_paper_records(phys_mapped: Iterable[Dict], dev_mapped: Iterable[Dict]) -> Tuple[int, int]:
+    """
+    验证已映射到compound_id的记录并写入数据集数据库（每类记录一个事务）
+    
+    验证与入库串成流水线：记录按块验证后直接交给executemany，不再生成中间列表。
+    
+    Args:
+        phys_mapped: 光物性记录（列表或迭代器）
+        dev_mapped: 器件记录（列表或迭代器）
+        
+    Returns:
+        (入库的光物性记录数, 入库的器件记录数)
+    """
+    quality_controller = _get_processor('quality_controller', QualityController)
+    dataset_builder = _get_processor('dataset_builder', DatasetBuilder)
+    
+    # INSERT OR REPLACE，重复同步时更新已存在的记录
+    phys_count = dataset_builder.insert_photophysics_records(
+        quality_controller.iter_validate_photophysical(phys_mapped)
+    )
+    dev_count = dataset_builder.insert_device_records(
+        quality_controller.iter_validate_device(dev_mapped)
+    )
+    logger.info(f"数据验证和入库完成: {phys_count} 条光物性, {dev_count} 条器件")
+    
+    return phys_count, dev_count
+
+
+def ensure_compounds_for_records(entity_aligner: EntityAligner, paper_id: str, records: List[Dict]) -> List[Dict]:
+    """
+    为未映射的光物性记录创建或更新molecules表中的compound记录（单事务批量写入）
+    
+    有SMILES的记录由SMILES生成compound_id，否则使用 {paper_id}_{paper_local_id} 作为临时compound_id。
+    
+    Args:
+        entity_aligner: 实体对齐器（提供数据库路径和compound_id生成）
+        paper_id: 论文ID
+        records: 未映射的记录列表（会写入compound_id字段）
+        
+    Returns:
+        已设置compound_id的记录列表
+    """
+    # 逐条日志只在DEBUG级别输出，循环内不再格式化消息
+    debug = logger.isEnabledFor(logging.DEBUG)
+    resolved = []
+    for record in records:
+        paper_local_id = record.get('paper_local_id')
+        if not paper_local_id:
+            logger.warning(f"记录缺少paper_local_id，跳过: {record}")
+            continue
+        smiles = record.get('smiles', '')
+        if not smiles:
+            # 如果没有SMILES，使用paper_local_id作为临时compound_id
+            compound_id = f"{paper_id}_{paper_local_id}"
+            if debug:
+                logger.debug("记录 %s 没有SMILES，使用临时compound_id: %s", paper_local_id, compound_id)
+        else:
+            compound_id = entity_aligner._generate_compound_id(smiles)
+            if debug:
+                logger.debug("记录 %s 从SMILES生成compound_id: %s", paper_local_id, compound_id)
+        resolved.append((record, compound_id, paper_local_id, record.get('name', ''), smiles))
+    
+    if not resolved:
+        return []
+    
+    conn = open_db(entity_aligner.db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # 一次查询已存在的compound及其SMILES
+        candidate_ids = list({compound_id for _, compound_id, _, _, _ in resolved})
+        known = {}
+        for i in range(0, len(candidate_ids), SQL_IN_CHUNK_SIZE):
+            chunk = candidate_ids[i:i + SQL_IN_CHUNK_SIZE]
+            known.update(conn.execute(sql_in(SQL_MOLECULES_SMILES_BY_ID, len(chunk)), chunk))
+        
+        to_insert = []
+        to_update = []
+        for _, compound_id, paper_local_id, name, smiles in resolved:
+            if compound_id not in known:
+                to_insert.append((compound_id, paper_id, paper_local_id, name, smiles or ''))
+                known[compound_id] = smiles or ''
+                if debug:
+                    logger.debug("创建新的compound记录: %s with SMILES: %.50s", compound_id, smiles or 'None')
+            elif smiles and known[compound_id] != smiles:
+                # 记录已存在时，用新的非空SMILES更新
+                to_update.append((smiles, paper_local_id, name, compound_id))
+                known[compound_id] = smiles
+                if debug:
+                    logger.debug("更新compound记录的SMILES: %s -> %.50s", compound_id, smiles)
+        
+        conn.executemany(SQL_MOLECULES_INSERT, to_insert)
+        conn.executemany(SQL_MOLECULES_SET_SMILES, to_update)
+        conn.commit()
+    except Exception:
+        # 任一语句失败时整批回滚，molecules表不会留下部分写入
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    logger.info(f"molecules表: 新建 {len(to_insert)} 条compound记录, 更新 {len(to_update)} 条SMILES")
+    for record, compound_id, _, _, _ in resolved:
+        record['compound_id'] = compound_id
+    return [record for record, _, _, _, _ in resolved]
+
+
+def sync_molecule_smiles(entity_aligner: EntityAligner, paper_id: str,
+                         phys_mapped: List[Dict], phys_unmapped: List[Dict]) -> int:
+    """
+    把光物性记录中的SMILES同步到molecules表（一条UPDATE语句批量执行，单事务）
+    
+    已映射记录按compound_id更新；未映射记录按(paper_id, paper_local_id)查找compound_id后更新。
+    
+    Args:
+        entity_aligner: 实体对齐器（提供数据库路径）
+        paper_id: 论文ID
+        phys_mapped: 已映射的光物性记录
+        phys_unmapped: 未映射的光物性记录
+        
+    Returns:
+        实际更新的行数
+    """
+    rows = [
+        (record['smiles'], record['compound_id'])
+        for record in phys_mapped
+        if record.get('compound_id') and record.get('smiles')
+    ]
+    unmapped = [
+        (record['paper_local_id'], record['smiles'])
+        for record in phys_unmapped
+        if record.get('paper_local_id') and record.get('smiles')
+    ]
+    
+    conn = open_db(entity_aligner.db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if unmapped:
+            # 一次查询未映射记录对应的compound_id
+            local_ids = list({paper_local_id for paper_local_id, _ in unmapped})
+            local_to_compound = {}
+            for i in range(0, len(local_ids), SQL_IN_CHUNK_SIZE):
+                chunk = local_ids[i:i + SQL_IN_CHUNK_SIZE]
+                for compound_id, paper_local_id in conn.execute(
+                    sql_in(SQL_MOLECULES_BY_LOCAL_ID, len(chunk)), [paper_id, *chunk]
+                ):
+                    # paper_local_id列为TEXT，按字符串对应；同一编号有多条时取第一条
+                    local_to_compound.setdefault(str(paper_local_id), compound_id)
+            rows.extend(
+                (smiles, local_to_compound[str(paper_local_id)])
+                for paper_local_id, smiles in unmapped
+                if str(paper_local_id) in local_to_compound
+            )
+        
+        updated = 0
+        if rows:
+            updated = conn.executemany(
+                SQL_MOLECULES_SYNC_SMILES, [(smiles, compound_id, smiles) for smiles, compound_id in rows]
+            ).rowcount
+        conn.commit()
+    except Exception:
+        # 任一语句失败时整批回滚，molecules表不会留下部分写入
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    if updated > 0:
+        logger.info(f"更新molecules表SMILES: {updated} 条")
+    return updated
+
+
+def find_mineru_pdf(extract_dir: Optional[str]) -> Optional[str]:
+    """
+    在MinerU输出目录中查找PDF（优先 *_origin.pdf）
+    
+    Args:
+        extract_dir: MinerU输出目录
+        
+    Returns:
+        PDF路径，未找到时返回None
+    """
+    if not extract_dir:
+        return None
+    extract_path = Path(extract_dir)
+    if not extract_path.exists():
+        return None
+    # 查找 *_origin.pdf 文件，没有时尝试查找任何PDF文件
+    for pattern in ("*_origin.pdf", "*.pdf"):
+        pdf_file = next(extract_path.glob(pattern), None)
+        if pdf_file is not None:
+            logger.info(f"在MinerU输出目录找到PDF: {pdf_file}")
+            return str(pdf_file)
+    return None
+
+
+def resolve_paper_pdf(paper_id: str, data: Dict) -> Optional[Path]:
+    """
+    获取论文PDF路径，优先使用处理时保存的resolved_pdf_path
+    
+    旧记录没有该字段时按原逻辑扫描extract_dir，并把结果写回论文记录，
+    之后的请求不再扫描目录。
+    
+    Args:
+        paper_id: 论文ID
+        data: 论文元数据（load_paper_meta的返回值）
+        
+    Returns:
+        PDF路径，未找到时返回None
+    """
+    resolved = data.get('resolved_pdf_path')
+    if resolved:
+        return Path(resolved)
+    
+    # 如果extract_dir中没有找到，使用保存的pdf_path
+    resolved = find_mineru_pdf(data.get('extract_dir')) or data.get('pdf_path')
+    if not resolved:
+        return None
+    
+    data['resolved_pdf_path'] = resolved
+    save_paper_meta(paper_id, data)
+    return Path(resolved)
+
+
+async def _extract_tables_async(data_extractor: DataExtractor, photophysical_tables: List,
+                                device_tables: List,
+                                on_progress: Optional[Callable[[int, int], None]] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    在一个事件循环中并发抽取全部表格数据（需安装httpx）
+    
+    Args:
+        data_extractor: 数据抽取器
+        photophysical_tables: 光物性表格列表
+        device_tables: 器件表格列表
+        on_progress: 进度回调 on_progress(已完成数, 总数)
+        
+    Returns:
+        (光物性记录列表, 器件记录列表)，记录顺序与表格顺序一致
+    """
+    total = len(photophysical_tables) + len(device_tables)
+    completed = 0
+    
+    async def extract_table(client, table, table_type):
+        nonlocal completed
+        if table_type == 'photophysical':
+            extract_fn, label = data_extractor.aextract_photophysical_data, '光物性'
+        else:
+            extract_fn, label = data_extractor.aextract_device_data, '器件'
+        try:
+            records = await extract_fn(client, table.caption, table.markdown_table)
+            for record in records:
+                record['table_id'] = table.table_id
+        except Exception as e:
+            logger.error(f"抽取{label}表格失败 {table.table_id}: {e}")
+            records = []
+        
+        completed += 1
+        if on_progress and (completed % 2 == 0 or completed == total):
+            on_progress(completed, total)
+        return records
+    
+    # 最多4个并发连接，与原线程池并发数一致，避免API限流
+    async with data_extractor.async_client(max_connections=4) as client:
+        results = await asyncio.gather(
+            *(extract_table(client, table, 'photophysical') for table in photophysical_tables),
+            *(extract_table(client, table, 'device') for table in device_tables)
+        )
+    
+    split = len(photophysical_tables)
+    photophysical_data = [record for records in results[:split] for record in records]
+    device_data = [record for records in results[split:] for record in records]
+    return photophysical_data, device_data
+
+
+def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extraction_config: Optional[Dict] = None) -> None:
     """后台处理PDF"""
     try:
         initial_status = {'status': 'processing', 'progress': 0, 'message': '开始处理...', 'paper_id': paper_id}
         processing_status[status_key] = initial_status
         save_status(status_key, initial_status)
         
-        # 初始化处理器
-        mineru_processor = MinerUProcessor(MINERU_API_TOKEN, MINERU_BASE_URL)
+        # 获取处理器（DocumentParser会累积解析结果，每个任务单独创建）
+        mineru_processor = _get_processor('mineru_processor', lambda: MinerUProcessor(MINERU_API_TOKEN, MINERU_BASE_URL))
         document_parser = DocumentParser()
-        image_classifier = ImageClassifier()
-        data_extractor = DataExtractor()
+        image_classifier = _get_processor('image_classifier', ImageClassifier)
+        data_extractor = _get_processor('data_extractor', DataExtractor)
         
         # 使用自定义配置或默认配置
         if extraction_config:
@@ -245,7 +1198,7 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
         if not tables:
             logger.warning("未找到表格，将跳过数据抽取步骤")
         
-        # 步骤3: 图像分类（使用多线程加速）
+        # 步骤3: 图像分类（多图打包请求，多个请求并发）
         update_status(status_key, {'status': 'processing', 'progress': 50, 'message': '分类图像（识别分子结构图）...', 'paper_id': paper_id})
         logger.info("开始图像分类...")
         image_paths = [f.image_path for f in figures if Path(f.image_path).exists()]
@@ -254,84 +1207,63 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
         if image_paths:
             logger.info(f"准备分类 {len(image_paths)} 张图像")
             
-            def classify_single_image(img_path):
-                """分类单张图像"""
+            def classify_image_group(group: List[str]) -> List[Tuple[str, Optional[Dict]]]:
+                """在一次请求中分类一组图像，批量结果无法解析时逐张分类"""
                 try:
-                    result = image_classifier.classify_image(img_path)
-                    return img_path, result
+                    results = image_classifier.classify_group(group) if len(group) > 1 else None
+                    if results is None:
+                        results = [image_classifier.classify_image(img_path) for img_path in group]
+                    return list(zip(group, results))
                 except Exception as e:
-                    logger.error(f"分类图像失败 {img_path}: {e}")
-                    return img_path, None
+                    logger.error(f"分类图像失败 {group}: {e}")
+                    return [(img_path, None) for img_path in group]
             
-            # 尝试使用多线程，如果失败则回退到串行处理
-            try:
-                # 使用线程池并行处理（最多5个并发，避免API限流）
-                max_workers = min(5, len(image_paths))
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    # 提交所有任务
-                    future_to_path = {}
-                    for img_path in image_paths[:20]:  # 限制最多处理20张
-                        try:
-                            future_to_path[executor.submit(classify_single_image, img_path)] = img_path
-                        except RuntimeError as e:
-                            if 'interpreter shutdown' in str(e) or 'cannot schedule new futures' in str(e):
-                                logger.warning("检测到解释器关闭，回退到串行处理")
-                                raise
-                            raise
+            # 限制最多处理20张，每次请求打包IMAGES_PER_REQUEST张
+            selected_paths = image_paths[:20]
+            image_groups = [
+                selected_paths[i:i + IMAGES_PER_REQUEST]
+                for i in range(0, len(selected_paths), IMAGES_PER_REQUEST)
+            ]
+            
+            # 在共享线程池中并行发送各组请求
+            future_to_group = {classify_executor.submit(classify_image_group, group): group for group in image_groups}
+            
+            # 收集结果
+            completed = 0
+            for future in as_completed(future_to_group):
+                try:
+                    group_results = future.result()
+                    completed += len(group_results)
+                    for img_path, result in group_results:
+                        if result:
+                            classification_results[img_path] = result
                     
-                    # 收集结果
-                    completed = 0
-                    for future in as_completed(future_to_path):
-                        try:
-                            completed += 1
-                            img_path, result = future.result()
-                            if result:
-                                classification_results[img_path] = result
-                            
-                            # 更新进度
-                            if completed % 5 == 0:
-                                progress = 50 + int(30 * completed / len(future_to_path))
-                                update_status(status_key, {
-                                    'status': 'processing', 
-                                    'progress': progress, 
-                                    'message': f'分类图像中... ({completed}/{len(future_to_path)})', 
-                                    'paper_id': paper_id
-                                })
-                        except Exception as e:
-                            logger.error(f"处理图像分类任务失败: {e}")
-                
-                logger.info(f"图像分类完成: {len(classification_results)} 张图像分类成功")
-            except RuntimeError as e:
-                if 'interpreter shutdown' in str(e) or 'cannot schedule new futures' in str(e):
-                    # 解释器正在关闭，回退到串行处理
-                    logger.warning("多线程不可用，使用串行处理图像分类...")
-                    for img_path in image_paths[:20]:
-                        try:
-                            img_path, result = classify_single_image(img_path)
-                            if result:
-                                classification_results[img_path] = result
-                        except Exception as ex:
-                            logger.error(f"串行分类图像失败 {img_path}: {ex}")
-                    logger.info(f"串行图像分类完成: {len(classification_results)} 张图像分类成功")
-                else:
-                    raise
-        
-        # 筛选分子结构图
-        molecular_figures = []
-        for fig in figures:
-            if Path(fig.image_path).exists():
-                img_path = fig.image_path
-                if img_path in classification_results:
-                    result = classification_results[img_path]
-                    if result.get('is_molecular_structure'):
-                        molecular_figures.append({
-                            'figure_id': fig.figure_id,
-                            'image_path': fig.image_path,
-                            'caption': fig.caption,
-                            'page': fig.page_index
-                        })
+                    # 更新进度
+                    progress = 50 + int(30 * completed / len(selected_paths))
+                    update_status(status_key, {
+                        'status': 'processing', 
+                        'progress': progress, 
+                        'message': f'分类图像中... ({completed}/{len(selected_paths)})', 
+                        'paper_id': paper_id
+                    })
+                except Exception as e:
+                    logger.error(f"处理图像分类任务失败: {e}")
+            
+            logger.info(f"图像分类完成: {len(classification_results)} 张图像分类成功")
+        
+        # 筛选分子结构图（分类结果只包含已确认存在的图片，无需再次stat；按原图表顺序输出）
+        molecular_figures = [
+            {
+                'figure_id': fig.figure_id,
+                'image_path': fig.image_path,
+                'caption': fig.caption,
+                'page': fig.page_index
+            }
+            for fig in figures
+            if classification_results.get(fig.image_path, {}).get('is_molecular_structure')
+        ]
         
-        # 步骤4: 数据抽取（使用多线程加速）
+        # 步骤4: 数据抽取（并发请求LLM）
         update_status(status_key, {'status': 'processing', 'progress': 70, 'message': '抽取数据...', 'paper_id': paper_id})
         logger.info("开始数据抽取...")
         photophysical_tables = document_parser.filter_tables_by_type("photophysical")
@@ -341,7 +1273,7 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
         photophysical_data = []
         device_data = []
         
-        def extract_photophysical_table(table):
+        def extract_photophysical_table(table) -> List[Dict]:
             """抽取光物性表格数据"""
             try:
                 records = data_extractor.extract_photophysical_data(
@@ -355,7 +1287,7 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
                 logger.error(f"抽取光物性表格失败 {table.table_id}: {e}")
                 return []
         
-        def extract_device_table(table):
+        def extract_device_table(table) -> List[Dict]:
             """抽取器件表格数据"""
             try:
                 records = data_extractor.extract_device_data(
@@ -369,72 +1301,53 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
                 logger.error(f"抽取器件表格失败 {table.table_id}: {e}")
                 return []
         
-        # 使用线程池并行抽取表格数据（如果解释器正在关闭，回退到串行处理）
         all_tables = list(photophysical_tables) + list(device_tables)
-        if all_tables:
+        if all_tables and HTTPX_AVAILABLE:
+            # 已安装httpx时在本线程的事件循环中并发请求LLM
+            logger.info(f"开始抽取 {len(all_tables)} 个表格（异步）...")
+            
+            def report_extract_progress(completed: int, total: int) -> None:
+                update_status(status_key, {
+                    'status': 'processing',
+                    'progress': 70 + int(15 * completed / total),
+                    'message': f'抽取数据中... ({completed}/{total})',
+                    'paper_id': paper_id
+                })
+            
+            photophysical_data, device_data = asyncio.run(_extract_tables_async(
+                data_extractor, photophysical_tables, device_tables, report_extract_progress
+            ))
+        elif all_tables:
+            # 在共享线程池中并行抽取表格数据
             logger.info(f"开始抽取 {len(all_tables)} 个表格...")
-            try:
-                # 尝试使用多线程
-                with ThreadPoolExecutor(max_workers=4) as executor:
-                    futures = []
-                    
-                    # 提交光物性表格任务
-                    for table in photophysical_tables:
-                        try:
-                            futures.append(('photophysical', executor.submit(extract_photophysical_table, table)))
-                        except RuntimeError as e:
-                            if 'interpreter shutdown' in str(e):
-                                logger.warning("检测到解释器关闭，回退到串行处理")
-                                raise
-                            raise
-                    
-                    # 提交器件表格任务
-                    for table in device_tables:
-                        try:
-                            futures.append(('device', executor.submit(extract_device_table, table)))
-                        except RuntimeError as e:
-                            if 'interpreter shutdown' in str(e):
-                                logger.warning("检测到解释器关闭，回退到串行处理")
-                                raise
-                            raise
-                    
-                    # 收集结果
-                    completed = 0
-                    for table_type, future in futures:
-                        try:
-                            records = future.result()
-                            completed += 1
-                            if records:
-                                if table_type == 'photophysical':
-                                    photophysical_data.extend(records)
-                                else:
-                                    device_data.extend(records)
-                            
-                            # 更新进度
-                            if completed % 2 == 0 or completed == len(futures):
-                                progress = 70 + int(15 * completed / len(futures))
-                                update_status(status_key, {
-                                    'status': 'processing', 
-                                    'progress': progress, 
-                                    'message': f'抽取数据中... ({completed}/{len(futures)})', 
-                                    'paper_id': paper_id
-                                })
-                        except Exception as e:
-                            logger.error(f"处理表格任务失败: {e}")
-            except RuntimeError as e:
-                if 'interpreter shutdown' in str(e) or 'cannot schedule new futures' in str(e):
-                    # 解释器正在关闭，回退到串行处理
-                    logger.warning("多线程不可用，使用串行处理...")
-                    for table in photophysical_tables:
-                        records = extract_photophysical_table(table)
-                        if records:
+            futures = [('photophysical', extract_executor.submit(extract_photophysical_table, table))
+                       for table in photophysical_tables]
+            futures += [('device', extract_executor.submit(extract_device_table, table))
+                        for table in device_tables]
+            
+            # 收集结果
+            completed = 0
+            for table_type, future in futures:
+                try:
+                    records = future.result()
+                    completed += 1
+                    if records:
+                        if table_type == 'photophysical':
                             photophysical_data.extend(records)
-                    for table in device_tables:
-                        records = extract_device_table(table)
-                        if records:
+                        else:
                             device_data.extend(records)
-                else:
-                    raise
+                    
+                    # 更新进度
+                    if completed % 2 == 0 or completed == len(futures):
+                        progress = 70 + int(15 * completed / len(futures))
+                        update_status(status_key, {
+                            'status': 'processing', 
+                            'progress': progress, 
+                            'message': f'抽取数据中... ({completed}/{len(futures)})', 
+                            'paper_id': paper_id
+                        })
+                except Exception as e:
+                    logger.error(f"处理表格任务失败: {e}")
         
         logger.info(f"数据抽取完成: {len(photophysical_data)} 条光物性记录, {len(device_data)} 条器件记录")
         
@@ -443,10 +1356,8 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
         logger.info("开始实体对齐和数据入库...")
         
         try:
-            # 初始化对齐器和数据集构建器
-            entity_aligner = EntityAligner()
-            dataset_builder = DatasetBuilder()
-            quality_controller = QualityController()
+            # 获取实体对齐器
+            entity_aligner = _get_processor('entity_aligner', EntityAligner)
             
             # 获取结构数据
             structure_data = []
@@ -485,23 +1396,9 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
             )
             logger.info(f"器件数据映射完成: {len(dev_mapped)} 条")
             
-            # 数据验证
-            phys_validated = quality_controller.batch_validate_photophysical(phys_mapped) if phys_mapped else []
-            dev_validated = quality_controller.batch_validate_device(dev_mapped) if dev_mapped else []
-            logger.info(f"数据验证完成: {len(phys_validated)} 条光物性, {len(dev_validated)} 条器件")
-            
-            # 保存到数据库
-            if phys_validated:
-                logger.info(f"开始保存 {len(phys_validated)} 条光物性记录到数据库...")
-                dataset_builder.insert_photophysics_records(phys_validated)
-                logger.info("光物性记录保存完成")
-            
-            if dev_validated:
-                logger.info(f"开始保存 {len(dev_validated)} 条器件记录到数据库...")
-                dataset_builder.insert_device_records(dev_validated)
-                logger.info("器件记录保存完成")
-            
-            logger.info(f"✅ 已保存 {len(phys_validated)} 条光物性记录和 {len(dev_validated)} 条器件记录到数据库")
+            # 数据验证和入库
+            phys_count, dev_count = persist_paper_records(phys_mapped, dev_mapped)
+            logger.info(f"✅ 已保存 {phys_count} 条光物性记录和 {dev_count} 条器件记录到数据库")
         except Exception as e:
             logger.error(f"数据入库失败（不影响主流程）: {e}", exc_info=True)
             # 继续执行，不中断流程
@@ -510,20 +1407,7 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
         update_status(status_key, {'status': 'processing', 'progress': 95, 'message': '保存结果...', 'paper_id': paper_id})
         
         # 从extract_dir中查找PDF文件（MinerU输出的origin.pdf）
-        mineru_pdf_path = None
-        if extract_dir:
-            extract_path = Path(extract_dir)
-            # 查找 *_origin.pdf 文件
-            pdf_files = list(extract_path.glob("*_origin.pdf"))
-            if pdf_files:
-                mineru_pdf_path = str(pdf_files[0])
-                logger.info(f"在MinerU输出目录找到PDF: {mineru_pdf_path}")
-            else:
-                # 如果没有找到origin.pdf，尝试查找任何PDF文件
-                pdf_files = list(extract_path.glob("*.pdf"))
-                if pdf_files:
-                    mineru_pdf_path = str(pdf_files[0])
-                    logger.info(f"在MinerU输出目录找到PDF: {mineru_pdf_path}")
+        mineru_pdf_path = find_mineru_pdf(extract_dir)
         
         # 优先使用MinerU输出的PDF，否则使用原始上传的PDF
         final_pdf_path = mineru_pdf_path if mineru_pdf_path else pdf_path
@@ -533,6 +1417,7 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
             'title': paper_id,  # 可以从PDF元数据提取
             'created_at': datetime.now().isoformat(),
             'pdf_path': final_pdf_path,  # 保存PDF路径（优先使用MinerU输出的PDF）
+            'resolved_pdf_path': final_pdf_path,  # 查看PDF时直接使用，不再扫描目录
             'molecular_figures': molecular_figures,
             'photophysical_data': photophysical_data,
             'device_data': device_data,
@@ -540,18 +1425,17 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
             'json_path': json_path,
             'figures_count': len(figures),
             'tables_count': len(tables),
-            'tables': [{'table_id': t.table_id, 'caption': t.caption, 'markdown_table': t.markdown_table, 'page': t.page_index} for t in tables],
-            'paragraphs': [{'para_id': p.para_id, 'text': p.text, 'section': p.section, 'page': p.page_index} for p in document_parser.get_paragraphs()],
             'extraction_config': extraction_config
         }
+        # 表格/段落正文直接编码为字节写入body列，不在result_data中保留完整列表
+        body = encode_paper_body(document_parser.iter_table_records(), document_parser.iter_paragraph_records())
         
-        logger.info("开始保存结果到JSON文件...")
-        save_paper_data(paper_id, result_data)
-        logger.info(f"论文数据已保存到JSON: {paper_id}")
+        logger.info("开始保存论文数据...")
+        save_paper_data(paper_id, result_data, body)
         
         # 保存到papers.db
         try:
-            paper_manager = PaperManager()
+            paper_manager = _get_processor('paper_manager', PaperManager)
             paper_record = {
                 'paper_id': paper_id,
                 'title': result_data.get('title', paper_id),
@@ -567,6 +1451,7 @@ def process_pdf_background(paper_id: str, pdf_path: str, status_key: str, extrac
         except Exception as e:
             logger.error(f"保存到papers.db失败: {e}", exc_info=True)
             # 不影响主流程
+        schedule_search_index_refresh()
         
         processing_results[status_key] = result_data
         
@@ -595,6 +1480,15 @@ def get_papers():
     return jsonify({'success': True, 'papers': papers})
 
 
+@app.route('/api/papers/stream', methods=['GET'])
+def stream_papers():
+    """以NDJSON逐行返回论文列表（每行一篇，前端可边接收边渲染）"""
+    def generate() -> Iterator[bytes]:
+        for paper in iter_papers():
+            yield json_dumps_bytes(paper) + b'\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/papers/<paper_id>', methods=['GET'])
 def get_paper(paper_id):
     """获取指定论文数据"""
@@ -608,35 +1502,12 @@ def get_paper(paper_id):
 def get_paper_source(paper_id):
     """获取论文原文内容（PDF路径）"""
     try:
-        data = load_paper_data(paper_id)
+        data = load_paper_meta(paper_id)
         if not data:
             logger.warning(f"论文不存在: {paper_id}")
             return jsonify({'success': False, 'message': '论文不存在'}), 404
         
-        # 优先从extract_dir中查找PDF文件
-        pdf_path = None
-        extract_dir = data.get('extract_dir')
-        
-        if extract_dir:
-            extract_path = Path(extract_dir)
-            if extract_path.exists():
-                # 查找 *_origin.pdf 文件
-                pdf_files = list(extract_path.glob("*_origin.pdf"))
-                if pdf_files:
-                    pdf_path = pdf_files[0]
-                    logger.info(f"从MinerU输出目录找到PDF: {pdf_path}")
-                else:
-                    # 如果没有找到origin.pdf，尝试查找任何PDF文件
-                    pdf_files = list(extract_path.glob("*.pdf"))
-                    if pdf_files:
-                        pdf_path = pdf_files[0]
-                        logger.info(f"从MinerU输出目录找到PDF: {pdf_path}")
-        
-        # 如果extract_dir中没有找到，使用保存的pdf_path
-        if not pdf_path:
-            pdf_path_str = data.get('pdf_path')
-            if pdf_path_str:
-                pdf_path = Path(pdf_path_str)
+        pdf_path = resolve_paper_pdf(paper_id, data)
         
         if not pdf_path:
             logger.warning(f"论文 {paper_id} 没有PDF路径")
@@ -665,38 +1536,39 @@ def get_paper_source(paper_id):
         return jsonify({'success': False, 'message': f'获取原文失败: {str(e)}'}), 500
 
 
+def x_accel_response(file_path: str, mimetype: Optional[str] = None) -> Optional[Response]:
+    """
+    生成交给nginx发送文件的空响应（X-Accel-Redirect）
+    
+    Args:
+        file_path: 本地文件路径
+        mimetype: 响应的Content-Type，None时按文件名推断
+        
+    Returns:
+        响应对象；未开启X_ACCEL_REDIRECT或文件不在X_ACCEL_LOCATIONS的目录下时返回None，调用方自行发送文件
+    """
+    if not X_ACCEL_REDIRECT:
+        return None
+    abs_path = os.path.abspath(file_path)
+    for location, root in X_ACCEL_LOCATIONS:
+        if abs_path.startswith(root + os.sep):
+            relative = os.path.relpath(abs_path, root).replace(os.sep, '/')
+            response = Response(mimetype=mimetype or mimetypes.guess_type(abs_path)[0] or 'application/octet-stream')
+            # nginx会保留Content-Type和Cache-Control，ETag/304和Range请求由nginx处理
+            response.headers['X-Accel-Redirect'] = location + quote(relative)
+            return response
+    return None
+
+
 @app.route('/api/papers/<paper_id>/pdf', methods=['GET'])
 def get_paper_pdf(paper_id):
     """获取论文PDF文件"""
     try:
-        data = load_paper_data(paper_id)
+        data = load_paper_meta(paper_id)
         if not data:
             return jsonify({'success': False, 'message': '论文不存在'}), 404
         
-        # 优先从extract_dir中查找PDF文件
-        pdf_path = None
-        extract_dir = data.get('extract_dir')
-        
-        if extract_dir:
-            extract_path = Path(extract_dir)
-            if extract_path.exists():
-                # 查找 *_origin.pdf 文件
-                pdf_files = list(extract_path.glob("*_origin.pdf"))
-                if pdf_files:
-                    pdf_path = pdf_files[0]
-                    logger.info(f"从MinerU输出目录找到PDF: {pdf_path}")
-                else:
-                    # 如果没有找到origin.pdf，尝试查找任何PDF文件
-                    pdf_files = list(extract_path.glob("*.pdf"))
-                    if pdf_files:
-                        pdf_path = pdf_files[0]
-                        logger.info(f"从MinerU输出目录找到PDF: {pdf_path}")
-        
-        # 如果extract_dir中没有找到，使用保存的pdf_path
-        if not pdf_path:
-            pdf_path_str = data.get('pdf_path')
-            if pdf_path_str:
-                pdf_path = Path(pdf_path_str)
+        pdf_path = resolve_paper_pdf(paper_id, data)
         
         if not pdf_path:
             return jsonify({'success': False, 'message': 'PDF文件不存在'}), 404
@@ -705,12 +1577,122 @@ def get_paper_pdf(paper_id):
             return jsonify({'success': False, 'message': 'PDF文件不存在'}), 404
         
         logger.info(f"返回PDF文件: {pdf_path}")
-        return send_file(str(pdf_path), mimetype='application/pdf')
+        response = x_accel_response(str(pdf_path), 'application/pdf')
+        if response is not None:
+            return response
+        # conditional: 带ETag/Last-Modified，浏览器重复请求时返回304，并支持Range分段加载
+        return send_file(str(pdf_path), mimetype='application/pdf', conditional=True)
     except Exception as e:
         logger.error(f"获取PDF文件失败: {e}", exc_info=True)
         return jsonify({'success': False, 'message': f'获取PDF失败: {str(e)}'}), 500
 
 
+def sync_paper_to_db_background(paper_id: str, paper_data: Dict, status_key: str) -> None:
+    """
+    后台把论文的光物性/器件数据同步到数据集数据库（实体对齐、映射、验证、入库）
+    
+    Args:
+        paper_id: 论文ID
+        paper_data: 已保存的论文数据
+        status_key: 状态键，进度和结果通过 /api/status/<status_key> 查询
+    """
+    update_status(status_key, {'status': 'processing', 'progress': 10, 'message': '同步到数据库...', 'paper_id': paper_id})
+    try:
+        entity_aligner = _get_processor('entity_aligner', EntityAligner)
+        
+        # 获取更新后的数据
+        photophysical_data = paper_data.get('photophysical_data', [])
+        device_data = paper_data.get('device_data', [])
+        structure_data = paper_data.get('molecular_figures', [])
+        
+        logger.info(f"开始同步论文 {paper_id} 的数据到数据库: {len(photophysical_data)} 条光物性记录, {len(device_data)} 条器件记录")
+        
+        # 首先确保实体对齐（创建compound记录）
+        logger.info("步骤1: 执行实体对齐...")
+        align_stats = entity_aligner.align_compounds(
+            paper_id,
+            structure_data,
+            photophysical_data,
+            device_data
+        )
+        logger.info(f"实体对齐完成: {align_stats}")
+        
+        # 映射数据到compound_id
+        logger.info("步骤2: 映射数据到compound_id...")
+        phys_mapped, phys_unmapped = entity_aligner.map_data_to_compounds(
+            paper_id,
+            photophysical_data,
+            "photophysical"
+        )
+        logger.info(f"光物性数据映射: {len(phys_mapped)} 成功, {len(phys_unmapped)} 未映射")
+        
+        dev_mapped, dev_unmapped = entity_aligner.map_data_to_compounds(
+            paper_id,
+            device_data,
+            "device"
+        )
+        logger.info(f"器件数据映射: {len(dev_mapped)} 成功, {len(dev_unmapped)} 未映射")
+        
+        # 对于未映射的记录，尝试从SMILES创建compound记录
+        if phys_unmapped:
+            logger.warning(f"有 {len(phys_unmapped)} 条光物性记录未映射到compound_id，尝试从SMILES创建")
+            phys_mapped.extend(ensure_compounds_for_records(entity_aligner, paper_id, phys_unmapped))
+        
+        if dev_unmapped:
+            logger.warning(f"有 {len(dev_unmapped)} 条器件记录未映射到compound_id")
+            # 器件数据需要emitter_compound_id，按paper_local_id一次批量查找
+            local_to_compound = entity_aligner.find_compounds_by_paper_local_ids(
+                paper_id, (record['paper_local_id'] for record in dev_unmapped if record.get('paper_local_id'))
+            )
+            for record in dev_unmapped:
+                paper_local_id = record.get('paper_local_id')
+                compound_id = local_to_compound.get(str(paper_local_id)) if paper_local_id else None
+                if compound_id:
+                    record['emitter_compound_id'] = compound_id
+                    dev_mapped.append(record)
+        
+        # 为每条记录添加paper_id（如果缺失）
+        for record in phys_mapped:
+            if 'paper_id' not in record:
+                record['paper_id'] = paper_id
+        
+        for record in dev_mapped:
+            if 'paper_id' not in record:
+                record['paper_id'] = paper_id
+        
+        # 同步更新molecules表中的smiles字段
+        logger.info("步骤2.5: 同步更新molecules表中的SMILES...")
+        sync_molecule_smiles(entity_aligner, paper_id, phys_mapped, phys_unmapped)
+        logger.info("molecules表SMILES同步完成")
+        
+        # 数据验证（验证函数会返回所有记录，只是添加质量标记）并保存到数据库
+        logger.info("步骤3: 数据验证和入库...")
+        phys_count, dev_count = persist_paper_records(phys_mapped, dev_mapped)
+        
+        logger.info(f"✅ 已同步更新到数据库: {phys_count} 条光物性记录, {dev_count} 条器件记录")
+        
+        update_status(status_key, {
+            'status': 'completed',
+            'progress': 100,
+            'message': f'更新成功，已同步到数据库（{phys_count} 条光物性记录, {dev_count} 条器件记录）',
+            'paper_id': paper_id,
+            'phys_mapped': len(phys_mapped),
+            'dev_mapped': len(dev_mapped)
+        })
+        # 本函数已在数据库同步线程中执行，直接重建索引
+        refresh_search_indexes()
+    except Exception as e:
+        logger.error(f"同步到数据库失败: {e}", exc_info=True)
+        # 即使数据库同步失败，论文数据也已保存，以带warning的完成状态返回
+        update_status(status_key, {
+            'status': 'completed',
+            'progress': 100,
+            'message': 'JSON数据已更新，但数据库同步失败: ' + str(e),
+            'paper_id': paper_id,
+            'warning': True
+        })
+
+
 @app.route('/api/papers/<paper_id>', methods=['PUT'])
 def update_paper(paper_id):
     """更新论文数据并同步到数据库"""
@@ -733,216 +1715,22 @@ def update_paper(paper_id):
         if not updated:
             return jsonify({'success': False, 'message': '没有需要更新的数据'}), 400
         
-        # 保存到JSON文件
+        # 保存论文数据
         save_paper_data(paper_id, paper_data)
         logger.info(f"已更新论文 {paper_id} 的JSON数据")
         
-        # 同步更新到数据库
-        try:
-            entity_aligner = EntityAligner()
-            dataset_builder = DatasetBuilder()
-            quality_controller = QualityController()
-            
-            # 获取更新后的数据
-            photophysical_data = paper_data.get('photophysical_data', [])
-            device_data = paper_data.get('device_data', [])
-            structure_data = paper_data.get('molecular_figures', [])
-            
-            logger.info(f"开始同步论文 {paper_id} 的数据到数据库: {len(photophysical_data)} 条光物性记录, {len(device_data)} 条器件记录")
-            
-            # 首先确保实体对齐（创建compound记录）
-            logger.info("步骤1: 执行实体对齐...")
-            align_stats = entity_aligner.align_compounds(
-                paper_id,
-                structure_data,
-                photophysical_data,
-                device_data
-            )
-            logger.info(f"实体对齐完成: {align_stats}")
-            
-            # 映射数据到compound_id
-            logger.info("步骤2: 映射数据到compound_id...")
-            phys_mapped, phys_unmapped = entity_aligner.map_data_to_compounds(
-                paper_id,
-                photophysical_data,
-                "photophysical"
-            )
-            logger.info(f"光物性数据映射: {len(phys_mapped)} 成功, {len(phys_unmapped)} 未映射")
-            
-            dev_mapped, dev_unmapped = entity_aligner.map_data_to_compounds(
-                paper_id,
-                device_data,
-                "device"
-            )
-            logger.info(f"器件数据映射: {len(dev_mapped)} 成功, {len(dev_unmapped)} 未映射")
-            
-            # 对于未映射的记录，尝试从SMILES创建compound记录
-            if phys_unmapped:
-                logger.warning(f"有 {len(phys_unmapped)} 条光物性记录未映射到compound_id，尝试从SMILES创建")
-                for record in phys_unmapped:
-                    paper_local_id = record.get('paper_local_id')
-                    smiles = record.get('smiles', '')
-                    name = record.get('name', '')
-                    
-                    if paper_local_id:
-                        # 如果没有SMILES，使用paper_local_id作为临时compound_id
-                        if not smiles:
-                            compound_id = f"{paper_id}_{paper_local_id}"
-                            logger.info(f"记录 {paper_local_id} 没有SMILES，使用临时compound_id: {compound_id}")
-                        else:
-                            # 生成compound_id
-                            compound_id = entity_aligner._generate_compound_id(smiles)
-                            logger.info(f"记录 {paper_local_id} 从SMILES生成compound_id: {compound_id}")
-                        
-                        # 确保compound记录存在，如果存在则更新smiles
-                        conn = sqlite3.connect(str(entity_aligner.db_path))
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT compound_id, smiles FROM molecules WHERE compound_id = ?", (compound_id,))
-                        existing = cursor.fetchone()
-                        if not existing:
-                            # 创建新记录
-                            cursor.execute("""
-                                INSERT INTO molecules (compound_id, paper_id, paper_local_id, name, smiles)
-                                VALUES (?, ?, ?, ?, ?)
-                            """, (compound_id, paper_id, paper_local_id, name, smiles or ''))
-                            conn.commit()
-                            logger.info(f"创建新的compound记录: {compound_id} with SMILES: {smiles[:50] if smiles else 'None'}...")
-                        else:
-                            # 如果记录已存在，更新smiles字段（如果新的smiles不为空）
-                            if smiles and (not existing[1] or existing[1] != smiles):
-                                cursor.execute("""
-                                    UPDATE molecules 
-                                    SET smiles = ?, paper_local_id = COALESCE(paper_local_id, ?), name = COALESCE(NULLIF(name, ''), ?)
-                                    WHERE compound_id = ?
-                                """, (smiles, paper_local_id, name, compound_id))
-                                conn.commit()
-                                logger.info(f"更新compound记录的SMILES: {compound_id} -> {smiles[:50]}...")
-                        conn.close()
-                        record['compound_id'] = compound_id
-                        phys_mapped.append(record)
-                    else:
-                        logger.warning(f"记录缺少paper_local_id，跳过: {record}")
-            
-            if dev_unmapped:
-                logger.warning(f"有 {len(dev_unmapped)} 条器件记录未映射到compound_id")
-                # 器件数据需要emitter_compound_id，从emitter_name或paper_local_id查找
-                for record in dev_unmapped:
-                    paper_local_id = record.get('paper_local_id')
-                    emitter_name = record.get('emitter_name', '')
-                    if paper_local_id:
-                        compound_id = entity_aligner.find_compound_by_paper_local_id(paper_id, paper_local_id)
-                        if compound_id:
-                            record['emitter_compound_id'] = compound_id
-                            dev_mapped.append(record)
-            
-            # 为每条记录添加paper_id（如果缺失）
-            for record in phys_mapped:
-                if 'paper_id' not in record:
-                    record['paper_id'] = paper_id
-            
-            for record in dev_mapped:
-                if 'paper_id' not in record:
-                    record['paper_id'] = paper_id
-            
-            # 同步更新molecules表中的smiles字段
-            logger.info("步骤2.5: 同步更新molecules表中的SMILES...")
-            conn = sqlite3.connect(str(entity_aligner.db_path))
-            cursor = conn.cursor()
-            
-            # 更新已映射记录对应的molecules表中的smiles
-            for record in phys_mapped:
-                compound_id = record.get('compound_id')
-                smiles = record.get('smiles', '')
-                paper_local_id = record.get('paper_local_id', '')
-                
-                if compound_id and smiles:
-                    # 更新molecules表中的smiles字段
-                    cursor.execute("""
-                        UPDATE molecules 
-                        SET smiles = ? 
-                        WHERE compound_id = ? AND (smiles IS NULL OR smiles = '' OR smiles != ?)
-                    """, (smiles, compound_id, smiles))
-                    if cursor.rowcount > 0:
-                        logger.info(f"更新molecules表: {compound_id} -> {smiles[:50]}...")
-            
-            # 对于未映射但有SMILES的记录，也尝试更新
-            for record in phys_unmapped:
-                paper_local_id = record.get('paper_local_id')
-                smiles = record.get('smiles', '')
-                
-                if paper_local_id and smiles:
-                    # 查找对应的compound_id
-                    cursor.execute("""
-                        SELECT compound_id FROM molecules 
-                        WHERE paper_id = ? AND paper_local_id = ?
-                    """, (paper_id, paper_local_id))
-                    row = cursor.fetchone()
-                    if row:
-                        compound_id = row[0]
-                        cursor.execute("""
-                            UPDATE molecules 
-                            SET smiles = ? 
-                            WHERE compound_id = ? AND (smiles IS NULL OR smiles = '' OR smiles != ?)
-                        """, (smiles, compound_id, smiles))
-                        if cursor.rowcount > 0:
-                            logger.info(f"更新未映射记录的molecules表: {compound_id} -> {smiles[:50]}...")
-            
-            conn.commit()
-            conn.close()
-            logger.info("molecules表SMILES同步完成")
-            
-            # 数据验证（验证函数会返回所有记录，只是添加质量标记）
-            logger.info("步骤3: 数据验证...")
-            if phys_mapped:
-                logger.info(f"验证 {len(phys_mapped)} 条光物性记录...")
-                phys_validated = quality_controller.batch_validate_photophysical(phys_mapped)
-                logger.info(f"验证完成，返回 {len(phys_validated)} 条记录")
-            else:
-                phys_validated = []
-                logger.warning("没有光物性记录需要验证")
-            
-            if dev_mapped:
-                logger.info(f"验证 {len(dev_mapped)} 条器件记录...")
-                dev_validated = quality_controller.batch_validate_device(dev_mapped)
-                logger.info(f"验证完成，返回 {len(dev_validated)} 条记录")
-            else:
-                dev_validated = []
-                logger.warning("没有器件记录需要验证")
-            
-            # 保存到数据库（使用INSERT OR REPLACE，确保更新已存在的记录）
-            logger.info("步骤4: 保存到数据库...")
-            if phys_validated:
-                logger.info(f"准备保存 {len(phys_validated)} 条光物性记录到数据库")
-                logger.info(f"示例记录: {phys_validated[0] if phys_validated else 'None'}")
-                dataset_builder.insert_photophysics_records(phys_validated)
-            else:
-                logger.warning("没有可保存的光物性记录")
-                if phys_mapped:
-                    logger.warning(f"有 {len(phys_mapped)} 条记录但验证后为空，可能验证失败")
-            
-            if dev_validated:
-                logger.info(f"准备保存 {len(dev_validated)} 条器件记录到数据库")
-                logger.info(f"示例记录: {dev_validated[0] if dev_validated else 'None'}")
-                dataset_builder.insert_device_records(dev_validated)
-            else:
-                logger.warning("没有可保存的器件记录")
-                if dev_mapped:
-                    logger.warning(f"有 {len(dev_mapped)} 条记录但验证后为空，可能验证失败")
-            
-            logger.info(f"✅ 已同步更新到数据库: {len(phys_validated)} 条光物性记录, {len(dev_validated)} 条器件记录")
-            
-            return jsonify({
-                'success': True, 
-                'message': f'更新成功，已同步到数据库（{len(phys_validated)} 条光物性记录, {len(dev_validated)} 条器件记录）'
-            })
-        except Exception as e:
-            logger.error(f"同步到数据库失败: {e}", exc_info=True)
-            # 即使数据库同步失败，也返回成功（因为JSON已保存）
-            return jsonify({
-                'success': True, 
-                'message': 'JSON数据已更新，但数据库同步失败: ' + str(e),
-                'warning': True
-            })
+        # 提交后台同步到数据库，立即返回状态键供前端轮询
+        status_key = str(uuid.uuid4())
+        queued_status = {'status': 'queued', 'progress': 0, 'message': '等待同步到数据库...', 'paper_id': paper_id}
+        processing_status[status_key] = queued_status
+        save_status(status_key, queued_status)
+        db_sync_executor.submit(sync_paper_to_db_background, paper_id, paper_data, status_key)
+        
+        return jsonify({
+            'success': True,
+            'status_key': status_key,
+            'message': '已保存，正在后台同步到数据库'
+        })
     except Exception as e:
         logger.error(f"更新论文数据失败: {e}", exc_info=True)
         return jsonify({'success': False, 'message': f'更新失败: {str(e)}'}), 500
@@ -958,7 +1746,7 @@ def upload_pdf():
     if file.filename == '':
         return jsonify({'success': False, 'message': '文件名为空'}), 400
     
-    if not allowed_file(file.filename) or file.filename.rsplit('.', 1)[1].lower() != 'pdf':
+    if not file.filename.lower().endswith('.pdf'):
         return jsonify({'success': False, 'message': '仅支持PDF文件'}), 400
     
     # 生成论文ID
@@ -981,16 +1769,12 @@ def upload_pdf():
     # 生成状态键
     status_key = str(uuid.uuid4())
     
-    # 启动后台处理
-    # 启动后台处理线程（非daemon，确保任务完成）
-    thread = threading.Thread(
-        target=process_pdf_background,
-        args=(paper_id, str(file_path), status_key, extraction_config),
-        name=f"PDF-Process-{paper_id}"
-    )
-    thread.daemon = False  # 改为False，确保即使应用重启，任务也能完成
-    thread.start()
-    logger.info(f"已启动后台处理线程: {thread.name}, paper_id: {paper_id}")
+    # 提交到后台处理队列，排队期间也能查询到状态
+    queued_status = {'status': 'queued', 'progress': 0, 'message': '排队等待处理...', 'paper_id': paper_id}
+    processing_status[status_key] = queued_status
+    save_status(status_key, queued_status)
+    pdf_process_executor.submit(process_pdf_background, paper_id, str(file_path), status_key, extraction_config)
+    logger.info(f"已提交后台处理任务: paper_id: {paper_id}")
     
     return jsonify({
         'success': True,
@@ -1010,19 +1794,20 @@ def get_status(status_key):
             status['result'] = processing_results[status_key]
         return jsonify({'success': True, 'status': status})
     
-    # 如果状态不在内存中（可能因为应用重启），尝试从文件系统加载
-    logger.info(f"状态键 {status_key} 不在内存中，尝试从文件系统加载...")
+    # 如果状态不在内存中（可能因为应用重启），从文件系统加载
+    logger.debug(f"状态键 {status_key} 不在内存中，尝试从文件系统加载...")
     saved_status = load_status(status_key)
     
     if saved_status:
-        # 恢复状态到内存
-        processing_status[status_key] = saved_status
+        # 只缓存最终状态；进行中的状态可能由其他进程继续更新，每次都重新读取文件
+        if saved_status.get('status') in _FINAL_STATUSES:
+            processing_status[status_key] = saved_status
         
         # 如果状态是已完成，尝试加载结果
         if saved_status.get('status') == 'completed':
             paper_id = saved_status.get('paper_id')
             if paper_id:
-                paper_data = load_paper_data(paper_id)
+                paper_data = load_paper_meta(paper_id)
                 if paper_data:
                     processing_results[status_key] = paper_data
                     saved_status['result'] = paper_data
@@ -1063,10 +1848,9 @@ def recognize_smiles():
         logger.info("开始识别SMILES（串行处理）")
         try:
             # 调用DECIMER API
-            import requests as req_module
             with open(temp_file.name, 'rb') as f:
                 files = {'image': f}
-                response = req_module.post(
+                response = decimer_session.post(
                     DECIMER_API_URL,
                     files=files,
                     timeout=60  # 增加超时时间，因为串行处理可能需要更长时间
@@ -1099,22 +1883,69 @@ def recognize_smiles():
             return jsonify({'success': False, 'message': f'识别出错: {str(e)}'}), 500
 
 
-@app.route('/api/images/<paper_id>/<path:image_path>', methods=['GET'])
-def get_image(paper_id, image_path):
-    """获取图片"""
-    from urllib.parse import unquote
-    image_path = unquote(image_path)
+# MinerU输出目录的 文件名 -> 路径 索引，代替每次请求递归扫描整个目录树
+IMAGE_INDEX_TTL = 60  # 秒，索引过期后遇到未收录的文件名才重建
+IMAGE_MAX_AGE = 86400  # 图片响应的浏览器缓存时间（秒）
+_image_index = {}
+_image_index_built_at = None
+_image_index_lock = threading.Lock()
+
+
+def _rebuild_image_index() -> None:
+    """遍历MINERU_OUTPUT_DIR重建文件名索引（同名文件保留第一个）"""
+    global _image_index, _image_index_built_at
+    index = {}
+    for dirpath, _, filenames in os.walk(MINERU_OUTPUT_DIR):
+        for filename in filenames:
+            index.setdefault(filename, Path(dirpath) / filename)
+    _image_index = index
+    _image_index_built_at = time.monotonic()
+    logger.info(f"已建立MinerU输出文件索引: {len(index)} 个文件")
+
+
+def find_output_image(filename: str) -> Optional[Path]:
+    """
+    按文件名在MinerU输出目录中查找文件
     
-    # 安全处理路径 - 移除路径遍历攻击
-    if '..' in image_path:
-        return jsonify({'success': False, 'message': '无效路径'}), 400
+    Args:
+        filename: 文件名
+        
+    Returns:
+        文件路径，未找到时返回None
+    """
+    path = _image_index.get(filename)
+    if path is not None and path.is_file():
+        return path
+    with _image_index_lock:
+        # 索引过期（或从未建立）时才重新遍历，避免不存在的文件名反复触发全树扫描
+        if _image_index_built_at is None or time.monotonic() - _image_index_built_at > IMAGE_INDEX_TTL:
+            _rebuild_image_index()
+        path = _image_index.get(filename)
+    if path is not None and path.is_file():
+        return path
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolve_image(paper_id: str, image_path: str) -> str:
+    """
+    把图片请求解析为磁盘上的文件路径（结果按 (paper_id, image_path) 缓存）
     
-    # 如果路径不以/开头但包含media，添加/
-    if not image_path.startswith('/') and image_path.startswith('media/'):
-        image_path = '/' + image_path
+    缩略图和详情弹窗会反复请求同一张图片，缓存后不再读取论文数据和逐个检查候选路径。
+    未找到时抛出异常，异常不会被lru_cache缓存，图片稍后出现时仍能找到。
     
-    # 从论文数据中获取extract_dir和图片路径信息
-    paper_data = load_paper_data(paper_id)
+    Args:
+        paper_id: 论文ID
+        image_path: 已解码、已做安全检查的图片路径
+        
+    Returns:
+        图片文件的绝对路径
+        
+    Raises:
+        FileNotFoundError: 所有候选路径都不存在
+    """
+    # 从论文数据中获取extract_dir和图片路径信息（只需元数据，不读取表格和段落正文）
+    paper_data = load_paper_meta(paper_id)
     possible_paths = []
     
     if paper_data:
@@ -1162,22 +1993,12 @@ def get_image(paper_id, image_path):
             # 路径不存在，但可能是正确的绝对路径，仍然尝试
             possible_paths.append(direct_path)
     
-    # 如果路径不以/开头但包含media，添加/
-    if not image_path.startswith('/') and image_path.startswith('media/'):
-        abs_path = Path('/') / image_path
-        if abs_path.exists():
-            possible_paths.insert(0, abs_path)
-            logger.info(f"通过添加/找到图片: {abs_path}")
-    
-    # 尝试从MINERU_OUTPUT_DIR查找（通过文件名）
+    # 尝试从MINERU_OUTPUT_DIR查找（通过文件名索引）
     image_filename = Path(image_path).name
-    if MINERU_OUTPUT_DIR.exists():
-        # 递归查找文件
-        for img_file in MINERU_OUTPUT_DIR.rglob(image_filename):
-            if img_file.is_file():
-                possible_paths.append(img_file)
-                logger.info(f"在MINERU_OUTPUT_DIR找到图片: {img_file}")
-                break
+    img_file = find_output_image(image_filename)
+    if img_file is not None:
+        possible_paths.append(img_file)
+        logger.info(f"在MINERU_OUTPUT_DIR找到图片: {img_file}")
     
     # 如果paper_data中有molecular_figures，直接使用其中的绝对路径
     if paper_data:
@@ -1190,29 +2011,61 @@ def get_image(paper_id, image_path):
                     logger.info(f"从molecular_figures找到图片: {fig_path}")
                     break
     
-    # 去重并尝试加载
-    possible_paths = list(set(possible_paths))
-    
+    # 去重（保持优先顺序）并返回第一个存在的文件
+    possible_paths = list(dict.fromkeys(possible_paths))
     for img_path in possible_paths:
-        print(img_path)
-        try:
-            if img_path and img_path.exists() and img_path.is_file():
-                logger.info(f"成功加载图片: {img_path}")
-                return send_file(str(img_path))
-        except Exception as e:
-            logger.warning(f"尝试加载图片失败 {img_path}: {e}")
-            continue
+        if img_path.is_file():
+            logger.info(f"成功解析图片路径: {img_path}")
+            return str(img_path)
+    
+    raise FileNotFoundError(f"图片不存在: {image_path}, 尝试的路径: {[str(p) for p in possible_paths]}")
+
+
+@app.route('/api/images/<paper_id>/<path:image_path>', methods=['GET'])
+def get_image(paper_id, image_path):
+    """获取图片"""
+    from urllib.parse import unquote
+    image_path = unquote(image_path)
     
-    logger.warning(f"图片不存在: {image_path}, 尝试的路径: {[str(p) for p in possible_paths]}")
-    return jsonify({'success': False, 'message': '图片不存在'}), 404
+    # 安全处理路径 - 移除路径遍历攻击
+    if '..' in image_path:
+        return jsonify({'success': False, 'message': '无效路径'}), 400
+    
+    # 如果路径不以/开头但包含media，添加/
+    if not image_path.startswith('/') and image_path.startswith('media/'):
+        image_path = '/' + image_path
+    
+    try:
+        img_path = _resolve_image(paper_id, image_path)
+        if not os.path.isfile(img_path):
+            # 缓存的文件已被删除或移动，清空缓存后重新查找
+            _resolve_image.cache_clear()
+            img_path = _resolve_image(paper_id, image_path)
+    except FileNotFoundError as e:
+        logger.warning(str(e))
+        return jsonify({'success': False, 'message': '图片不存在'}), 404
+    
+    try:
+        # 部署在nginx之后时由nginx发送文件，否则带ETag/Last-Modified由Flask发送，之后的重复请求返回304
+        response = x_accel_response(img_path)
+        if response is None:
+            directory, filename = os.path.split(img_path)
+            response = send_from_directory(directory, filename, conditional=True, max_age=IMAGE_MAX_AGE)
+        else:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMAGE_MAX_AGE
+        # MinerU按内容哈希命名图片，同一URL的内容不会变化
+        response.cache_control.immutable = True
+        return response
+    except Exception as e:
+        logger.warning(f"加载图片失败 {img_path}: {e}")
+        return jsonify({'success': False, 'message': '图片不存在'}), 404
 
 
 @app.route('/api/papers/<paper_id>/delete', methods=['DELETE'])
 def delete_paper(paper_id):
     """删除论文"""
-    file_path = DATA_STORAGE / f"{paper_id}.json"
-    if file_path.exists():
-        file_path.unlink()
+    if delete_paper_data(paper_id):
         return jsonify({'success': True, 'message': '删除成功'})
     return jsonify({'success': False, 'message': '论文不存在'}), 404
 
@@ -1255,12 +2108,7 @@ def get_database_tables():
         tables = []
         
         # 检查各个数据库文件
-        db_files = {
-            'papers': DATABASE_DIR / 'papers.db',
-            'molecules': DATABASE_DIR / 'molecules.db',
-            'photophysics': DATABASE_DIR / 'photophysics.db',
-            'devices': DATABASE_DIR / 'devices.db'
-        }
+        db_files = dataset_db_files()
         
         logger.info(f"检查数据库目录: {DATABASE_DIR}")
         logger.info(f"数据库目录存在: {DATABASE_DIR.exists()}")
@@ -1269,15 +2117,13 @@ def get_database_tables():
             logger.info(f"检查表 {table_name}: {db_path} (存在: {db_path.exists()})")
             if db_path.exists():
                 try:
-                    conn = sqlite3.connect(str(db_path))
-                    cursor = conn.cursor()
+                    cursor = get_read_conn(db_path).cursor()
                     
                     # 获取表结构（使用参数化查询避免SQL注入）
                     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
                     if cursor.fetchone():
                         # 获取记录数（表名已验证，安全）
-                        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                        count = cursor.fetchone()[0]
+                        count = count_rows(db_path, table_name)
                         
                         tables.append({
                             'name': table_name,
@@ -1287,8 +2133,6 @@ def get_database_tables():
                         logger.info(f"表 {table_name} 有 {count} 条记录")
                     else:
                         logger.warning(f"表 {table_name} 在数据库 {db_path} 中不存在")
-                    
-                    conn.close()
                 except Exception as e:
                     logger.error(f"处理表 {table_name} 时出错: {e}")
                     continue
@@ -1310,8 +2154,7 @@ def get_table_data(table_name):
             return jsonify({'success': False, 'message': '无效的表名'}), 400
         
         # 验证表名
-        valid_tables = ['papers', 'molecules', 'photophysics', 'devices']
-        if table_name not in valid_tables:
+        if table_name not in dataset_db_files():
             logger.warning(f"无效的表名: {table_name}")
             return jsonify({'success': False, 'message': f'无效的表名: {table_name}'}), 400
         
@@ -1323,31 +2166,27 @@ def get_table_data(table_name):
             page = 1
             per_page = 50
         
+        # 键集分页游标：上一页最后一行的rowid，提供时按rowid定位，不再用OFFSET跳过前面的行
+        try:
+            page_cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            page_cursor = None
+        
         search = request.args.get('search', '').strip()
         
         # 确定数据库文件
-        db_files = {
-            'papers': DATABASE_DIR / 'papers.db',
-            'molecules': DATABASE_DIR / 'molecules.db',
-            'photophysics': DATABASE_DIR / 'photophysics.db',
-            'devices': DATABASE_DIR / 'devices.db'
-        }
-        
-        db_path = db_files[table_name]
+        db_path = dataset_db_files()[table_name]
         logger.info(f"查询表 {table_name}，数据库路径: {db_path} (存在: {db_path.exists()})")
         
         if not db_path.exists():
             logger.error(f"数据库文件不存在: {db_path}")
             return jsonify({'success': False, 'message': f'数据库文件不存在: {db_path}'}), 404
         
-        conn = sqlite3.connect(str(db_path))
-        conn.row_factory = sqlite3.Row  # 返回字典格式
-        cursor = conn.cursor()
+        cursor = get_read_conn(db_path).cursor()  # 行为sqlite3.Row，可转为字典
         
         # 首先检查表是否存在
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
         if not cursor.fetchone():
-            conn.close()
             logger.error(f"表 {table_name} 在数据库 {db_path} 中不存在")
             return jsonify({'success': False, 'message': f'表 {table_name} 不存在'}), 404
         
@@ -1360,49 +2199,79 @@ def get_table_data(table_name):
             cursor.execute(f"PRAGMA table_info({table_name})")
             columns = [row[1] for row in cursor.fetchall()]
             
-            # 构建搜索条件（在所有文本列中搜索，使用引号包裹列名）
-            search_conditions = []
-            for col in columns:
-                # 列名来自PRAGMA，已验证，使用引号包裹更安全
-                search_conditions.append(f'"{col}" LIKE ?')
-                params.append(f"%{search}%")
-            
-            if search_conditions:
-                where_clause = "WHERE " + " OR ".join(search_conditions)
+            index_path = search_index_ready(db_path, table_name) if len(search) >= FTS_MIN_TERM_LENGTH else None
+            if index_path is not None:
+                # 在全文索引中做子串匹配（整个搜索词作为一个短语，双引号转义）
+                attach_search_index(cursor.connection, index_path)
+                where_clause = "WHERE rowid IN (SELECT rowid FROM idx.fts WHERE fts MATCH ?)"
+                params.append('"' + search.replace('"', '""') + '"')
+            else:
+                # 构建搜索条件（在所有文本列中搜索，使用引号包裹列名）
+                search_conditions = []
+                for col in columns:
+                    # 列名来自PRAGMA，已验证，使用引号包裹更安全
+                    search_conditions.append(f'"{col}" LIKE ?')
+                    params.append(f"%{search}%")
+                
+                if search_conditions:
+                    where_clause = "WHERE (" + " OR ".join(search_conditions) + ")"
         
         # 获取总数（表名已验证，安全）
-        count_query = f"SELECT COUNT(*) FROM {table_name} {where_clause}"
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()[0]
-        
-        # 获取分页数据（表名已验证，安全）
-        offset = (page - 1) * per_page
-        query = f"SELECT * FROM {table_name} {where_clause} LIMIT ? OFFSET ?"
-        cursor.execute(query, params + [per_page, offset])
-        
-        rows = cursor.fetchall()
-        data = [dict(row) for row in rows]
+        # 客户端翻页时已知总数，可传 skip_count=1 跳过统计
+        if request.args.get('skip_count') == '1':
+            total = None
+        else:
+            total = count_rows(db_path, table_name, where_clause, params)
         
         # 获取列信息（表名已验证，安全）
         cursor.execute(f"PRAGMA table_info({table_name})")
         columns_info = cursor.fetchall()
         columns = [{'name': col[1], 'type': col[2]} for col in columns_info]
         
-        conn.close()
-        
-        logger.info(f"成功返回表 {table_name} 的数据: {len(data)} 条记录，共 {total} 条")
+        # 获取分页数据（表名已验证，安全），按rowid排序，与原先的表扫描顺序一致
+        # 行以元组取出，按cursor.description的列名一次性组装成字典
+        cursor.row_factory = None
+        if page_cursor is not None:
+            keyset_clause = f"{where_clause} AND rowid > ?" if where_clause else "WHERE rowid > ?"
+            query = f"SELECT rowid AS _cursor, * FROM {table_name} {keyset_clause} ORDER BY rowid LIMIT ?"
+            cursor.execute(query, params + [page_cursor, per_page])
+        else:
+            offset = (page - 1) * per_page
+            query = f"SELECT rowid AS _cursor, * FROM {table_name} {where_clause} ORDER BY rowid LIMIT ? OFFSET ?"
+            cursor.execute(query, params + [per_page, offset])
+        field_names = [desc[0] for desc in cursor.description[1:]]
+        
+        pagination = {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': None if total is None else ((total + per_page - 1) // per_page if total > 0 else 0),
+            'next_cursor': None
+        }
         
-        return jsonify({
-            'success': True,
-            'data': data,
-            'columns': columns,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'pages': (total + per_page - 1) // per_page if total > 0 else 0
-            }
-        })
+        def generate() -> Iterator[bytes]:
+            # 先输出列信息，再逐批输出data数组，分页信息（含依赖最后一行的next_cursor）放在最后
+            yield b'{"success":true,"columns":' + json_dumps_bytes(columns) + b',"data":['
+            count = 0
+            last_row_id = None
+            try:
+                while True:
+                    rows = cursor.fetchmany(TABLE_STREAM_BATCH_ROWS)
+                    if not rows:
+                        break
+                    chunk = b','.join(json_dumps_bytes(dict(zip(field_names, row[1:]))) for row in rows)
+                    yield (b',' + chunk) if count else chunk
+                    count += len(rows)
+                    last_row_id = rows[-1][0]
+            finally:
+                cursor.close()
+            # 不足一页说明已到末尾
+            if count == per_page:
+                pagination['next_cursor'] = last_row_id
+            yield b'],"pagination":' + json_dumps_bytes(pagination) + b'}'
+            logger.info(f"成功返回表 {table_name} 的数据: {count} 条记录，共 {total} 条")
+        
+        return Response(stream_with_context(generate()), mimetype='application/json')
     except Exception as e:
         logger.error(f"获取表数据失败: {e}", exc_info=True)
         return jsonify({'success': False, 'message': f'获取数据失败: {str(e)}'}), 500
@@ -1455,5 +2324,8 @@ def handle_config(config_name):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
+    # 开发服务器；DEV=1 时开启调试和自动重载
+    # 生产环境请使用 gunicorn -w 1 -k gthread web_wsgi:application（见 start_web_app.sh）
+    schedule_search_index_refresh()
+    app.run(debug=os.getenv("DEV", "0") == "1", host='0.0.0.0', port=5000, threaded=True)
 
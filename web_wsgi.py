@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TADF数据抽取Web应用的WSGI入口
+配合 gunicorn -w 1 -k gthread 使用（应用状态在进程内存中，只能运行单个worker）
+"""
+
+from web_app import app, schedule_search_index_refresh
+
+application = app
+
+# 启动时在后台补建数据集的全文索引（数据未变化的表直接跳过）
+schedule_search_index_refresh()
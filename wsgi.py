@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DECIMER REST API 的WSGI入口
+不要使用 gunicorn --preload：TensorFlow不是fork安全的，
+本模块在每个worker进程（fork之后）中导入，并在此时开始后台加载模型
+"""
+
+from server import app, warm_up
+
+application = app
+
+warm_up()